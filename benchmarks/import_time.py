@@ -0,0 +1,50 @@
+"""
+Measure the import time of the package with -X importtime, as imported and with
+every optional subsystem loaded
+
+run from the repository root with: python -m benchmarks.import_time
+"""
+import sys, statistics, subprocess
+
+RUNS = 10
+
+LAZY = ('keys','scopes','rotation','ratelimit','revocation','stores','breaker')
+
+def import_times(code: str) -> dict:
+    """
+    Cumulative import time in microseconds of the modules code imports itself
+    """
+    result = subprocess.run(
+        [sys.executable,"-X","importtime","-c",code],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line[12:].split('|')
+        # nested imports are indented, their time is in the cumulative time of their parent
+        if cumulative.strip().isdigit() and not module.startswith('  '):
+            times[module.strip()] = int(cumulative)
+    return times
+
+def median_ms(code: str, startup: set) -> float:
+    return statistics.median(
+        sum(time for module, time in import_times(code).items() if module not in startup)
+        for _ in range(RUNS)
+    ) / 1000
+
+if __name__ == '__main__':
+    startup = set(import_times("pass"))
+    cases = {
+        'fastapi': "import fastapi",
+        'import fastapi_jwt_auth': "import fastapi_jwt_auth",
+        'every subsystem': "import fastapi_jwt_auth, " + ", ".join("fastapi_jwt_auth." + name for name in LAZY),
+    }
+
+    print("median of {} runs".format(RUNS))
+    print("{:<26}{:>12}".format("imports","time (ms)"))
+    for name, code in cases.items():
+        print("{:<26}{:>12.1f}".format(name,median_ms(code,startup)))
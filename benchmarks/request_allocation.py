@@ -0,0 +1,50 @@
+"""
+Measure the memory allocated by the AuthJWT object of one request with tracemalloc,
+for AuthJWT and for a subclass with a __dict__ like AuthJWT had before __slots__
+
+run from the repository root with: python -m benchmarks.request_allocation
+"""
+import sys, tracemalloc
+from fastapi_jwt_auth import AuthJWT
+
+REQUESTS = 10000
+
+class Unslotted(AuthJWT):
+    pass
+
+def allocated_per_request(auth_class: type, authorization: str, verify: bool) -> float:
+    """
+    Bytes still allocated per request while REQUESTS objects are alive
+    """
+    objects = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(REQUESTS):
+        Authorize = auth_class(authorization)
+        if verify:
+            Authorize.jwt_required()
+        objects.append(Authorize)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # the list holding the objects isn't part of a request
+    size = sum(stat.size_diff for stat in after.compare_to(before,'filename'))
+    return (size - sys.getsizeof(objects)) / REQUESTS
+
+if __name__ == '__main__':
+    for auth_class in (AuthJWT, Unslotted):
+        auth_class.load_config(lambda: [("authjwt_secret_key","secret-key")])
+    token = AuthJWT(authorization=None).create_access_token(identity="user@example.com").decode('utf-8')
+    authorization = "Bearer {}".format(token)
+
+    print("{} requests".format(REQUESTS))
+    print("{:<12}{:>16}{:>16}{:>14}".format("class","instance (B)","verified (B)","getsizeof"))
+    for auth_class in (AuthJWT, Unslotted):
+        instance = auth_class(authorization)
+        size = sys.getsizeof(instance) + (sys.getsizeof(instance.__dict__) if hasattr(instance,'__dict__') else 0)
+        print("{:<12}{:>16.0f}{:>16.0f}{:>14}".format(
+            auth_class.__name__,
+            allocated_per_request(auth_class,authorization,False),
+            allocated_per_request(auth_class,authorization,True),
+            size
+        ))
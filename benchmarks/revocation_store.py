@@ -0,0 +1,45 @@
+"""
+Compare the lookup latency of the in memory and the SQLite revocation stores
+
+run from the repository root with: python -m benchmarks.revocation_store
+"""
+import os, time, tempfile
+from fastapi_jwt_auth.claims import compact_jwt_identifier
+from fastapi_jwt_auth.stores import MemoryRevocationStore, SQLiteRevocationStore
+
+REVOKED = 100000
+LOOKUPS = 20000
+
+def lookup_latency(store, jtis) -> float:
+    start = time.perf_counter()
+    for jti in jtis:
+        store.is_revoked(jti)
+    return (time.perf_counter() - start) / len(jtis) * 1e6
+
+def write_time(store, revocations) -> float:
+    start = time.perf_counter()
+    store.revoke_many(revocations)
+    if hasattr(store,'flush'):
+        store.flush()
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    exp = int(time.time()) + 3600
+    revocations = [(compact_jwt_identifier(), exp) for _ in range(REVOKED)]
+    hits = [jti for jti, _ in revocations[:LOOKUPS]]
+    misses = [compact_jwt_identifier() for _ in range(LOOKUPS)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            'memory': MemoryRevocationStore(),
+            'sqlite': SQLiteRevocationStore(os.path.join(directory,"revoked.db")),
+        }
+
+        print("{} revoked tokens, {} lookups".format(REVOKED,LOOKUPS))
+        print("{:<8}{:>12}{:>14}{:>14}".format("store","write (s)","hit (us)","miss (us)"))
+        for name, store in stores.items():
+            written = write_time(store,revocations)
+            print("{:<8}{:>12.2f}{:>14.2f}{:>14.2f}".format(
+                name,written,lookup_latency(store,hits),lookup_latency(store,misses)
+            ))
+            store.close()
@@ -0,0 +1,27 @@
+"""
+Report the size of tokens created with the default and the compact claim profile
+
+run from the repository root with: python -m benchmarks.token_size
+"""
+from fastapi_jwt_auth import AuthJWT
+
+def token_sizes(profile: str) -> dict:
+    class Auth(AuthJWT):
+        pass
+
+    Auth.load_config(lambda: [("authjwt_secret_key","secret-key"),("authjwt_claims_profile",profile)])
+    Authorize = Auth(authorization=None)
+
+    return {
+        'access (str identity)': len(Authorize.create_access_token(identity="user@example.com")),
+        'access (int identity)': len(Authorize.create_access_token(identity=1234567,fresh=True)),
+        'refresh': len(Authorize.create_refresh_token(identity="user@example.com")),
+    }
+
+if __name__ == '__main__':
+    default, compact = token_sizes('default'), token_sizes('compact')
+
+    print("{:<24}{:>10}{:>10}{:>8}{:>8}".format("token","default","compact","saved","%"))
+    for name in default:
+        saved = default[name] - compact[name]
+        print("{:<24}{:>10}{:>10}{:>8}{:>7.1f}%".format(name,default[name],compact[name],saved,saved * 100 / default[name]))
@@ -26,7 +26,7 @@ settings = Settings()
 conn_redis = Redis(host=settings.redis_db_host, port=6379, db=0,decode_responses=True)
 
 # You can load env from pydantic or environment variable
-@AuthJWT.load_env
+@AuthJWT.load_config
 def get_setting():
     return settings
 
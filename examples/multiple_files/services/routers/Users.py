@@ -6,16 +6,7 @@ from schemas.users.UserSchema import UserLogin, UserOut, UserUpdate
 from config import conn_redis, ACCESS_EXPIRES, REFRESH_EXPIRES
 from typing import List
 
-class JwtAuthToken:
-    def __init__(self):
-        self.jwt_auth = AuthJWT(None)
-
-    def __call__(self):
-        return self.jwt_auth
-
-
 router = APIRouter()
-auth_token = JwtAuthToken()
 
 @router.post('/register', status_code=201)
 async def register(user: RegisterSchema):
@@ -23,7 +14,7 @@ async def register(user: RegisterSchema):
     return {"message":"email already register"}
 
 @router.post('/login')
-async def login(user: UserLogin, res: Response, Authorize: AuthJWT = Depends(auth_token)):
+async def login(user: UserLogin, res: Response, Authorize: AuthJWT = Depends()):
     user_exists = await UserFetch.filter_by_email(user.email)
     if (
         user_exists and
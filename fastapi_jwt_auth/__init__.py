@@ -1 +1,31 @@
+import sys
+from importlib import import_module
 from .auth_jwt import AuthJWT
+from .config import AuthConfig
+from .claims import Claims
+
+# optional subsystems are imported on first access, e.g. fastapi_jwt_auth.RateLimiter
+_lazy = {
+    'TenantRegistry': '.keys',
+    'Keyring': '.keys',
+    'ScopeTable': '.scopes',
+    'requires': '.scopes',
+    'RefreshTokenFamilies': '.rotation',
+    'RateLimiter': '.ratelimit',
+    'CircuitBreaker': '.breaker',
+}
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__,name))
+    value = getattr(import_module(_lazy[name],__name__),name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
+
+if sys.version_info < (3, 7):
+    # module __getattr__ (PEP 562) is ignored before 3.7
+    for _name in _lazy:
+        __getattr__(_name)
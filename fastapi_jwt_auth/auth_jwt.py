@@ -1,48 +1,82 @@
-import jwt
+import gc, jwt, json, math, threading
+from hashlib import blake2b
+from importlib import import_module
 from re import match
 from uuid import uuid4
 from pydantic import ValidationError
-from fastapi import Header, HTTPException
-from fastapi_jwt_auth.config import LoadSettings
+from fastapi import Header, HTTPException, Response
+from fastapi_jwt_auth.config import LoadSettings, AuthConfig
+from fastapi_jwt_auth.context import set_current_claims
+from fastapi_jwt_auth.fork import register_after_fork
+from fastapi_jwt_auth.claims import Claims, compact_claims, compact_jwt_identifier, is_compact, expand_claims
+from fastapi_jwt_auth.compression import encode_compressed, decode_compressed
+from fastapi_jwt_auth.metrics import metrics
+from fastapi_jwt_auth.precheck import precheck
 from datetime import datetime, timezone, timedelta
 from types import GeneratorType
 from typing import (
+    TYPE_CHECKING,
     Optional,
     Dict,
     Union,
     Callable,
     List,
     Sequence,
+    Tuple,
+    Iterable,
 )
 
+if TYPE_CHECKING:
+    from fastapi_jwt_auth.keys import TenantRegistry, Keyring
+    from fastapi_jwt_auth.scopes import ScopeTable
+    from fastapi_jwt_auth.rotation import RefreshTokenFamilies
+    from fastapi_jwt_auth.ratelimit import RateLimiter
+    from fastapi_jwt_auth.revocation import RevocationBus, RevocationList
+    from fastapi_jwt_auth.stores import RevocationStore
+    from fastapi_jwt_auth.breaker import CircuitBreaker
+
 class AuthJWT:
-    _token = None
-    _secret_key = None
-    _algorithm = "HS256"
-    _decode_algorithms = None
-    _decode_leeway = 0
-    _encode_issuer = None
-    _decode_issuer = None
-    _decode_audience = None
-    _blacklist_enabled = None
-    _blacklist_token_checks = []
+    # one instance per request, it only holds the request token, its claims and the response
+    __slots__ = ('_token','_raw_jwt','_claims','_response')
+
+    _config = AuthConfig()
+    # serializes the writers of _config so concurrent reloads don't drop each other,
+    # readers take the current snapshot without locking
+    _config_lock = threading.Lock()
+    # modules of the components are only imported when a component is loaded
+    _components = {
+        'tenants': 'fastapi_jwt_auth.keys.TenantRegistry',
+        'keyring': 'fastapi_jwt_auth.keys.Keyring',
+        'scopes': 'fastapi_jwt_auth.scopes.ScopeTable',
+        'refresh_families': 'fastapi_jwt_auth.rotation.RefreshTokenFamilies',
+        'rate_limiter': 'fastapi_jwt_auth.ratelimit.RateLimiter',
+        'revocation_bus': 'fastapi_jwt_auth.revocation.RevocationBus',
+        'revocation_store': 'fastapi_jwt_auth.stores.RevocationStore',
+        'blacklist_breaker': 'fastapi_jwt_auth.breaker.CircuitBreaker',
+    }
     _token_in_blacklist_callback = None
-    _access_token_expires = timedelta(minutes=15)
-    _refresh_token_expires = timedelta(days=30)
 
-    def __init__(self,authorization: Optional[str] = Header(None)):
+    def __init__(self,authorization: Optional[str] = Header(None), response: Response = None):
         """
         Get header Authorization with format 'Bearer <JWT>' and verified token, when Authorization header exists
 
         :param Authorization: get Authorization from the header when class initialize
+        :param response: response of the request, used to send renewed access tokens
         """
+        self._token = None
+        self._raw_jwt = None
+        self._claims = None
+        self._response = response
         if authorization:
-            if match(r"Bearer\s",authorization) and len(authorization.split(' ')) == 2 and authorization.split(' ')[1]:
-                self._token = authorization.split(' ')[1]
+            parts = authorization.split(' ')
+            if match(r"Bearer\s",authorization) and len(parts) == 2 and parts[1]:
+                self._token = parts[1]
             else:
                 raise HTTPException(status_code=422,detail="Bad Authorization header. Expected value 'Bearer <JWT>'")
 
-    def _get_jwt_identifier(self) -> str:
+    def _get_jwt_identifier(self, config: Optional[AuthConfig] = None) -> str:
+        if (config or self._config).compact_claims:
+            return compact_jwt_identifier()
         return str(uuid4())
 
     def _get_int_from_datetime(self,value: datetime) -> int:
@@ -63,7 +97,11 @@ class AuthJWT:
         fresh: Optional[bool] = False,
         headers: Optional[Dict] = None,
         issuer: Optional[str] = None,
-        audience: Optional[Union[str,Sequence[str]]] = None
+        audience: Optional[Union[str,Sequence[str]]] = None,
+        scopes: Optional[Sequence[str]] = None,
+        family: Optional[Tuple[str,int]] = None,
+        scope_mask: Optional[int] = None,
+        config: Optional[AuthConfig] = None
     ) -> bytes:
         """
         This function create token for access_token and refresh_token, when type_token
@@ -76,16 +114,31 @@ class AuthJWT:
         :param headers: valid dict for specifying additional headers in JWT header section
         :param issuer: expected issuer in the JWT
         :param audience: expected audience in the JWT
+        :param scopes: granted scopes, stored as a bitmask of the loaded ScopeTable
+        :param family: (family, generation) of a refresh token when rotation is enabled
+        :param scope_mask: 'scp' claim copied as is from another token, instead of scopes
+        :param config: configuration snapshot read once by the calling method
 
         :return: Encoded token
         """
         if type_token not in ['access','refresh']:
             raise TypeError("Type token must be between access or refresh")
 
+        config = config or self._config
+        key, algorithm = config.secret_key, config.algorithm
+
+        if config.keyring is not None:
+            # sign with the active key and tell the verifier which one it is
+            active = config.keyring.active
+            if active is None:
+                raise RuntimeError("The keyring must have an active key to create tokens")
+            key, algorithm = active.signing_key, active.algorithm
+            headers = dict(headers or {},kid=active.kid)
+
         # raise an error if secret key doesn't exist
-        if not self._secret_key:
+        if not key:
             raise RuntimeError(
-                "AUTHJWT_SECRET_KEY must be set when using symmetric algorithm {}".format(self._algorithm)
+                "AUTHJWT_SECRET_KEY must be set when using symmetric algorithm {}".format(algorithm)
             )
 
         # Validation type data
@@ -95,12 +148,16 @@ class AuthJWT:
             raise TypeError("fresh must be a boolean")
         if audience and not isinstance(audience, (str, list, tuple, set, frozenset, GeneratorType)):
             raise TypeError("audience must be a string or sequence")
+        if scopes is not None and not isinstance(scopes, (list, tuple, set, frozenset)):
+            raise TypeError("scopes must be a sequence")
+        if scopes is not None and config.scopes is None:
+            raise RuntimeError("A ScopeTable must be provided via AuthJWT.load_scopes to grant scopes")
 
         # Data section
         reserved_claims = {
             "iat": self._get_int_from_datetime(datetime.now(timezone.utc)),
             "nbf": self._get_int_from_datetime(datetime.now(timezone.utc)),
-            "jti": self._get_jwt_identifier(),
+            "jti": self._get_jwt_identifier(config),
         }
 
         custom_claims = {
@@ -111,6 +168,12 @@ class AuthJWT:
         # for access_token only fresh needed
         if type_token == 'access':
             custom_claims['fresh'] = fresh
+        if scopes is not None:
+            custom_claims['scp'] = config.scopes.encode(scopes)
+        elif scope_mask is not None:
+            custom_claims['scp'] = scope_mask
+        if family is not None:
+            custom_claims['fam'], custom_claims['gen'] = family
 
         if exp_time:
             reserved_claims['exp'] = exp_time
@@ -119,74 +182,386 @@ class AuthJWT:
         if audience:
             reserved_claims['aud'] = audience
 
+        claims = {**reserved_claims, **custom_claims}
+        if config.compact_claims:
+            claims = compact_claims(claims)
+
+        if config.compression_threshold is not None:
+            # same serialization as jwt.encode, payload is compressed when it's large enough
+            payload = json.dumps(claims,separators=(',',':')).encode('utf-8')
+            if len(payload) >= config.compression_threshold:
+                return encode_compressed(payload,key,algorithm,headers)
+            return jwt.api_jws.encode(payload,key,algorithm=algorithm,headers=headers)
+
         return jwt.encode(
-            {**reserved_claims, **custom_claims},
-            self._secret_key,
-            algorithm=self._algorithm,
+            claims,
+            key,
+            algorithm=algorithm,
             headers=headers
         )
 
-    def _verifying_token(self,encoded_token: bytes, issuer: Optional[str] = None) -> None:
+    def _verifying_token(
+        self,
+        encoded_token: bytes,
+        issuer: Optional[str] = None,
+        config: Optional[AuthConfig] = None
+    ) -> Dict[str,Union[str,int,bool]]:
         """
-        Verified token and check if token is revoked
+        Verified token and check if token is revoked, the claims of the request token
+        are kept so the getters don't decode it again
 
         :param encoded_token: token hash
         :param issuer: expected issuer in the JWT
-        :return: None
+        :param config: configuration snapshot read once by the calling method
+        :return: raw data from the hash token in the form of a dictionary
+        """
+        config = config or self._config
+        raw_token = self._verified_token(encoded_token=encoded_token,issuer=issuer,config=config)
+        if raw_token['type'] in config.blacklist_token_checks:
+            self._check_token_is_revoked(raw_token,config)
+
+        if encoded_token == self._token:
+            limiter = config.rate_limiter
+            if limiter is not None and raw_token['type'] in limiter.token_types:
+                retry_after = limiter.hit(raw_token[limiter.key])
+                if retry_after:
+                    raise HTTPException(
+                        status_code=429,
+                        detail="Too many requests",
+                        headers={"Retry-After": str(math.ceil(retry_after))}
+                    )
+
+            self._raw_jwt = raw_token
+        return raw_token
+
+    def _renew_access_token(
+        self,
+        raw_token: Dict[str,Union[str,int,bool]],
+        config: Optional[AuthConfig] = None
+    ) -> None:
         """
-        raw_token = self._verified_token(encoded_token=encoded_token,issuer=issuer)
-        if raw_token['type'] in self._blacklist_token_checks:
-            self._check_token_is_revoked(raw_token)
+        Sliding session, when the access token expires within AUTHJWT_RENEWAL_WINDOW a
+        new non fresh access token is sent in the AUTHJWT_RENEWAL_HEADER response header.
+        A token is renewed once, concurrent requests with the same token get the same
+        renewed token. Called once the token passed every check of the protecting method,
+        the scopes are copied as is so they survive without a loaded ScopeTable.
+
+        :param raw_token: claims of the verified access token
+        :param config: configuration snapshot read once by the calling method
+        """
+        config = config or self._config
+        if not config.renewal_window or 'exp' not in raw_token or self._response is None:
+            return
+        # tokens of tenants are signed by the tenants, they can't be renewed with our key and issuer
+        if config.tenants is not None:
+            return
+        if raw_token['exp'] - self._get_int_from_datetime(datetime.now(timezone.utc)) > config.renewal_window:
+            return
 
-    def _verified_token(self,encoded_token: bytes, issuer: Optional[str] = None) -> Dict[str,Union[str,int,bool]]:
+        token = config._renewals.get_or_set(
+            raw_token['jti'],
+            lambda: self._create_token(
+                identity=raw_token['identity'],
+                type_token="access",
+                exp_time=self._get_expired_time("access",config=config),
+                fresh=False,
+                audience=raw_token.get('aud'),
+                issuer=config.encode_issuer,
+                scope_mask=raw_token.get('scp'),
+                config=config
+            )
+        )
+        self._response.headers[config.renewal_header] = token.decode('utf-8') if isinstance(token, bytes) else token
+
+    def _verified_token(
+        self,
+        encoded_token: bytes,
+        issuer: Optional[str] = None,
+        config: Optional[AuthConfig] = None
+    ) -> Dict[str,Union[str,int,bool]]:
         """
         Verified token and catch all error from jwt package and return decode token
 
         :param encoded_token: token hash
         :param issuer: expected issuer in the JWT
+        :param config: configuration snapshot read once by the calling method
         :return: raw data from the hash token in the form of a dictionary
         """
+        config = config or self._config
+
         # raise an error if secret key doesn't exist
-        if not self._secret_key:
+        if not config.secret_key and config.tenants is None and config.keyring is None:
             raise RuntimeError(
-                "AUTHJWT_SECRET_KEY must be set when using symmetric algorithm {}".format(self._algorithm)
+                "AUTHJWT_SECRET_KEY must be set when using symmetric algorithm {}".format(config.algorithm)
             )
 
-        algorithms = self._decode_algorithms or [self._algorithm]
+        # garbage and expired tokens are rejected before the signature is verified, the alg
+        # and leeway are only known here when they don't depend on the tenant or key
+        header = precheck(
+            encoded_token,
+            max_length=config.max_token_length,
+            algorithms=config.decode_algorithms if config.tenants is None and config.keyring is None else None,
+            leeway=config.decode_leeway if config.early_expiry_check and config.tenants is None else None
+        )
+
+        # tokens that failed recently are rejected with the same detail without verifying them again
+        rejections, resolved = config._rejections, False
+        if rejections is not None:
+            digest = blake2b(
+                encoded_token.encode('latin-1') if isinstance(encoded_token, str) else encoded_token,
+                digest_size=16
+            ).digest(), issuer
+            detail = rejections.get(digest)
+            if detail is not None:
+                metrics.increment('negative_cache_hits')
+                raise HTTPException(status_code=422,detail=detail)
 
         try:
-            return jwt.decode(
-                encoded_token,
-                self._secret_key,
-                issuer=issuer,
-                audience=self._decode_audience,
-                leeway=self._decode_leeway,
-                algorithms=algorithms
-            )
+            key, algorithms = config.secret_key, config.decode_algorithms
+            audience, leeway = config.decode_audience, config.decode_leeway
+
+            if header is None and (config.tenants is not None or config.keyring is not None):
+                header = jwt.get_unverified_header(encoded_token)
+
+            if config.tenants is not None:
+                # key and policy belong to the tenant that issued the token
+                tenant = config.tenants.resolve(encoded_token,header=header)
+                key, algorithms = tenant.key, tenant.algorithms
+                issuer, audience, leeway = tenant.issuer, tenant.audience, tenant.leeway
+            elif config.keyring is not None:
+                # tokens without kid were signed before the keyring, verify them with the secret key
+                kid = header.get('kid')
+                if kid is not None or not key:
+                    entry = config.keyring.get(kid)
+                    if entry is None:
+                        raise jwt.InvalidTokenError("Unknown key identifier")
+                    key, algorithms = entry.verifying_key, entry.algorithms
+            resolved = True
+
+            if header is not None and header.get('zip') == 'DEF' and config.max_decompressed_size:
+                raw_token = decode_compressed(
+                    encoded_token,
+                    key,
+                    algorithms,
+                    config.max_decompressed_size,
+                    issuer=issuer,
+                    audience=audience,
+                    leeway=leeway
+                )
+            else:
+                raw_token = jwt.decode(
+                    encoded_token,
+                    key,
+                    issuer=issuer,
+                    audience=audience,
+                    leeway=leeway,
+                    algorithms=algorithms
+                )
         except Exception as err:
+            # unknown kid or issuer may be registered later and immature tokens become valid, don't remember them
+            if rejections is not None and resolved and not isinstance(err, jwt.ImmatureSignatureError):
+                rejections.set(digest,str(err))
             raise HTTPException(status_code=422,detail=str(err))
 
+        # tokens of both claim profiles are accepted whatever the current profile is
+        if is_compact(raw_token):
+            raw_token = expand_claims(raw_token)
+        return raw_token
+
     @classmethod
     def load_config(cls, settings: Callable[...,List[tuple]]) -> "AuthJWT":
+        """
+        Validate the settings and publish them as a new AuthConfig snapshot. The snapshot
+        is built completely before it's assigned, so requests in flight see either the
+        old or the new configuration, never a mix of both.
+
+        Subclasses of AuthJWT keep their own snapshot, call load_config on the
+        subclass for an independent configuration.
+        """
+        with cls._config_lock:
+            cls._config = cls._build_config(settings,base=cls._config)
+
+    @classmethod
+    def reload_config(
+        cls,
+        settings: Optional[Callable[...,List[tuple]]] = None,
+        **components
+    ) -> AuthConfig:
+        """
+        Build a complete new snapshot from the settings and components (tenants, keyring)
+        and publish it with a single assignment. Everything is validated before the swap,
+        when validation fails the current snapshot stays in place. Caches that belong
+        to a snapshot are dropped together with it.
+
+        :param settings: same as load_config, None keeps the current settings
+        :param components: components to replace, e.g. keyring=Keyring()
+        :return: published snapshot
+        """
+        for name, value in components.items():
+            if name not in cls._components:
+                raise TypeError("Unknown component {}".format(name))
+            if value is not None and not isinstance(value, cls._component_class(name)):
+                raise TypeError("{} must be a {}".format(name,cls._component_class(name).__name__))
+
+        with cls._config_lock:
+            config = cls._config
+            if settings is not None:
+                config = cls._build_config(settings,base=config)
+
+            cls._config = config = config.replace(**components)
+        return config
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        # a reload running in another thread of the parent would leave the lock held
+        cls._config_lock = threading.Lock()
+
+    @classmethod
+    def _component_class(cls, name: str) -> type:
+        module, _, attribute = cls._components[name].rpartition('.')
+        return getattr(import_module(module),attribute)
+
+    @classmethod
+    def _build_config(cls, settings: Callable[...,List[tuple]], base: AuthConfig) -> AuthConfig:
         try:
             config = LoadSettings(**{key.lower():value for key,value in settings()})
-
-            cls._secret_key = config.authjwt_secret_key
-            cls._algorithm = config.authjwt_algorithm
-            cls._decode_algorithms = config.authjwt_decode_algorithms
-            cls._decode_leeway = config.authjwt_decode_leeway
-            cls._encode_issuer = config.authjwt_encode_issuer
-            cls._decode_issuer = config.authjwt_decode_issuer
-            cls._decode_audience = config.authjwt_decode_audience
-            cls._blacklist_enabled = config.authjwt_blacklist_enabled
-            cls._blacklist_token_checks = config.authjwt_blacklist_token_checks
-            cls._access_token_expires = config.authjwt_access_token_expires
-            cls._refresh_token_expires = config.authjwt_refresh_token_expires
+            return AuthConfig.from_settings(config,base=base)
         except ValidationError:
             raise
         except Exception:
             raise TypeError("Config must be pydantic 'BaseSettings' or list of tuple")
 
+    @classmethod
+    def load_tenants(cls, tenants: Optional["TenantRegistry"]) -> None:
+        """
+        Verify tokens with the key and policy of the tenant that issued them,
+        the tenant is picked from the token kid header or iss claim.
+        Pass None to go back to AUTHJWT_SECRET_KEY verification.
+
+        :param tenants: registry of the tenants
+        """
+        cls.reload_config(tenants=tenants)
+
+    @classmethod
+    def load_keyring(cls, keyring: Optional["Keyring"]) -> None:
+        """
+        Sign new tokens with the active key of the keyring and verify tokens with
+        the key matching their kid header, so keys can be rotated without invalidating
+        tokens that are already issued. Pass None to go back to AUTHJWT_SECRET_KEY.
+
+        :param keyring: keyring with the signing and verifying keys
+        """
+        cls.reload_config(keyring=keyring)
+
+    @classmethod
+    def load_scopes(cls, scopes: Optional["ScopeTable"]) -> None:
+        """
+        Register the scopes that can be granted to access tokens, each scope is
+        one bit of the 'scp' claim
+
+        :param scopes: table of the registered scopes
+        """
+        cls.reload_config(scopes=scopes)
+
+    @classmethod
+    def load_refresh_token_families(cls, refresh_families: Optional["RefreshTokenFamilies"]) -> None:
+        """
+        Enable refresh token rotation, refresh tokens are created in a family and
+        rotate_refresh_token replaces them with the next generation. When an older
+        generation is presented the whole family is revoked.
+
+        :param refresh_families: store of the current generation of each family
+        """
+        cls.reload_config(refresh_families=refresh_families)
+
+    @classmethod
+    def load_rate_limiter(cls, rate_limiter: Optional["RateLimiter"]) -> None:
+        """
+        Limit the requests of each identity (or jti), over the limit the verification
+        of the request token fails with 429 and a Retry-After header
+
+        :param rate_limiter: token buckets of the clients
+        """
+        cls.reload_config(rate_limiter=rate_limiter)
+
+    @classmethod
+    def load_revocation_bus(cls, revocation_bus: Optional["RevocationBus"]) -> None:
+        """
+        Keep the revoked tokens in memory, revoke_token pushes them to every process
+        through the bus and they're checked before the token_in_blacklist_loader callback
+
+        :param revocation_bus: started bus with the local list of revoked tokens, its messages
+                               are signed with a key derived from AUTHJWT_SECRET_KEY unless
+                               it has a key of its own
+        """
+        if revocation_bus is not None and getattr(revocation_bus,'has_key',True) is False:
+            if not cls._config.secret_key:
+                raise RuntimeError("The RevocationBus needs a key, pass key to it or set AUTHJWT_SECRET_KEY")
+            revocation_bus.set_key(cls._config.secret_key)
+        cls.reload_config(revocation_bus=revocation_bus)
+
+    @classmethod
+    def load_revocation_store(cls, revocation_store: Optional["RevocationStore"]) -> None:
+        """
+        Store the tokens revoked with revoke_token, they're checked before the
+        token_in_blacklist_loader callback when AUTHJWT_BLACKLIST_ENABLED is true
+
+        :param revocation_store: e.g. SQLiteRevocationStore("revoked.db")
+        """
+        cls.reload_config(revocation_store=revocation_store)
+
+    @classmethod
+    def load_blacklist_breaker(cls, blacklist_breaker: Optional["CircuitBreaker"]) -> None:
+        """
+        Bound the time spent in the token_in_blacklist_loader callback, when it's slow
+        or failing the breaker opens and its policy answers instead, a rejected token
+        fails with 503
+
+        :param blacklist_breaker: e.g. CircuitBreaker(timeout=0.05, policy='stale')
+        """
+        cls.reload_config(blacklist_breaker=blacklist_breaker)
+
+    @classmethod
+    def warmup(cls, freeze: Optional[bool] = False) -> None:
+        """
+        Do once in the parent process the work each worker would otherwise repeat on its
+        first requests, e.g. call it at the end of the application module with gunicorn
+        --preload. A token is signed and verified so PyJWT and the crypto backends of the
+        configured algorithms are loaded, and the revocation lists are purged so workers
+        share a compact copy. Keys, scope tables and lookup tables are already built when
+        they're loaded. Locks, pools, sockets and background threads of the components
+        are made again in each worker after the fork.
+
+        :param freeze: move every object to the permanent generation of the garbage collector
+                       (gc.freeze), so collections in the workers don't write to the memory
+                       pages they share with the parent
+        """
+        config = cls._config
+        jwt.algorithms.get_default_algorithms()
+        # optional modules are imported lazily, import them all so workers share them
+        for name in cls._components:
+            cls._component_class(name)
+
+        # a verify-only keyring can't sign, its keys were prepared when they were added
+        # and the algorithms are loaded above, that's all the verifier needs
+        if (config.keyring.active is not None) if config.keyring is not None else config.secret_key:
+            Authorize = cls(authorization=None)
+            token = Authorize.create_access_token(identity='warmup',audience=config.decode_audience)
+            try:
+                Authorize._verified_token(token)
+            except HTTPException:
+                # e.g. the tokens of the tenants are verified with other keys, the verifier ran anyway
+                pass
+
+        if config.revocation_bus is not None:
+            config.revocation_bus.revoked.purge()
+        if config.revocation_store is not None:
+            config.revocation_store.purge()
+
+        if freeze and hasattr(gc,'freeze'):
+            gc.collect()
+            gc.freeze()
+
     @classmethod
     def token_in_blacklist_loader(cls, callback: Callable[...,bool]) -> "AuthJWT":
         """
@@ -205,7 +580,7 @@ class AuthJWT:
         """
         Check if AUTHJWT_BLACKLIST_ENABLED in env, not None and value is true
         """
-        return self._blacklist_enabled is not None and self._blacklist_enabled == 'true'
+        return self._config.blacklist_enabled
 
     def has_token_in_blacklist_callback(self) -> bool:
         """
@@ -213,33 +588,182 @@ class AuthJWT:
         """
         return self._token_in_blacklist_callback is not None
 
-    def _check_token_is_revoked(self, raw_token: Dict[str,Union[str,int,bool]]) -> None:
+    def _check_token_is_revoked(
+        self,
+        raw_token: Dict[str,Union[str,int,bool]],
+        config: Optional[AuthConfig] = None
+    ) -> None:
         """
         Ensure that AUTHJWT_BLACKLIST_ENABLED is true and callback regulated, and then
         call function blacklist callback with passing decode JWT, if true
-        raise exception Token has been revoked
+        raise exception Token has been revoked. Tokens revoked through the revocation
+        bus are known locally, then the revocation store is checked, and the callback
+        is only called when they don't know the token.
         """
-        if not self.blacklist_is_enabled():
+        config = config or self._config
+        if not config.blacklist_enabled:
             return
 
+        if config.revocation_bus is not None or config.revocation_store is not None:
+            if config.revocation_bus is not None and self._revoked_in(config.revocation_bus.revoked,raw_token):
+                raise HTTPException(status_code=401,detail="Token has been revoked")
+            if config.revocation_store is not None and self._revoked_in(config.revocation_store,raw_token):
+                raise HTTPException(status_code=401,detail="Token has been revoked")
+            if not self.has_token_in_blacklist_callback():
+                return
+
         if not self.has_token_in_blacklist_callback():
             raise RuntimeError("A token_in_blacklist_callback must be provided via "
                 "the '@AuthJWT.token_in_blacklist_loader' if "
                 "AUTHJWT_BLACKLIST_ENABLED is 'true'")
 
-        if self._token_in_blacklist_callback.__func__(raw_token):
+        breaker = config.blacklist_breaker
+        if breaker is None:
+            revoked = self._token_in_blacklist_callback.__func__(raw_token)
+        else:
+            from fastapi_jwt_auth.breaker import Unavailable
+            try:
+                revoked = breaker.call(self._token_in_blacklist_callback.__func__,raw_token)
+            except Unavailable:
+                raise HTTPException(status_code=503,detail="Unable to check if the token has been revoked")
+
+        if revoked:
             raise HTTPException(status_code=401,detail="Token has been revoked")
 
+    def _revoked_in(self, revoked: Union["RevocationList","RevocationStore"], raw_token: Dict[str,Union[str,int,bool]]) -> bool:
+        """
+        :param revoked: local list of the revocation bus or revocation store
+        :return: True when the jti is revoked or the identity was revoked after the token was issued
+        """
+        if revoked.is_revoked(raw_token['jti']):
+            return True
+        # iat is in whole seconds, a token issued in the second of the revocation may have been
+        # issued before it so it's revoked too, new tokens are valid from the next second
+        revoked_at = revoked.identity_revoked_at(raw_token['identity'])
+        return revoked_at is not None and raw_token.get('iat',0) <= revoked_at
+
+    def _check_revocation_targets(self, config: Optional[AuthConfig] = None) -> None:
+        config = config or self._config
+        if config.revocation_bus is None and config.revocation_store is None:
+            raise RuntimeError("A RevocationStore or RevocationBus must be provided via "
+                "AuthJWT.load_revocation_store or AuthJWT.load_revocation_bus to revoke tokens")
+
+    def revoke_token(self, encoded_token: Optional[bytes] = None) -> None:
+        """
+        Revoke a token in the revocation store and in every process through the
+        revocation bus, the token of the request when encoded_token isn't given
+
+        :param encoded_token: token to revoke
+        """
+        config = self._config
+        self._check_revocation_targets(config)
+        if encoded_token is None:
+            raw_token = self.get_raw_jwt()
+            if raw_token is None:
+                raise HTTPException(status_code=401,detail="Missing Authorization Header")
+        else:
+            raw_token = self._verified_token(encoded_token=encoded_token,config=config)
+
+        self._publish_revocations([(raw_token['jti'], raw_token.get('exp'))],config)
+
+    def revoke_many(
+        self,
+        tokens: Iterable[Union[str,bytes,Tuple[str,Optional[int]]]],
+        batch_size: Optional[int] = 500,
+        progress: Optional[Callable[[int,Optional[int]],None]] = None
+    ) -> int:
+        """
+        Revoke many tokens at once, e.g. during an incident. Revocations are written to the
+        revocation store and broadcast by the revocation bus in batches.
+
+        Items are encoded tokens, (jti, exp) or jti. Encoded tokens are verified first, the
+        ones that are invalid or expired are skipped since they're rejected anyway. A jti
+        without exp is kept as long as the longest token lifetime of the configuration.
+
+        :param tokens: tokens to revoke
+        :param batch_size: revocations written at once
+        :param progress: called with (revoked, total) after each batch, total is None
+                         when tokens has no length
+        :return: number of revoked tokens
+        """
+        config = self._config
+        self._check_revocation_targets(config)
+        total = len(tokens) if hasattr(tokens,'__len__') else None
+        default_exp = self._get_int_from_datetime(datetime.now(timezone.utc)) + max(
+            config.access_token_expires,config.refresh_token_expires
+        )
+
+        batch, revoked = [], 0
+        for token in tokens:
+            if isinstance(token, tuple):
+                batch.append(token)
+            elif isinstance(token, bytes) or '.' in token:
+                try:
+                    raw_token = self._verified_token(encoded_token=token,config=config)
+                except HTTPException:
+                    continue
+                batch.append((raw_token['jti'], raw_token.get('exp')))
+            else:
+                batch.append((token, default_exp))
+
+            if len(batch) == batch_size:
+                self._publish_revocations(batch,config)
+                revoked, batch = revoked + len(batch), []
+                if progress is not None:
+                    progress(revoked,total)
+
+        if batch:
+            self._publish_revocations(batch,config)
+            revoked += len(batch)
+            if progress is not None:
+                progress(revoked,total)
+        return revoked
+
+    def revoke_identities(self, identities: Iterable[Union[str,int]]) -> int:
+        """
+        Revoke every token issued to the identities until the end of the current second,
+        e.g. on "log out everywhere". iat is in whole seconds, so tokens issued in the same
+        second are revoked too and new tokens are valid from the next second. One entry is
+        stored per identity, kept as long as the longest token lifetime of the configuration.
+
+        :param identities: identities to revoke
+        :return: number of revoked identities
+        """
+        config = self._config
+        self._check_revocation_targets(config)
+        now = self._get_int_from_datetime(datetime.now(timezone.utc))
+        exp = now + max(config.access_token_expires,config.refresh_token_expires)
+
+        revocations = [(identity, now, exp) for identity in identities]
+        if config.revocation_store is not None:
+            config.revocation_store.revoke_identities(revocations)
+        if config.revocation_bus is not None:
+            config.revocation_bus.publish(identities=revocations)
+        return len(revocations)
+
+    def _publish_revocations(
+        self,
+        revocations: List[Tuple[str,Optional[int]]],
+        config: Optional[AuthConfig] = None
+    ) -> None:
+        config = config or self._config
+        if config.revocation_store is not None:
+            config.revocation_store.revoke_many(revocations)
+        if config.revocation_bus is not None:
+            config.revocation_bus.publish(revocations)
+
     def _get_expired_time(
         self,
         type_token: str,
-        expires_time: Optional[Union[timedelta,int,bool]] = None
+        expires_time: Optional[Union[timedelta,int,bool]] = None,
+        config: Optional[AuthConfig] = None
     ) -> Union[None,int]:
         """
         Dynamic token expired if expires_time is False exp claim not created
 
         :param type_token: for indicate token is access_token or refresh_token
         :param expires_time: duration expired jwt
+        :param config: configuration snapshot read once by the calling method
 
         :return: duration exp claim jwt
         """
@@ -247,16 +771,17 @@ class AuthJWT:
             raise TypeError("expires_time must be between timedelta, int, bool")
 
         if expires_time is not False:
+            config = config or self._config
             if type_token == 'access':
-                expires_time = expires_time or self._access_token_expires
+                expires_time = expires_time or config.access_token_expires
             if type_token == 'refresh':
-                expires_time = expires_time or self._refresh_token_expires
+                expires_time = expires_time or config.refresh_token_expires
 
             if isinstance(expires_time, bool):
                 if type_token == 'access':
-                    expires_time = self._access_token_expires
+                    expires_time = config.access_token_expires
                 if type_token == 'refresh':
-                    expires_time = self._refresh_token_expires
+                    expires_time = config.refresh_token_expires
             if isinstance(expires_time, timedelta):
                 expires_time = int(expires_time.total_seconds())
 
@@ -270,7 +795,8 @@ class AuthJWT:
         fresh: Optional[bool] = False,
         headers: Optional[Dict] = None,
         expires_time: Optional[Union[timedelta,int,bool]] = None,
-        audience: Optional[Union[str,Sequence[str]]] = None
+        audience: Optional[Union[str,Sequence[str]]] = None,
+        scopes: Optional[Sequence[str]] = None
     ) -> bytes:
         """
         Create a access token with 15 minutes for expired time (default),
@@ -278,15 +804,17 @@ class AuthJWT:
 
         :return: hash token
         """
-
+        config = self._config
         return self._create_token(
             identity=identity,
             type_token="access",
-            exp_time=self._get_expired_time("access",expires_time),
+            exp_time=self._get_expired_time("access",expires_time,config),
             fresh=fresh,
             headers=headers,
             audience=audience,
-            issuer=self._encode_issuer
+            issuer=config.encode_issuer,
+            scopes=scopes,
+            config=config
         )
 
     def create_refresh_token(
@@ -302,23 +830,157 @@ class AuthJWT:
 
         :return: hash token
         """
+        config = self._config
+        exp_time = self._get_expired_time("refresh",expires_time,config)
+
+        family = None
+        if config.refresh_families is not None:
+            family = compact_jwt_identifier()
+            family = (family, config.refresh_families.start(family,exp_time))
 
         return self._create_token(
             identity=identity,
             type_token="refresh",
-            exp_time=self._get_expired_time("refresh",expires_time),
+            exp_time=exp_time,
+            headers=headers,
+            audience=audience,
+            family=family,
+            config=config
+        )
+
+    def rotate_refresh_token(
+        self,
+        headers: Optional[Dict] = None,
+        expires_time: Optional[Union[timedelta,int,bool]] = None
+    ) -> bytes:
+        """
+        Replace the refresh token of the request with the next generation of its family,
+        call it after jwt_refresh_token_required. The new token keeps the identity and
+        audience of the current one, the current one can't be used anymore.
+
+        :return: hash token
+        """
+        config = self._config
+        families = config.refresh_families
+        if families is None:
+            raise RuntimeError("A RefreshTokenFamilies must be provided via "
+                "AuthJWT.load_refresh_token_families to rotate refresh tokens")
+
+        raw_token = self.get_raw_jwt()
+        if raw_token is None or raw_token['type'] != 'refresh':
+            raise HTTPException(status_code=422,detail="Only refresh tokens are allowed")
+
+        exp_time = self._get_expired_time("refresh",expires_time,config)
+        if 'fam' in raw_token:
+            generation = families.rotate(raw_token['fam'],raw_token['gen'],exp_time)
+            if generation is None:
+                raise HTTPException(status_code=401,detail="Token has been revoked")
+            family = (raw_token['fam'], generation)
+        else:
+            # token created before rotation was enabled, it starts a new family
+            family = compact_jwt_identifier()
+            family = (family, families.start(family,exp_time))
+
+        return self._create_token(
+            identity=raw_token['identity'],
+            type_token="refresh",
+            exp_time=exp_time,
             headers=headers,
-            audience=audience
+            audience=raw_token.get('aud'),
+            family=family,
+            config=config
         )
 
+    def refresh_access_token(
+        self,
+        fresh: Optional[bool] = False,
+        headers: Optional[Dict] = None,
+        expires_time: Optional[Union[timedelta,int,bool]] = None,
+        audience: Optional[Union[str,Sequence[str]]] = None,
+        scopes: Optional[Sequence[str]] = None
+    ) -> bytes:
+        """
+        Ensure the requester has a valid refresh token like jwt_refresh_token_required
+        and create an access token for its identity.
+
+        When AUTHJWT_REFRESH_COALESCE_WINDOW is set, requests presenting the same refresh token
+        with the same arguments within the window share the access token created by the first one, so the refresh
+        token is verified and checked against the blacklist once. Issued and shared tokens
+        are counted in metrics as 'refresh_issued' and 'refresh_coalesced'.
+
+        :return: hash token
+        """
+        config = self._config
+
+        def issue():
+            self._refresh_token_required(config)
+            access_token = self._create_token(
+                identity=self._raw_jwt['identity'],
+                type_token="access",
+                exp_time=self._get_expired_time("access",expires_time,config),
+                fresh=fresh,
+                headers=headers,
+                audience=audience,
+                issuer=config.encode_issuer,
+                scopes=scopes,
+                config=config
+            )
+            issued.append(access_token)
+            return access_token, self._raw_jwt
+
+        issued = []
+        cache = config._refreshes
+        if cache is None or not self._token:
+            access_token, raw_token = issue()
+        else:
+            # keyed by the refresh token itself and the arguments, nothing is decoded before
+            # the first request is done and calls asking for another token don't share it
+            key = (
+                self._token,
+                fresh,
+                expires_time,
+                audience if audience is None or isinstance(audience, str) else tuple(audience),
+                scopes if scopes is None else tuple(scopes),
+                json.dumps(headers,sort_keys=True,default=str) if headers else None
+            )
+            access_token, raw_token = cache.get_or_set(key,issue)
+            if not issued:
+                self._raw_jwt = raw_token
+                set_current_claims(self.get_jwt_claims())
+
+        metrics.increment('refresh_issued' if issued else 'refresh_coalesced')
+        return access_token
+
+    def _check_refresh_token_family(
+        self,
+        raw_token: Dict[str,Union[str,int,bool]],
+        config: Optional[AuthConfig] = None
+    ) -> None:
+        """
+        Reject refresh tokens replaced by a newer generation of their family, presenting
+        one means it was leaked so every token of the family is revoked
+        """
+        families = (config or self._config).refresh_families
+        if families is None or 'fam' not in raw_token:
+            return
+
+        from fastapi_jwt_auth.rotation import REUSED, VALID
+        status = families.check(raw_token['fam'],raw_token['gen'])
+        if status == REUSED:
+            families.revoke(raw_token['fam'])
+            raise HTTPException(status_code=401,detail="Refresh token reuse detected")
+        if status != VALID:
+            raise HTTPException(status_code=401,detail="Token has been revoked")
+
     def jwt_required(self) -> None:
         """
         Only access token can access this function
 
         :return: None
         """
+        config = self._config
         if self._token:
-            self._verifying_token(encoded_token=self._token,issuer=self._decode_issuer)
+            self._verifying_token(encoded_token=self._token,issuer=config.decode_issuer,config=config)
 
         if not self._token:
             raise HTTPException(status_code=401,detail="Missing Authorization Header")
@@ -326,6 +988,9 @@ class AuthJWT:
         if self.get_raw_jwt()['type'] != 'access':
             raise HTTPException(status_code=422,detail="Only access tokens are allowed")
 
+        self._renew_access_token(self.get_raw_jwt(),config)
+        set_current_claims(self.get_jwt_claims())
+
     def jwt_optional(self) -> None:
         """
         If an access token in present in the request you can get data from get_raw_jwt() or get_jwt_identity(),
@@ -334,20 +999,31 @@ class AuthJWT:
 
         :return: None
         """
+        config = self._config
         if self._token:
-            self._verifying_token(encoded_token=self._token,issuer=self._decode_issuer)
+            self._verifying_token(encoded_token=self._token,issuer=config.decode_issuer,config=config)
 
         if self._token and self.get_raw_jwt()['type'] != 'access':
             raise HTTPException(status_code=422,detail="Only access tokens are allowed")
 
+        if self._token:
+            self._renew_access_token(self.get_raw_jwt(),config)
+            set_current_claims(self.get_jwt_claims())
+
     def jwt_refresh_token_required(self) -> None:
         """
         This function will ensure that the requester has a valid refresh token
 
         :return: None
         """
+        self._refresh_token_required(self._config)
+
+    def _refresh_token_required(self, config: AuthConfig) -> None:
+        """
+        jwt_refresh_token_required with the configuration snapshot of the calling method
+        """
         if self._token:
-            self._verifying_token(encoded_token=self._token)
+            self._verifying_token(encoded_token=self._token,config=config)
 
         if not self._token:
             raise HTTPException(status_code=401,detail="Missing Authorization Header")
@@ -355,14 +1031,18 @@ class AuthJWT:
         if self.get_raw_jwt()['type'] != 'refresh':
             raise HTTPException(status_code=422,detail="Only refresh tokens are allowed")
 
+        self._check_refresh_token_family(self.get_raw_jwt(),config)
+        set_current_claims(self.get_jwt_claims())
+
     def fresh_jwt_required(self) -> None:
         """
         This function will ensure that the requester has a valid and fresh access token
 
         :return: None
         """
+        config = self._config
         if self._token:
-            self._verifying_token(encoded_token=self._token,issuer=self._decode_issuer)
+            self._verifying_token(encoded_token=self._token,issuer=config.decode_issuer,config=config)
 
         if not self._token:
             raise HTTPException(status_code=401,detail="Missing Authorization Header")
@@ -373,6 +1053,9 @@ class AuthJWT:
         if not self.get_raw_jwt()['fresh']:
             raise HTTPException(status_code=401,detail="Fresh token required")
 
+        self._renew_access_token(self.get_raw_jwt(),config)
+        set_current_claims(self.get_jwt_claims())
+
     def get_raw_jwt(self) -> Optional[Dict[str,Union[str,int,bool]]]:
         """
         this will return the python dictionary which has all of the claims of the JWT that is accessing the endpoint.
@@ -381,9 +1064,28 @@ class AuthJWT:
         :return: claims of JWT
         """
         if self._token:
+            if self._raw_jwt is not None:
+                return self._raw_jwt
             return self._verified_token(encoded_token=self._token)
         return None
 
+    def get_jwt_claims(self) -> Optional[Claims]:
+        """
+        this will return the claims of the JWT that is accessing the endpoint as a typed
+        read only view, e.g. claims.identity, claims.exp or claims['role'] for custom claims.
+        The view is built once per request, it's the one get_current_claims returns.
+        If no JWT is currently present, return None instead
+
+        :return: claims of JWT
+        """
+        raw_token = self.get_raw_jwt()
+        if raw_token is None:
+            return None
+        claims = self._claims
+        if claims is None or claims.raw is not raw_token:
+            claims = self._claims = Claims(raw_token)
+        return claims
+
     def get_jti(self,encoded_token: bytes) -> str:
         """
         Returns the JTI (unique identifier) of an encoded JWT
@@ -400,7 +1102,21 @@ class AuthJWT:
         :return: identity of JWT
         """
         if self._token:
-            return self._verified_token(encoded_token=self._token)['identity']
+            return self.get_raw_jwt()['identity']
+        return None
+
+    def get_jwt_scopes(self) -> Optional[List[str]]:
+        """
+        this will return the scopes granted to the JWT that is accessing this endpoint.
+        If no JWT is present, `None` is returned instead.
+
+        :return: scope names
+        """
+        if self._token:
+            config = self._config
+            if config.scopes is None:
+                raise RuntimeError("A ScopeTable must be provided via AuthJWT.load_scopes to read scopes")
+            return config.scopes.decode(self.get_raw_jwt().get('scp',0))
         return None
 
     def get_unverified_jwt_headers(self,encoded_token: Optional[bytes] = None) -> dict:
@@ -413,3 +1129,5 @@ class AuthJWT:
         encoded_token = encoded_token or self._token
 
         return jwt.get_unverified_header(encoded_token)
+
+register_after_fork(AuthJWT)
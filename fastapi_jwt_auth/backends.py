@@ -0,0 +1,52 @@
+import os, threading
+from typing import TYPE_CHECKING, Optional, Sequence
+
+if TYPE_CHECKING:
+    import sqlite3
+
+class SQLiteConnections:
+    """
+    Connections to a SQLite database file in WAL mode, one per thread since sqlite
+    connections can't be shared between threads nor inherited by a forked process
+    """
+    def __init__(self, path: str, schema: Optional[Sequence[str]] = ()):
+        """
+        :param path: database file, created when it doesn't exist
+        :param schema: statements creating the tables, run once when the file is opened
+        """
+        self.path = path
+        self._local = threading.local()
+
+        connection = self.get()
+        with connection:
+            for statement in schema:
+                connection.execute(statement)
+
+    def get(self) -> "sqlite3.Connection":
+        """
+        Connection of the current thread, opened again in a forked process
+        """
+        local = self._local
+        if getattr(local,'pid',None) != os.getpid():
+            # sqlite3 is only imported by the components storing in a database
+            import sqlite3
+            connection = sqlite3.connect(self.path,timeout=5,isolation_level=None,check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+def redis_client(client=None, url: Optional[str] = None, component: Optional[str] = "Redis"):
+    """
+    :param client: redis.Redis client, returned as is, or
+    :param url: url of the Redis server, e.g. redis://localhost:6379/0
+    :param component: name of the component in the error raised without the redis package
+    :return: redis.Redis client
+    """
+    if client is not None:
+        return client
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("{} requires redis, is redis installed?".format(component))
+    return redis.Redis.from_url(url or "redis://localhost:6379/0")
@@ -0,0 +1,165 @@
+import time, logging, threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from fastapi_jwt_auth.cache import TTLCache
+from fastapi_jwt_auth.fork import register_after_fork
+from fastapi_jwt_auth.metrics import metrics
+from typing import Callable, Dict, Optional, Union
+
+logger = logging.getLogger("fastapi_jwt_auth")
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+FAIL_CLOSED, FAIL_OPEN, STALE = 'fail-closed', 'fail-open', 'stale'
+
+class Unavailable(Exception):
+    """
+    The blacklist callback can't answer and the policy doesn't allow the token
+    """
+
+class CircuitBreaker:
+    """
+    Latency budget for the token_in_blacklist_loader callback. Each call runs on a
+    small thread pool and the request stops waiting after timeout seconds, after
+    failure_threshold slow or failed calls in a row the breaker opens and the callback
+    isn't called for reset_timeout seconds, then a single call tries it again.
+
+    When a call fails or the breaker is open the policy decides:
+    'fail-closed' rejects the token, 'fail-open' accepts it and 'stale' answers what
+    the callback last answered for the jti, tokens it never answered for are rejected.
+    """
+    def __init__(
+        self,
+        timeout: Optional[float] = 0.05,
+        failure_threshold: Optional[int] = 5,
+        reset_timeout: Optional[float] = 30,
+        policy: Optional[str] = FAIL_CLOSED,
+        stale_ttl: Optional[float] = 300,
+        stale_size: Optional[int] = 10000,
+        max_workers: Optional[int] = 8,
+        timer: Callable[[],float] = time.monotonic
+    ):
+        """
+        :param timeout: seconds a request waits for the callback
+        :param failure_threshold: slow or failed calls in a row that open the breaker
+        :param reset_timeout: seconds the breaker stays open before the callback is tried again
+        :param policy: 'fail-closed', 'fail-open' or 'stale'
+        :param stale_ttl: seconds an answer of the callback can be served while it's unavailable
+        :param stale_size: maximum number of answers remembered
+        :param max_workers: threads calling the callback
+        :param timer: monotonic clock in seconds
+        """
+        if not isinstance(timeout, (int, float)) or timeout <= 0:
+            raise TypeError("timeout must be a positive number")
+        if not isinstance(failure_threshold, int) or failure_threshold < 1:
+            raise TypeError("failure_threshold must be a positive integer")
+        if policy not in (FAIL_CLOSED,FAIL_OPEN,STALE):
+            raise ValueError("policy must be between 'fail-closed', 'fail-open' or 'stale'")
+
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.policy = policy
+        self.max_workers = max_workers
+        self._timer = timer
+        self._answers = TTLCache(stale_size,stale_ttl,timer=timer) if policy == STALE else None
+        self._executor = None
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = None
+        self._lock = threading.Lock()
+        register_after_fork(self)
+
+    def _after_fork(self) -> None:
+        # the threads of the pool don't exist in the child, it's created again on the next call
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def call(self, callback: Callable[...,bool], raw_token: Dict[str,Union[str,int,bool]]) -> bool:
+        """
+        Ask the callback if the token is revoked within the latency budget
+
+        :param callback: token_in_blacklist_loader callback
+        :param raw_token: claims of the token
+        :return: True when the token is revoked
+        :raise Unavailable: the callback can't answer and the policy rejects the token
+        """
+        if not self._allow():
+            metrics.increment('blacklist_breaker_rejected')
+            return self._fallback(raw_token)
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers,thread_name_prefix="authjwt-blacklist")
+
+        future = self._executor.submit(callback,raw_token)
+        try:
+            revoked = bool(future.result(self.timeout))
+        except TimeoutError:
+            # the call keeps its thread until it returns, only the request stops waiting
+            future.cancel()
+            metrics.increment('blacklist_timeouts')
+            self._failed()
+            return self._fallback(raw_token)
+        except Exception:
+            logger.exception("The token_in_blacklist_loader callback failed")
+            metrics.increment('blacklist_failures')
+            self._failed()
+            return self._fallback(raw_token)
+
+        self._succeeded()
+        if self._answers is not None and 'jti' in raw_token:
+            self._answers.set(raw_token['jti'],revoked)
+        return revoked
+
+    def reset(self) -> None:
+        """
+        Close the breaker and forget the failures
+        """
+        with self._lock:
+            self._set_state(CLOSED)
+            self._failures = 0
+
+    def _allow(self) -> bool:
+        if self._state == CLOSED:
+            return True
+        with self._lock:
+            if self._state == OPEN and self._timer() - self._opened_at >= self.reset_timeout:
+                # one request tries the callback, the others keep using the policy
+                self._set_state(HALF_OPEN)
+                return True
+        return False
+
+    def _succeeded(self) -> None:
+        if self._failures or self._state != CLOSED:
+            with self._lock:
+                self._failures = 0
+                self._set_state(CLOSED)
+
+    def _failed(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning("The token_in_blacklist_loader callback is unavailable, using the %s policy",self.policy)
+                    metrics.increment('blacklist_breaker_opened')
+                self._opened_at = self._timer()
+                self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        metrics.set('blacklist_breaker_open',int(state != CLOSED))
+
+    def _fallback(self, raw_token: Dict[str,Union[str,int,bool]]) -> bool:
+        if self.policy == FAIL_OPEN:
+            return False
+        if self.policy == STALE:
+            revoked = self._answers.get(raw_token.get('jti'))
+            if revoked is not None:
+                metrics.increment('blacklist_stale_served')
+                return revoked
+        raise Unavailable
@@ -0,0 +1,104 @@
+import time, threading
+from collections import OrderedDict
+from fastapi_jwt_auth.fork import register_after_fork
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Thread safe mapping bounded in size and time. Entries expire ttl seconds
+    after they're set, when the cache is full the oldest entry is evicted so
+    the memory used never grows past maxsize entries.
+    """
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[],float] = time.monotonic):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = {}
+        register_after_fork(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def _after_fork(self) -> None:
+        # a lock held by another thread of the parent is never released in the child
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key,_MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        if entry[0] <= self._timer():
+            with self._lock:
+                # may have been replaced since it was read
+                if self._data.get(key) is entry:
+                    del self._data[key]
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._set(key,value,ttl)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[],Any], ttl: Optional[float] = None) -> Any:
+        """
+        Returns the value of key, or calls factory once and caches its result. Concurrent
+        callers of the same key wait for the first one instead of calling factory themselves,
+        other keys are not blocked while factory runs.
+        """
+        value = self.get(key,_MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            lock = self._pending.setdefault(key,threading.Lock())
+
+        with lock:
+            value = self.get(key,_MISSING)
+            if value is not _MISSING:
+                return value
+            try:
+                value = factory()
+                self.set(key,value,ttl)
+            finally:
+                with self._lock:
+                    if self._pending.get(key) is lock:
+                        del self._pending[key]
+            return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key,None)
+        if entry is None or entry[0] <= self._timer():
+            return default
+        return entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def _set(self, key: Hashable, value: Any, ttl: Optional[float]) -> None:
+        now = self._timer()
+        data = self._data
+        data.pop(key,None)
+
+        # entries are kept in insertion order, drop expired ones from the front then the oldest when full
+        while data:
+            oldest = next(iter(data.values()))
+            if oldest[0] > now and len(data) < self.maxsize:
+                break
+            data.popitem(last=False)
+
+        data[key] = (now + (self.ttl if ttl is None else ttl), value)
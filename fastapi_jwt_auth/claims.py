@@ -0,0 +1,110 @@
+import os
+from base64 import urlsafe_b64encode
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Sequence, Union
+
+# compact claim profile: short claim names, integer token types, no nbf when it
+# equals iat and 22 chars jti, tokens are expanded back to the default names
+# after verification so get_raw_jwt() looks the same for both profiles
+TOKEN_TYPES = ('access','refresh')
+TOKEN_TYPE_CODES = {type_token: code for code, type_token in enumerate(TOKEN_TYPES)}
+
+def compact_jwt_identifier() -> str:
+    return urlsafe_b64encode(os.urandom(16)).rstrip(b'=').decode('ascii')
+
+def compact_claims(claims: Dict[str,Union[str,int,bool]]) -> Dict[str,Union[str,int,bool]]:
+    """
+    Convert claims of the default profile to the compact profile
+
+    :param claims: claims with identity, type and fresh
+    :return: compact claims
+    """
+    compact = {key: value for key, value in claims.items() if key not in ('identity','type','fresh','nbf')}
+    if claims.get('nbf') != claims.get('iat'):
+        compact['nbf'] = claims['nbf']
+
+    compact['i'] = claims['identity']
+    compact['t'] = TOKEN_TYPE_CODES[claims['type']]
+    if claims.get('fresh'):
+        compact['f'] = 1
+    return compact
+
+def is_compact(claims: Dict[str,Union[str,int,bool]]) -> bool:
+    return 't' in claims and 'type' not in claims
+
+def expand_claims(claims: Dict[str,Union[str,int,bool]]) -> Dict[str,Union[str,int,bool]]:
+    """
+    Convert claims of the compact profile to the default profile
+
+    :param claims: compact claims
+    :return: claims with identity, type and fresh
+    """
+    expanded = {key: value for key, value in claims.items() if key not in ('i','t','f')}
+    if 'nbf' not in expanded and 'iat' in expanded:
+        expanded['nbf'] = expanded['iat']
+
+    expanded['identity'] = claims.get('i')
+    expanded['type'] = TOKEN_TYPES[claims['t']] if claims['t'] in (0,1) else None
+    if expanded['type'] == 'access':
+        expanded['fresh'] = bool(claims.get('f'))
+    return expanded
+
+class Claims(Mapping):
+    """
+    Read only view of verified claims. The registered claims and identity, type and
+    fresh are attributes, every claim including the custom ones can be read like a
+    dict, e.g. claims.identity or claims['role']. The claims aren't copied, the view
+    wraps the dict returned by get_raw_jwt().
+    """
+    __slots__ = ('identity','type','fresh','jti','iss','sub','aud','iat','nbf','exp','_claims')
+
+    identity: Union[str,int]
+    type: str
+    fresh: bool
+    jti: Optional[str]
+    iss: Optional[str]
+    sub: Optional[str]
+    aud: Optional[Union[str,Sequence[str]]]
+    iat: Optional[int]
+    nbf: Optional[int]
+    exp: Optional[int]
+
+    def __init__(self, claims: Dict[str,Union[str,int,bool]]):
+        """
+        :param claims: claims of a verified token in the default profile
+        """
+        get, assign = claims.get, object.__setattr__
+        assign(self,'_claims',claims)
+        assign(self,'identity',get('identity'))
+        assign(self,'type',get('type'))
+        assign(self,'fresh',bool(get('fresh')))
+        for name in ('jti','iss','sub','aud','iat','nbf','exp'):
+            assign(self,name,get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Claims are read only")
+
+    def __delattr__(self, name):
+        raise AttributeError("Claims are read only")
+
+    def __getitem__(self, key: str) -> Any:
+        return self._claims[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._claims
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._claims)
+
+    def __len__(self) -> int:
+        return len(self._claims)
+
+    def __repr__(self):
+        return "Claims({!r})".format(self._claims)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._claims.get(key,default)
+
+    @property
+    def raw(self) -> Dict[str,Union[str,int,bool]]:
+        return self._claims
@@ -0,0 +1,74 @@
+import jwt, zlib
+from jwt.utils import base64url_encode
+from typing import Dict, Union, Sequence, Optional, Any
+
+# raw DEFLATE (RFC 1951) like the JOSE "zip": "DEF" header
+_WBITS = -15
+
+def deflate(payload: bytes) -> bytes:
+    compressor = zlib.compressobj(9,zlib.DEFLATED,_WBITS)
+    return compressor.compress(payload) + compressor.flush()
+
+def inflate(data: bytes, max_size: int) -> bytes:
+    """
+    Decompress a payload, never more than max_size bytes are produced so a
+    small token can't expand into a huge payload (zip bomb)
+
+    :param data: compressed payload
+    :param max_size: maximum size of the decompressed payload
+    :return: decompressed payload
+    """
+    decompressor = zlib.decompressobj(_WBITS)
+    try:
+        payload = decompressor.decompress(data,max_size + 1)
+    except zlib.error:
+        raise jwt.DecodeError("Invalid compressed payload")
+
+    if len(payload) > max_size or decompressor.unconsumed_tail:
+        raise jwt.DecodeError("Decompressed payload is too large")
+    if not decompressor.eof:
+        raise jwt.DecodeError("Invalid compressed payload")
+    return payload
+
+def encode_compressed(
+    payload: bytes,
+    key: Any,
+    algorithm: str,
+    headers: Optional[Dict] = None
+) -> Union[str,bytes]:
+    """
+    Sign the DEFLATE compressed payload, the JOSE header gets "zip": "DEF"
+
+    :param payload: JSON encoded claims
+    :return: Encoded token
+    """
+    return jwt.api_jws.encode(deflate(payload),key,algorithm=algorithm,headers=dict(headers or {},zip='DEF'))
+
+def decode_compressed(
+    encoded_token: Union[str,bytes],
+    key: Any,
+    algorithms: Sequence[str],
+    max_size: int,
+    **kwargs
+) -> Dict[str,Any]:
+    """
+    Verify the signature of a compressed token and only then decompress the
+    payload and validate its claims (exp, nbf, iat, iss, aud) like jwt.decode
+
+    :param encoded_token: Encoded token with "zip": "DEF" header
+    :param kwargs: issuer, audience and leeway passed to jwt.decode
+    :return: claims as a dictionary
+    """
+    payload = inflate(jwt.api_jws.decode(encoded_token,key,algorithms=algorithms),max_size)
+
+    # signature is already verified, let PyJWT validate the claims of the decompressed payload
+    unsigned = b'e30.' + base64url_encode(payload) + b'.'
+    options = {
+        'verify_signature': False,
+        'verify_exp': True,
+        'verify_nbf': True,
+        'verify_iat': True,
+        'verify_aud': True,
+        'verify_iss': True,
+    }
+    return jwt.decode(unsigned,algorithms=algorithms,options=options,**kwargs)
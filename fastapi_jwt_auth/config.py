@@ -2,6 +2,7 @@ from pydantic import BaseModel, root_validator, validator
 from typing import Optional, Union, Sequence, List
 from types import GeneratorType
 from datetime import timedelta
+from fastapi_jwt_auth.cache import TTLCache
 
 class LoadSettings(BaseModel):
     authjwt_secret_key: Optional[str] = None
@@ -15,6 +16,16 @@ class LoadSettings(BaseModel):
     authjwt_blacklist_token_checks: Optional[Sequence[str]] = []
     authjwt_access_token_expires: Optional[Union[int,timedelta]] = timedelta(minutes=15)
     authjwt_refresh_token_expires: Optional[Union[int,timedelta]] = timedelta(days=30)
+    authjwt_claims_profile: Optional[str] = 'default'
+    authjwt_compression_threshold: Optional[int] = None
+    authjwt_max_decompressed_size: Optional[int] = None
+    authjwt_renewal_window: Optional[Union[int,timedelta]] = None
+    authjwt_renewal_header: Optional[str] = "X-Access-Token"
+    authjwt_refresh_coalesce_window: Optional[Union[int,timedelta]] = None
+    authjwt_max_token_length: Optional[int] = None
+    authjwt_early_expiry_check: Optional[bool] = False
+    authjwt_negative_cache_ttl: Optional[Union[int,timedelta]] = None
+    authjwt_negative_cache_size: Optional[int] = None
 
     @root_validator(pre=True)
     def validate_blacklist_enabled(cls, values):
@@ -29,6 +40,16 @@ class LoadSettings(BaseModel):
         _blacklist_token_checks = values.get("authjwt_blacklist_token_checks")
         _access_token_expires = values.get("authjwt_access_token_expires")
         _refresh_token_expires = values.get("authjwt_refresh_token_expires")
+        _claims_profile = values.get("authjwt_claims_profile")
+        _compression_threshold = values.get("authjwt_compression_threshold")
+        _max_decompressed_size = values.get("authjwt_max_decompressed_size")
+        _renewal_window = values.get("authjwt_renewal_window")
+        _renewal_header = values.get("authjwt_renewal_header")
+        _refresh_coalesce_window = values.get("authjwt_refresh_coalesce_window")
+        _max_token_length = values.get("authjwt_max_token_length")
+        _early_expiry_check = values.get("authjwt_early_expiry_check")
+        _negative_cache_ttl = values.get("authjwt_negative_cache_ttl")
+        _negative_cache_size = values.get("authjwt_negative_cache_size")
 
         if _secret_key and not isinstance(_secret_key, str):
             raise TypeError("The 'AUTHJWT_SECRET_KEY' must be a string")
@@ -69,6 +90,39 @@ class LoadSettings(BaseModel):
         if _refresh_token_expires and not isinstance(_refresh_token_expires, (timedelta, int)):
             raise TypeError("The 'AUTHJWT_REFRESH_TOKEN_EXPIRES' must be a timedelta or integer")
 
+        if _claims_profile and _claims_profile not in ['default','compact']:
+            raise TypeError("The 'AUTHJWT_CLAIMS_PROFILE' must be between 'default' or 'compact'")
+
+        if _compression_threshold is not None and not isinstance(_compression_threshold, int):
+            raise TypeError("The 'AUTHJWT_COMPRESSION_THRESHOLD' must be an integer")
+
+        if _max_decompressed_size is not None and not isinstance(_max_decompressed_size, int):
+            raise TypeError("The 'AUTHJWT_MAX_DECOMPRESSED_SIZE' must be an integer")
+
+        if _compression_threshold is not None and not _max_decompressed_size:
+            raise TypeError("The 'AUTHJWT_MAX_DECOMPRESSED_SIZE' must be set when 'AUTHJWT_COMPRESSION_THRESHOLD' is set")
+
+        if _renewal_window and not isinstance(_renewal_window, (timedelta, int)):
+            raise TypeError("The 'AUTHJWT_RENEWAL_WINDOW' must be a timedelta or integer")
+
+        if _renewal_header and not isinstance(_renewal_header, str):
+            raise TypeError("The 'AUTHJWT_RENEWAL_HEADER' must be a string")
+
+        if _refresh_coalesce_window and not isinstance(_refresh_coalesce_window, (timedelta, int)):
+            raise TypeError("The 'AUTHJWT_REFRESH_COALESCE_WINDOW' must be a timedelta or integer")
+
+        if _max_token_length is not None and not isinstance(_max_token_length, int):
+            raise TypeError("The 'AUTHJWT_MAX_TOKEN_LENGTH' must be an integer")
+
+        if _early_expiry_check is not None and not isinstance(_early_expiry_check, bool):
+            raise TypeError("The 'AUTHJWT_EARLY_EXPIRY_CHECK' must be a boolean")
+
+        if _negative_cache_ttl and not isinstance(_negative_cache_ttl, (timedelta, int)):
+            raise TypeError("The 'AUTHJWT_NEGATIVE_CACHE_TTL' must be a timedelta or integer")
+
+        if _negative_cache_size is not None and (not isinstance(_negative_cache_size, int) or _negative_cache_size < 1):
+            raise TypeError("The 'AUTHJWT_NEGATIVE_CACHE_SIZE' must be a positive integer")
+
         return values
 
     @validator('authjwt_blacklist_token_checks', each_item=True)
@@ -81,3 +135,126 @@ class LoadSettings(BaseModel):
     class Config:
         min_anystr_length = 1
         anystr_strip_whitespace = True
+
+class AuthConfig:
+    """
+    Immutable snapshot of the configuration used by AuthJWT. Values are resolved
+    once when the snapshot is built (expirations as seconds, blacklist token checks
+    as frozenset, decode algorithms as tuple) so the hot path only reads attributes,
+    and swapping the whole configuration is a single reference assignment.
+    """
+    _fields = {
+        'secret_key': None,
+        'algorithm': "HS256",
+        'decode_algorithms': ("HS256",),
+        'decode_leeway': 0,
+        'encode_issuer': None,
+        'decode_issuer': None,
+        'decode_audience': None,
+        'blacklist_enabled': False,
+        'blacklist_token_checks': frozenset(),
+        'access_token_expires': 900,
+        'refresh_token_expires': 2592000,
+        'compact_claims': False,
+        'compression_threshold': None,
+        'max_decompressed_size': None,
+        'renewal_window': None,
+        'renewal_header': "X-Access-Token",
+        'refresh_coalesce_window': None,
+        'max_token_length': None,
+        'early_expiry_check': False,
+        'negative_cache_ttl': None,
+        'negative_cache_size': None,
+        'tenants': None,
+        'keyring': None,
+        'scopes': None,
+        'refresh_families': None,
+        'rate_limiter': None,
+        'revocation_bus': None,
+        'revocation_store': None,
+        'blacklist_breaker': None,
+    }
+
+    # maximum number of tokens remembered by the caches of a snapshot
+    _cache_size = 10000
+
+    # caches belong to a snapshot, they're built empty with it and dropped with it
+    __slots__ = tuple(_fields) + ('_renewals','_refreshes','_rejections')
+
+    def __init__(self, **values):
+        unknown = set(values) - set(self._fields)
+        if unknown:
+            raise TypeError("Unknown config field(s): {}".format(", ".join(sorted(unknown))))
+
+        for name, default in self._fields.items():
+            object.__setattr__(self, name, values.get(name, default))
+
+        object.__setattr__(self, '_renewals',
+            TTLCache(self._cache_size,self.renewal_window) if self.renewal_window else None)
+        object.__setattr__(self, '_refreshes',
+            TTLCache(self._cache_size,self.refresh_coalesce_window) if self.refresh_coalesce_window else None)
+        object.__setattr__(self, '_rejections',
+            TTLCache(self.negative_cache_size or self._cache_size,self.negative_cache_ttl)
+            if self.negative_cache_ttl else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AuthConfig is immutable, use replace() to build a new one")
+
+    def __delattr__(self, name):
+        raise AttributeError("AuthConfig is immutable, use replace() to build a new one")
+
+    def __repr__(self):
+        values = ", ".join(
+            "{}={!r}".format(name, '***' if name == 'secret_key' and getattr(self,name) else getattr(self,name))
+            for name in self._fields
+        )
+        return "AuthConfig({})".format(values)
+
+    def replace(self, **changes) -> "AuthConfig":
+        """
+        Return a new snapshot with the given fields changed, the current one is left untouched
+        """
+        values = {name: getattr(self,name) for name in self._fields}
+        values.update(changes)
+        return type(self)(**values)
+
+    @classmethod
+    def from_settings(cls, settings: LoadSettings, base: Optional["AuthConfig"] = None) -> "AuthConfig":
+        """
+        Build a snapshot from validated settings, fields that don't come from
+        settings are taken from base when it's given
+
+        :param settings: validated LoadSettings
+        :param base: snapshot to inherit the remaining fields from
+        :return: new AuthConfig
+        """
+        algorithm = settings.authjwt_algorithm
+
+        return (base or cls()).replace(
+            secret_key=settings.authjwt_secret_key,
+            algorithm=algorithm,
+            decode_algorithms=tuple(settings.authjwt_decode_algorithms or [algorithm]),
+            decode_leeway=_to_seconds(settings.authjwt_decode_leeway),
+            encode_issuer=settings.authjwt_encode_issuer,
+            decode_issuer=settings.authjwt_decode_issuer,
+            decode_audience=settings.authjwt_decode_audience,
+            blacklist_enabled=settings.authjwt_blacklist_enabled == 'true',
+            blacklist_token_checks=frozenset(settings.authjwt_blacklist_token_checks or ()),
+            access_token_expires=_to_seconds(settings.authjwt_access_token_expires),
+            refresh_token_expires=_to_seconds(settings.authjwt_refresh_token_expires),
+            compact_claims=settings.authjwt_claims_profile == 'compact',
+            compression_threshold=settings.authjwt_compression_threshold,
+            max_decompressed_size=settings.authjwt_max_decompressed_size,
+            renewal_window=_to_seconds(settings.authjwt_renewal_window) or None,
+            renewal_header=settings.authjwt_renewal_header,
+            refresh_coalesce_window=_to_seconds(settings.authjwt_refresh_coalesce_window) or None,
+            max_token_length=settings.authjwt_max_token_length,
+            early_expiry_check=bool(settings.authjwt_early_expiry_check),
+            negative_cache_ttl=_to_seconds(settings.authjwt_negative_cache_ttl) or None,
+            negative_cache_size=settings.authjwt_negative_cache_size,
+        )
+
+def _to_seconds(value: Union[int,timedelta,None]) -> int:
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    return value or 0
@@ -0,0 +1,27 @@
+from contextvars import ContextVar
+from fastapi_jwt_auth.claims import Claims
+from typing import Optional, Union
+
+# claims of the token verified in the current request, every asyncio task and
+# threadpool call runs in its own copy of the context so requests don't leak.
+# The contextvars backport of python 3.6 isn't aware of asyncio tasks, there the
+# claims of concurrent async requests are shared, it needs python 3.7 or newer
+_current_claims = ContextVar("authjwt_claims",default=None)
+
+def set_current_claims(claims: Optional[Claims]) -> None:
+    _current_claims.set(claims)
+
+def get_current_claims() -> Optional[Claims]:
+    """
+    Returns the claims verified by a *_required call in the current request, the same
+    Claims view as get_jwt_claims() and get_request_claims, None when no token was verified
+    """
+    return _current_claims.get()
+
+def get_current_identity() -> Optional[Union[str,int]]:
+    """
+    Returns the identity verified by a *_required call in the current request,
+    None when no token was verified
+    """
+    claims = _current_claims.get()
+    return claims.identity if claims is not None else None
@@ -0,0 +1,25 @@
+import os, logging, weakref
+
+logger = logging.getLogger("fastapi_jwt_auth")
+
+# objects holding locks, threads or sockets that a forked worker can't inherit as is
+_objects = weakref.WeakSet()
+
+def register_after_fork(obj: object) -> None:
+    """
+    Call obj._after_fork() in the child process after a fork, e.g. in every gunicorn
+    worker when the application is preloaded. The object is held weakly.
+
+    :param obj: object with an _after_fork method
+    """
+    _objects.add(obj)
+
+def _after_fork() -> None:
+    for obj in list(_objects):
+        try:
+            obj._after_fork()
+        except Exception:
+            logger.exception("Resetting %r after fork failed",obj)
+
+if hasattr(os,'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
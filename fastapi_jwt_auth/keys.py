@@ -0,0 +1,346 @@
+import jwt, json, binascii
+from jwt.utils import base64url_decode
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Union, Sequence, NamedTuple, Any
+
+def prepare_key(key: Any, algorithm: str) -> Any:
+    """
+    Parse the key once for the given algorithm, e.g. PEM string to RSA/EC key
+    object or secret string to bytes, so the verifier doesn't redo it per request
+
+    :param key: secret or PEM encoded key
+    :param algorithm: algorithm the key is used with
+    :return: key ready to be passed to jwt.encode/jwt.decode
+    """
+    algorithms = jwt.algorithms.get_default_algorithms()
+    if algorithm not in algorithms:
+        raise ValueError("Algorithm {} is not supported, is cryptography installed?".format(algorithm))
+
+    return algorithms[algorithm].prepare_key(key)
+
+def unverified_claims(encoded_token: Union[str,bytes]) -> Dict[str,Any]:
+    """
+    Returns the payload of an encoded JWT without verifying the signature,
+    only use it to route the token to the right verifier
+
+    :param encoded_token: The encoded JWT
+    :return: claims as a dictionary
+    """
+    if isinstance(encoded_token, str):
+        encoded_token = encoded_token.encode('utf-8')
+
+    try:
+        claims = json.loads(base64url_decode(encoded_token.split(b'.')[1]).decode('utf-8'))
+    except (IndexError, ValueError, TypeError, binascii.Error):
+        raise jwt.DecodeError("Invalid payload padding")
+
+    if not isinstance(claims, dict):
+        raise jwt.DecodeError("Invalid payload string: must be a json object")
+    return claims
+
+class Tenant(NamedTuple):
+    issuer: str
+    key: Any
+    algorithm: str
+    kid: Optional[str] = None
+    audience: Optional[Union[str,Sequence[str]]] = None
+    leeway: int = 0
+
+    @property
+    def algorithms(self) -> Sequence[str]:
+        return (self.algorithm,)
+
+class TenantRegistry:
+    """
+    Maps the issuer and kid of a token to the tenant that signed it. Keys are
+    parsed when a tenant is registered, resolving a token is one header parse
+    and a dict lookup no matter how many tenants are registered.
+
+    Registering builds new lookup tables and swaps them in, so readers never
+    see a half registered tenant.
+    """
+    def __init__(self):
+        self._by_issuer = {}
+        self._by_kid = {}
+
+    def __len__(self):
+        return len(self._by_issuer)
+
+    def __contains__(self, issuer: str) -> bool:
+        return issuer in self._by_issuer
+
+    @property
+    def algorithms(self) -> frozenset:
+        return frozenset(tenant.algorithm for tenant in self._by_issuer.values())
+
+    def register(
+        self,
+        issuer: str,
+        key: Any,
+        algorithm: Optional[str] = "HS256",
+        kid: Optional[str] = None,
+        audience: Optional[Union[str,Sequence[str]]] = None,
+        leeway: Optional[int] = 0
+    ) -> Tenant:
+        """
+        Register a tenant that signs its tokens with the given key and issuer
+
+        :param issuer: value of the iss claim in the tenant tokens
+        :param key: secret for HS* or public key for asymmetric algorithms
+        :param algorithm: algorithm the tenant signs with
+        :param kid: optional key identifier found in the tenant token headers
+        :param audience: expected audience in the tenant tokens
+        :param leeway: leeway in seconds when checking the time claims
+
+        :return: registered tenant
+        """
+        if not issuer or not isinstance(issuer, str):
+            raise TypeError("issuer must be a string")
+        if not isinstance(algorithm, str):
+            raise TypeError("algorithm must be a string")
+        if kid is not None and not isinstance(kid, str):
+            raise TypeError("kid must be a string")
+        if not isinstance(leeway, int):
+            raise TypeError("leeway must be an integer")
+        if kid is not None and kid in self._by_kid and self._by_kid[kid].issuer != issuer:
+            raise ValueError("kid {} is already registered for another issuer".format(kid))
+
+        tenant = Tenant(
+            issuer=issuer,
+            key=prepare_key(key,algorithm),
+            algorithm=algorithm,
+            kid=kid,
+            audience=audience,
+            leeway=leeway
+        )
+
+        by_issuer = dict(self._by_issuer)
+        by_kid = {k: t for k, t in self._by_kid.items() if t.issuer != issuer}
+        by_issuer[issuer] = tenant
+        if kid is not None:
+            by_kid[kid] = tenant
+
+        self._by_issuer, self._by_kid = by_issuer, by_kid
+        return tenant
+
+    def unregister(self, issuer: str) -> None:
+        self._by_kid = {k: t for k, t in self._by_kid.items() if t.issuer != issuer}
+        self._by_issuer = {i: t for i, t in self._by_issuer.items() if i != issuer}
+
+    def resolve(self, encoded_token: Union[str,bytes], header: Optional[Dict[str,Any]] = None) -> Tenant:
+        """
+        Find the tenant of an encoded JWT from the kid header, or from the
+        unverified iss claim when the token has no known kid. Compressed
+        tokens can only be resolved from their kid.
+
+        :param encoded_token: The encoded JWT
+        :param header: header of the token when it's already parsed
+        :return: tenant which key and policy must be used to verify the token
+        """
+        if header is None:
+            header = jwt.get_unverified_header(encoded_token)
+
+        by_kid = self._by_kid
+        kid = header.get('kid')
+        if kid is not None and kid in by_kid:
+            return by_kid[kid]
+
+        tenant = self._by_issuer.get(unverified_claims(encoded_token).get('iss'))
+        if tenant is None:
+            raise jwt.InvalidIssuerError("Unknown token issuer")
+        return tenant
+
+class KeyringEntry(NamedTuple):
+    kid: str
+    algorithm: str
+    signing_key: Any
+    verifying_key: Any
+    retire_at: Optional[int] = None
+
+    @property
+    def algorithms(self) -> Sequence[str]:
+        return (self.algorithm,)
+
+class Keyring:
+    """
+    Set of keys identified by kid, one of them is the active key used to sign
+    new tokens (its kid is stamped in the JWT header), the others only verify
+    tokens signed before a rotation until their retirement time.
+
+    Lookups are a dict access, retired keys are pruned on the first lookup after
+    the earliest retirement time. Changes build a new table and swap it in.
+    """
+    def __init__(self):
+        self._keys = {}
+        self._active = None
+        self._next_retirement = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, kid: str) -> bool:
+        return self.get(kid) is not None
+
+    @property
+    def active(self) -> Optional[KeyringEntry]:
+        return self._keys.get(self._active)
+
+    @property
+    def algorithms(self) -> frozenset:
+        return frozenset(entry.algorithm for entry in self._keys.values())
+
+    def add_key(
+        self,
+        kid: str,
+        key: Any,
+        algorithm: Optional[str] = "HS256",
+        retire_at: Optional[Union[datetime,timedelta,int]] = None,
+        active: Optional[bool] = False
+    ) -> KeyringEntry:
+        """
+        Add a key to the keyring, a secret for HS* algorithms, a private key to
+        sign and verify or a public key to only verify for asymmetric algorithms
+
+        :param kid: key identifier stamped in the header of the tokens it signs
+        :param key: secret or PEM encoded key
+        :param algorithm: algorithm the key is used with
+        :param retire_at: when the key stops verifying tokens, datetime, seconds since the
+                          Epoch or timedelta from now. None keeps the key until it's removed
+        :param active: sign new tokens with this key
+
+        :return: added key
+        """
+        if not kid or not isinstance(kid, str):
+            raise TypeError("kid must be a string")
+        if not isinstance(algorithm, str):
+            raise TypeError("algorithm must be a string")
+        if retire_at is not None and not isinstance(retire_at, (datetime,timedelta,int)):
+            raise TypeError("retire_at must be between datetime, timedelta or integer")
+
+        prepared = prepare_key(key,algorithm)
+        if algorithm.startswith('HS'):
+            signing_key, verifying_key = prepared, prepared
+        elif hasattr(prepared, 'public_key'):
+            signing_key, verifying_key = prepared, prepared.public_key()
+        else:
+            signing_key, verifying_key = None, prepared
+
+        if active and signing_key is None:
+            raise ValueError("Key {} can't be active, a private key is required to sign tokens".format(kid))
+
+        entry = KeyringEntry(
+            kid=kid,
+            algorithm=algorithm,
+            signing_key=signing_key,
+            verifying_key=verifying_key,
+            retire_at=self._get_retire_time(retire_at)
+        )
+
+        keys = dict(self._keys)
+        keys[kid] = entry
+        self._swap(keys, kid if active else self._active)
+        return entry
+
+    def set_active(self, kid: str) -> KeyringEntry:
+        """
+        Sign new tokens with an existing key of the keyring
+
+        :param kid: key identifier
+        :return: active key
+        """
+        entry = self.get(kid)
+        if entry is None:
+            raise KeyError(kid)
+        if entry.signing_key is None:
+            raise ValueError("Key {} can't be active, a private key is required to sign tokens".format(kid))
+
+        self._swap(self._keys, kid)
+        return entry
+
+    def retire(self, kid: str, retire_at: Optional[Union[datetime,timedelta,int]] = None) -> None:
+        """
+        Stop verifying tokens signed with a key at the given time, or now when
+        no time is given. The active key can't be retired, rotate it first.
+
+        :param kid: key identifier
+        :param retire_at: when the key stops verifying tokens
+        """
+        if kid == self._active:
+            raise ValueError("The active key {} can't be retired".format(kid))
+        if kid not in self._keys:
+            raise KeyError(kid)
+
+        keys = dict(self._keys)
+        if retire_at is None:
+            del keys[kid]
+        else:
+            keys[kid] = keys[kid]._replace(retire_at=self._get_retire_time(retire_at))
+        self._swap(keys, self._active)
+
+    def rotate(
+        self,
+        kid: str,
+        key: Any,
+        algorithm: Optional[str] = "HS256",
+        retire_after: Optional[Union[timedelta,int]] = timedelta(days=30)
+    ) -> KeyringEntry:
+        """
+        Add a new active key, the previous active key keeps verifying tokens
+        for retire_after, usually the lifetime of the longest token it signed
+
+        :param kid: key identifier of the new key
+        :param key: secret or PEM encoded private key
+        :param algorithm: algorithm the key is used with
+        :param retire_after: how long the previous key keeps verifying tokens, None keeps
+                             it until it's retired like add_key and 0 removes it now
+
+        :return: new active key
+        """
+        previous = self._active
+        entry = self.add_key(kid,key,algorithm=algorithm,active=True)
+        if isinstance(retire_after, int):
+            retire_after = timedelta(seconds=retire_after)
+        if previous is not None and previous != kid and retire_after is not None:
+            # retire without a time removes the key right away
+            self.retire(previous,retire_at=retire_after or None)
+        return entry
+
+    def get(self, kid: str) -> Optional[KeyringEntry]:
+        """
+        Returns the key with the given identifier, None when it doesn't exist or is retired
+
+        :param kid: key identifier
+        :return: key or None
+        """
+        if self._next_retirement is not None and self._now() >= self._next_retirement:
+            self.prune()
+        return self._keys.get(kid)
+
+    def prune(self) -> None:
+        """
+        Remove every key which retirement time has passed
+        """
+        now = self._now()
+        keys = {
+            kid: entry for kid, entry in self._keys.items()
+            if entry.retire_at is None or entry.retire_at > now or kid == self._active
+        }
+        self._swap(keys, self._active)
+
+    def _swap(self, keys: Dict[str,KeyringEntry], active: Optional[str]) -> None:
+        retirements = [
+            entry.retire_at for kid, entry in keys.items()
+            if entry.retire_at is not None and kid != active
+        ]
+        self._keys, self._active = keys, active
+        self._next_retirement = min(retirements) if retirements else None
+
+    def _get_retire_time(self, retire_at: Optional[Union[datetime,timedelta,int]]) -> Optional[int]:
+        if isinstance(retire_at, datetime):
+            return int(retire_at.timestamp())
+        if isinstance(retire_at, timedelta):
+            return self._now() + int(retire_at.total_seconds())
+        return retire_at
+
+    def _now(self) -> int:
+        return int(datetime.now(timezone.utc).timestamp())
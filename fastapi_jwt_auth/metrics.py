@@ -0,0 +1,41 @@
+import threading
+from fastapi_jwt_auth.fork import register_after_fork
+from typing import Dict
+
+class Metrics:
+    """
+    Thread safe counters of what the extension does, e.g. how many access tokens
+    were issued or shared by coalesced refreshes, and gauges of its state. Read them with snapshot() and
+    export them to the monitoring system of the application.
+    """
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+        register_after_fork(self)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name,0) + value
+
+    def set(self, name: str, value: int) -> None:
+        """
+        Set a gauge, e.g. whether a circuit breaker is open
+        """
+        with self._lock:
+            self._counters[name] = value
+
+    def get(self, name: str) -> int:
+        return self._counters.get(name,0)
+
+    def snapshot(self) -> Dict[str,int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+metrics = Metrics()
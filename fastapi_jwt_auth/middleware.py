@@ -0,0 +1,101 @@
+from fastapi import HTTPException
+from fastapi_jwt_auth.auth_jwt import AuthJWT
+from fastapi_jwt_auth.claims import Claims
+from fastapi_jwt_auth.context import set_current_claims
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, Sequence, Tuple
+
+STATE_KEY = "authjwt_claims"
+
+class AuthJWTMiddleware:
+    """
+    ASGI middleware that verifies the token once at the edge of the application.
+    Each rule maps a path prefix to the token it requires, the longest matching
+    prefix wins and paths without a rule are passed through untouched.
+
+    Requirements are the same as the AuthJWT methods:
+    'access' (jwt_required), 'fresh' (fresh_jwt_required),
+    'refresh' (jwt_refresh_token_required) and 'optional' (jwt_optional).
+
+    The claims of a valid token are stored in scope["state"] and can be read with the
+    get_request_claims dependency, invalid requests are answered before routing.
+    """
+    _requirements = {
+        'access': 'jwt_required',
+        'fresh': 'fresh_jwt_required',
+        'refresh': 'jwt_refresh_token_required',
+        'optional': 'jwt_optional',
+    }
+
+    def __init__(self, app, rules: Sequence[Tuple[str,str]] = (), auth_class: Optional[type] = AuthJWT):
+        """
+        :param app: ASGI application
+        :param rules: sequence of (path prefix, requirement)
+        :param auth_class: AuthJWT or a subclass with its own configuration
+        """
+        self.app = app
+        self.auth_class = auth_class
+
+        compiled = []
+        for prefix, requirement in rules:
+            if not isinstance(prefix, str) or not prefix.startswith('/'):
+                raise TypeError("The path prefix must be a string starting with '/'")
+            if requirement not in self._requirements:
+                raise ValueError("The requirement must be between {}".format(", ".join(self._requirements)))
+            prefix = prefix.rstrip('/')
+            compiled.append((prefix, prefix + '/', self._requirements[requirement]))
+
+        # longest prefix first, so the most specific rule matches
+        self.rules = sorted(compiled,key=lambda rule: len(rule[0]),reverse=True)
+
+    def _match(self, path: str) -> Optional[str]:
+        for prefix, directory, method in self.rules:
+            if path == prefix or path.startswith(directory):
+                return method
+        return None
+
+    def _authenticate(self, authorization: Optional[str], method: str) -> Optional[Claims]:
+        Authorize = self.auth_class(authorization)
+        getattr(Authorize,method)()
+        return Authorize.get_jwt_claims()
+
+    async def __call__(self, scope, receive, send):
+        method = self._match(scope['path']) if scope['type'] == 'http' else None
+        if method is None:
+            await self.app(scope, receive, send)
+            return
+
+        authorization = None
+        for name, value in scope['headers']:
+            if name == b'authorization':
+                authorization = value.decode('latin-1')
+                break
+
+        try:
+            if self.auth_class._config.blacklist_enabled:
+                # the blacklist callback may block on its store, keep it off the event loop
+                claims = await run_in_threadpool(self._authenticate,authorization,method)
+            else:
+                claims = self._authenticate(authorization,method)
+        except HTTPException as exc:
+            response = JSONResponse(
+                {"detail": exc.detail},
+                status_code=exc.status_code,
+                headers=getattr(exc,'headers',None)
+            )
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault('state',{})[STATE_KEY] = claims
+        # the threadpool ran in a copy of the context, publish the claims in this one
+        set_current_claims(claims)
+        await self.app(scope, receive, send)
+
+def get_request_claims(request: Request) -> Optional[Claims]:
+    """
+    Dependency returning the claims verified by AuthJWTMiddleware, the same Claims
+    view as get_current_claims, None when the route is public or the optional token is missing
+    """
+    return getattr(request.state,STATE_KEY,None)
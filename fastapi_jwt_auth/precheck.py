@@ -0,0 +1,65 @@
+import re, json, time
+from base64 import urlsafe_b64decode
+from fastapi import HTTPException
+from typing import Optional, Sequence, Dict, Union
+
+# compact JWS, three base64url segments (the signature is empty for alg none)
+_COMPACT_JWS = re.compile(r'[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]*\Z')
+_SEGMENT = re.compile(r'[A-Za-z0-9_-]+\Z')
+
+def _b64_json(segment: str) -> Optional[dict]:
+    try:
+        value = json.loads(urlsafe_b64decode(segment + '=' * (-len(segment) % 4)))
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+def precheck(
+    token: Union[str,bytes],
+    max_length: Optional[int] = None,
+    algorithms: Optional[Sequence[str]] = None,
+    leeway: Optional[int] = None
+) -> Optional[Dict]:
+    """
+    Reject tokens that can't be valid before their signature is verified: wrong segment count,
+    too long, characters outside base64url, alg not allowed and optionally expired. It only
+    rejects, a token passing the precheck is still verified completely.
+
+    :param token: encoded token
+    :param max_length: maximum length of the token
+    :param algorithms: allowed algorithms, None when they depend on the key
+    :param leeway: check exp with this leeway before the signature, None to skip it
+    :return: unverified header, None when it can't be decoded and the verification reports the error
+    """
+    if isinstance(token, bytes):
+        token = token.decode('latin-1')
+
+    if max_length is not None and len(token) > max_length:
+        raise HTTPException(status_code=422,detail="Token is too long")
+
+    # same messages as PyJWT, clients see the same detail with or without the precheck
+    if not _COMPACT_JWS.match(token):
+        segments = token.split('.')
+        if len(segments) < 3:
+            raise HTTPException(status_code=422,detail="Not enough segments")
+        if not _SEGMENT.match(segments[0]):
+            raise HTTPException(status_code=422,detail="Invalid header padding")
+        if not _SEGMENT.match('.'.join(segments[1:-1])):
+            raise HTTPException(status_code=422,detail="Invalid payload padding")
+        raise HTTPException(status_code=422,detail="Invalid crypto padding")
+
+    header_segment, payload_segment, _ = token.split('.')
+    header = _b64_json(header_segment)
+    if header is None:
+        return None
+
+    if algorithms is not None and header.get('alg') not in algorithms:
+        raise HTTPException(status_code=422,detail="The specified alg value is not allowed")
+
+    if leeway is not None and 'zip' not in header:
+        payload = _b64_json(payload_segment)
+        exp = payload.get('exp') if payload is not None else None
+        if isinstance(exp, (int, float)) and not isinstance(exp, bool) and exp < int(time.time()) - leeway:
+            raise HTTPException(status_code=422,detail="Signature has expired")
+
+    return header
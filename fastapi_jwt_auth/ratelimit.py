@@ -0,0 +1,93 @@
+import time, threading
+from collections import OrderedDict
+from fastapi_jwt_auth.fork import register_after_fork
+from typing import Callable, Hashable, Optional, Sequence
+
+class RateLimiter:
+    """
+    Token bucket per identity (or per jti), checked while the token of the request is
+    verified so abusive clients get a 429 before the endpoint runs.
+
+    Buckets are refilled lazily when they're hit, a bucket idle long enough to be full
+    again is the same as a missing one, so idle buckets are evicted from the front of
+    the table (least recently hit first) and memory only grows with active clients.
+    """
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        key: Optional[str] = 'identity',
+        token_types: Optional[Sequence[str]] = ('access',),
+        timer: Callable[[],float] = time.monotonic
+    ):
+        """
+        :param rate: requests allowed per second
+        :param burst: requests allowed at once, size of the bucket
+        :param key: claim the buckets are keyed by, 'identity' or 'jti'
+        :param token_types: token types that are limited
+        :param timer: monotonic clock in seconds
+        """
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise TypeError("rate must be a positive number")
+        if not isinstance(burst, int) or burst < 1:
+            raise TypeError("burst must be a positive integer")
+        if key not in ('identity','jti'):
+            raise ValueError("key must be between 'identity' or 'jti'")
+
+        self.rate = rate
+        self.burst = burst
+        self.key = key
+        self.token_types = frozenset(token_types)
+        self._timer = timer
+        # seconds for an empty bucket to be full again
+        self._idle = burst / rate
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        register_after_fork(self)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def hit(self, key: Hashable) -> float:
+        """
+        Take one request from the bucket of key
+
+        :param key: identity or jti
+        :return: 0 when the request is allowed, otherwise seconds until it would be
+        """
+        now = self._timer()
+        with self._lock:
+            buckets = self._buckets
+
+            # least recently hit first, stop at the first bucket that isn't full again yet
+            while buckets:
+                oldest = next(iter(buckets.values()))
+                if now - oldest[1] < self._idle:
+                    break
+                buckets.popitem(last=False)
+
+            bucket = buckets.pop(key,None)
+            if bucket is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+
+            if tokens >= 1:
+                buckets[key] = (tokens - 1, now)
+                return 0.0
+
+            buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+
+    def reset(self, key: Optional[Hashable] = None) -> None:
+        """
+        Refill the bucket of key, or every bucket when key is None
+        """
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key,None)
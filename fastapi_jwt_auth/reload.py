@@ -0,0 +1,124 @@
+import os, logging, threading
+from fastapi_jwt_auth.auth_jwt import AuthJWT
+from fastapi_jwt_auth.fork import register_after_fork
+from typing import Optional, Callable, Sequence, Dict, List, Tuple, Any
+
+logger = logging.getLogger("fastapi_jwt_auth")
+
+class ConfigWatcher:
+    """
+    Poll files (e.g. a .env file or key files) and the AUTHJWT_* environment
+    variables, and reload the AuthJWT configuration when one of them changes.
+    The new snapshot is built on the watcher thread and published with one
+    assignment, requests never wait for a reload.
+
+    If the new settings are invalid the current configuration is kept and the
+    error is logged, the watcher tries again on the next change.
+
+    The environment watched is the one of this process, it only changes when the
+    application sets os.environ itself. Changes made from outside, e.g. in a
+    systemd unit or a kubernetes manifest, need a restart or a watched file.
+    """
+    def __init__(
+        self,
+        settings: Callable[...,List[tuple]],
+        components: Optional[Callable[[],Dict[str,Any]]] = None,
+        paths: Optional[Sequence[str]] = (),
+        interval: Optional[float] = 5.0,
+        env_prefix: Optional[str] = "AUTHJWT_",
+        auth_class: Optional[type] = AuthJWT
+    ):
+        """
+        :param settings: same as AuthJWT.load_config, called again on every reload
+        :param components: optional function returning the components to rebuild on reload,
+                           e.g. lambda: {"keyring": load_keyring_from_disk()}
+        :param paths: files to watch
+        :param interval: seconds between two polls
+        :param env_prefix: variables of os.environ starting with this prefix are watched,
+                           None only watches the files
+        :param auth_class: AuthJWT or a subclass with its own configuration
+        """
+        if not callable(settings):
+            raise TypeError("settings must be callable")
+        if components is not None and not callable(components):
+            raise TypeError("components must be callable")
+
+        self.settings = settings
+        self.components = components
+        self.paths = tuple(paths)
+        self.interval = interval
+        self.env_prefix = env_prefix
+        self.auth_class = auth_class
+        self._fingerprint = self._get_fingerprint()
+        self._stop = threading.Event()
+        self._thread = None
+        register_after_fork(self)
+
+    def _after_fork(self) -> None:
+        # the worker has its own copy of the configuration to keep up to date
+        watching = self._thread is not None
+        self._stop = threading.Event()
+        self._thread = None
+        if watching:
+            self.start()
+
+    def _get_fingerprint(self) -> Tuple:
+        files = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                files.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                files.append((path, None, None))
+
+        env = ()
+        if self.env_prefix:
+            env = tuple(sorted((k, v) for k, v in os.environ.items() if k.startswith(self.env_prefix)))
+
+        return tuple(files), env
+
+    def reload(self) -> None:
+        """
+        Rebuild and publish the configuration now
+        """
+        components = self.components() if self.components else {}
+        self.auth_class.reload_config(self.settings,**components)
+
+    def check(self) -> bool:
+        """
+        Reload the configuration if the watched files or environment changed
+
+        :return: True when a new configuration was published
+        """
+        fingerprint = self._get_fingerprint()
+        if fingerprint == self._fingerprint:
+            return False
+
+        self._fingerprint = fingerprint
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Reloading the AuthJWT configuration failed, keeping the current one")
+            return False
+
+        logger.info("AuthJWT configuration reloaded")
+        return True
+
+    def start(self) -> "ConfigWatcher":
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,name="authjwt-config-watcher",daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
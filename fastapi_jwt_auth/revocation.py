@@ -0,0 +1,397 @@
+import os, hmac, json, time, heapq, socket, struct, hashlib, logging, threading, itertools
+from fastapi_jwt_auth.fork import register_after_fork
+from fastapi_jwt_auth.backends import redis_client
+from typing import Optional, Callable, Iterable, Tuple, Union
+
+logger = logging.getLogger("fastapi_jwt_auth")
+
+class RevocationList:
+    """
+    In memory set of revoked jti, and of identities whose tokens issued until a given
+    second are revoked. Each entry is kept until the tokens it covers expire since an
+    expired token is rejected anyway. Lookups are a dict access, expired entries are
+    purged in order of expiry as new ones are added.
+    """
+    def __init__(self, timer: Callable[[],float] = time.time):
+        """
+        :param timer: returns the current time in seconds since the Epoch
+        """
+        self._timer = timer
+        self._revoked = {}
+        self._identities = {}
+        self._expiry = []
+        # breaks ties in the heap so jti and identities of different types are never compared
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        register_after_fork(self)
+
+    def __len__(self):
+        return len(self._revoked) + len(self._identities)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti: str) -> bool:
+        return self.is_revoked(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        if jti not in self._revoked:
+            return False
+        exp = self._revoked.get(jti)
+        return exp is None or exp > self._timer()
+
+    def identity_revoked_at(self, identity: Union[str,int]) -> Optional[int]:
+        """
+        :return: tokens of the identity issued until this second are revoked, None when they're not
+        """
+        entry = self._identities.get(identity)
+        if entry is None or entry[1] <= self._timer():
+            return None
+        return entry[0]
+
+    def add(self, jti: str, exp: Optional[int] = None) -> None:
+        """
+        :param jti: identifier of the revoked token
+        :param exp: expiry of the revoked token, None when it never expires
+        """
+        with self._lock:
+            self._purge()
+            self._revoked[jti] = exp
+            if exp is not None:
+                heapq.heappush(self._expiry,(exp, next(self._sequence), self._revoked, jti))
+
+    def add_identity(self, identity: Union[str,int], revoked_at: int, exp: int) -> None:
+        """
+        :param identity: identity whose tokens are revoked
+        :param revoked_at: tokens issued until this second are revoked
+        :param exp: when every token issued until revoked_at has expired
+        """
+        with self._lock:
+            self._purge()
+            self._identities[identity] = (revoked_at, exp)
+            heapq.heappush(self._expiry,(exp, next(self._sequence), self._identities, identity))
+
+    def purge(self) -> None:
+        """
+        Drop the entries that expired
+        """
+        with self._lock:
+            self._purge()
+
+    def _purge(self) -> None:
+        now, expiry = self._timer(), self._expiry
+        while expiry and expiry[0][0] <= now:
+            exp, _, entries, key = heapq.heappop(expiry)
+            value = entries.get(key)
+            if value == exp or isinstance(value, tuple) and value[1] == exp:
+                del entries[key]
+
+class UnixSocketTransport:
+    """
+    Broadcast between the processes of one host, each process binds a datagram
+    socket in a shared directory and messages are sent to every socket in it.
+    Sends never block, a peer whose queue is full misses the message and the
+    others still get it.
+    """
+    def __init__(self, directory: str):
+        """
+        :param directory: directory shared by the processes, e.g. /run/myapp/revocations
+        """
+        os.makedirs(directory,exist_ok=True)
+        self.directory = directory
+        self._bind()
+
+    def _bind(self) -> None:
+        self.path = os.path.join(self.directory,"{}-{}.sock".format(os.getpid(),os.urandom(4).hex()))
+        self._socket = socket.socket(socket.AF_UNIX,socket.SOCK_DGRAM)
+        self._socket.bind(self.path)
+        # closing a socket doesn't wake a blocked recv, the listener checks _closed regularly
+        self._socket.settimeout(0.5)
+        self._sender = socket.socket(socket.AF_UNIX,socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._closed = False
+
+    def _after_fork(self) -> None:
+        # the socket file belongs to the parent, only our copy of it is closed
+        self._socket.close()
+        self._sender.close()
+        self._bind()
+
+    def publish(self, message: bytes) -> None:
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory,name)
+            if not name.endswith('.sock') or path == self.path:
+                continue
+            try:
+                self._sender.sendto(message,path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # socket left behind by a process that's gone
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError as err:
+                # e.g. the queue of a busy peer is full, the other peers still get the message
+                logger.warning("Sending revocations to %s failed: %s",path,err)
+
+    def listen(self, callback: Callable[[bytes],None]) -> None:
+        while not self._closed:
+            try:
+                message = self._socket.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            callback(message)
+
+    def close(self) -> None:
+        self._closed = True
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        self._socket.close()
+        self._sender.close()
+
+class MulticastTransport:
+    """
+    Broadcast with UDP multicast. By default (ttl 0) messages are sent and received on
+    the loopback interface only, so they never leave the host nor come from another one.
+    """
+    # IP_MULTICAST_ALL on linux, without it a socket gets the groups joined by any socket
+    _multicast_all = getattr(socket,'IP_MULTICAST_ALL',49)
+
+    def __init__(
+        self,
+        group: Optional[str] = "239.255.74.74",
+        port: Optional[int] = 47474,
+        ttl: Optional[int] = 0,
+        interface: Optional[str] = None
+    ):
+        """
+        :param group: multicast group address
+        :param port: UDP port
+        :param ttl: 0 stays on the host, 1 reaches the local network
+        :param interface: address of the interface the group is joined on, loopback when
+                          ttl is 0 and every interface otherwise
+        """
+        self.address = (group, port)
+        self.ttl = ttl
+        self.interface = interface or ('127.0.0.1' if ttl == 0 else '0.0.0.0')
+        self._open()
+
+    def _open(self) -> None:
+        group, port = self.address
+        interface = socket.inet_aton(self.interface)
+        self._sender = socket.socket(socket.AF_INET,socket.SOCK_DGRAM,socket.IPPROTO_UDP)
+        self._sender.setsockopt(socket.IPPROTO_IP,socket.IP_MULTICAST_TTL,self.ttl)
+        self._sender.setsockopt(socket.IPPROTO_IP,socket.IP_MULTICAST_LOOP,1)
+        if self.interface != '0.0.0.0':
+            self._sender.setsockopt(socket.IPPROTO_IP,socket.IP_MULTICAST_IF,interface)
+
+        self._receiver = socket.socket(socket.AF_INET,socket.SOCK_DGRAM,socket.IPPROTO_UDP)
+        self._receiver.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEADDR,1)
+        if hasattr(socket,'SO_REUSEPORT'):
+            self._receiver.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEPORT,1)
+        # bound to the group, datagrams sent to the port with another destination are dropped
+        self._receiver.bind((group,port))
+        membership = struct.pack('4s4s',socket.inet_aton(group),interface)
+        self._receiver.setsockopt(socket.IPPROTO_IP,socket.IP_ADD_MEMBERSHIP,membership)
+        if hasattr(socket,'IP_MULTICAST_ALL') or os.uname().sysname == 'Linux':
+            self._receiver.setsockopt(socket.IPPROTO_IP,self._multicast_all,0)
+        self._receiver.settimeout(0.5)
+        self._closed = False
+
+    def _after_fork(self) -> None:
+        # every process joins the group with its own socket to get every message
+        self._sender.close()
+        self._receiver.close()
+        self._open()
+
+    def publish(self, message: bytes) -> None:
+        self._sender.sendto(message,self.address)
+
+    def listen(self, callback: Callable[[bytes],None]) -> None:
+        while not self._closed:
+            try:
+                message = self._receiver.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            callback(message)
+
+    def close(self) -> None:
+        self._closed = True
+        self._sender.close()
+        self._receiver.close()
+
+class RedisTransport:
+    """
+    Broadcast with Redis pub/sub between hosts, requires the redis package
+    """
+    def __init__(self, client=None, url: Optional[str] = None, channel: Optional[str] = "authjwt:revocations"):
+        """
+        :param client: redis.Redis client, or
+        :param url: url of the Redis server, e.g. redis://localhost:6379/0
+        :param channel: pub/sub channel
+        """
+        self.channel = channel
+        self._client = redis_client(client,url,"RedisTransport")
+        self._pubsub = None
+        self._closed = False
+
+    def _after_fork(self) -> None:
+        # redis-py reconnects in the child, the subscription is made again by listen
+        self._pubsub = None
+
+    def publish(self, message: bytes) -> None:
+        self._client.publish(self.channel,message)
+
+    def listen(self, callback: Callable[[bytes],None]) -> None:
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+        try:
+            for message in self._pubsub.listen():
+                if message['type'] == 'message':
+                    callback(message['data'])
+        except Exception:
+            if not self._closed:
+                logger.exception("Listening to the revocation channel failed")
+
+    def close(self) -> None:
+        self._closed = True
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+class RevocationBus:
+    """
+    Push revocations to every process so their local RevocationList is updated right
+    away, instead of each request asking the store. The transport carries batches of
+    (jti, exp) and (identity, revoked at, exp) as compact JSON, messages sent by this bus
+    are ignored when they come back.
+
+    Messages are signed with an HMAC-SHA256 of a key shared by the processes, messages
+    without a valid signature are dropped so nobody else on the transport can revoke
+    tokens. AuthJWT.load_revocation_bus derives the key from AUTHJWT_SECRET_KEY when the
+    bus has none.
+    """
+    # entries per message, keeps a message under the 64KB of a datagram
+    _batch_size = 500
+
+    _signature_size = hashlib.sha256().digest_size
+
+    def __init__(self, transport, revoked: Optional[RevocationList] = None, key: Optional[Union[str,bytes]] = None):
+        """
+        :param transport: UnixSocketTransport, MulticastTransport, RedisTransport or any
+                          object with publish(bytes), listen(callback) and close()
+        :param revoked: local list updated by the bus
+        :param key: secret shared by every process of the bus
+        """
+        self.transport = transport
+        self.revoked = revoked if revoked is not None else RevocationList()
+        self._key = None
+        if key is not None:
+            self.set_key(key)
+        self._node = os.urandom(8).hex()
+        self._thread = None
+        register_after_fork(self)
+
+    def _after_fork(self) -> None:
+        # each worker is a node of its own, or it would ignore the messages of its siblings
+        self._node = os.urandom(8).hex()
+        listening = self._thread is not None
+        self._thread = None
+        if hasattr(self.transport,'_after_fork'):
+            self.transport._after_fork()
+        if listening:
+            self.start()
+
+    @property
+    def has_key(self) -> bool:
+        return self._key is not None
+
+    def set_key(self, key: Union[str,bytes]) -> None:
+        """
+        :param key: secret shared by every process of the bus, a key of its own is derived
+                    from it so the secret isn't used directly
+        """
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        if not isinstance(key, bytes) or not key:
+            raise TypeError("key must be a non empty string or bytes")
+        self._key = hmac.new(key,b"fastapi_jwt_auth revocation bus",hashlib.sha256).digest()
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._key,payload,hashlib.sha256).digest()
+
+    def publish(
+        self,
+        revocations: Iterable[Tuple[str,Optional[int]]] = (),
+        identities: Iterable[Tuple[Union[str,int],int,int]] = ()
+    ) -> None:
+        """
+        Revoke tokens locally and broadcast them to the other processes
+
+        :param revocations: (jti, exp) of the revoked tokens
+        :param identities: (identity, revoked at, exp) of the revoked identities
+        """
+        if self._key is None:
+            raise RuntimeError("The RevocationBus needs a key to sign its messages, pass key "
+                "or load it with AuthJWT.load_revocation_bus and AUTHJWT_SECRET_KEY set")
+
+        revocations = [[jti, exp] for jti, exp in revocations]
+        identities = [[identity, revoked_at, exp] for identity, revoked_at, exp in identities]
+        for jti, exp in revocations:
+            self.revoked.add(jti,exp)
+        for identity, revoked_at, exp in identities:
+            self.revoked.add_identity(identity,revoked_at,exp)
+
+        size = self._batch_size
+        for start in range(0,max(len(revocations),len(identities)),size):
+            message = {'n': self._node, 'r': revocations[start:start + size], 'i': identities[start:start + size]}
+            payload = json.dumps(message,separators=(',',':')).encode('utf-8')
+            try:
+                self.transport.publish(self._sign(payload) + payload)
+            except Exception:
+                logger.exception("Broadcasting revocations failed, they're only known locally")
+                return
+
+    def receive(self, message: bytes) -> None:
+        size = self._signature_size
+        if (
+            self._key is None or not isinstance(message, bytes) or
+            not hmac.compare_digest(message[:size],self._sign(message[size:]))
+        ):
+            logger.warning("Ignoring revocation message without a valid signature")
+            return
+
+        try:
+            message = json.loads(message[size:])
+            if message['n'] == self._node:
+                return
+            for jti, exp in message['r']:
+                self.revoked.add(jti,exp)
+            for identity, revoked_at, exp in message.get('i',()):
+                self.revoked.add_identity(identity,revoked_at,exp)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed revocation message")
+
+    def start(self) -> "RevocationBus":
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        self._thread = threading.Thread(
+            target=self.transport.listen,
+            args=(self.receive,),
+            name="authjwt-revocation-bus",
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.transport.close()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
@@ -0,0 +1,210 @@
+import time, sqlite3, threading
+from contextlib import contextmanager
+from fastapi_jwt_auth.fork import register_after_fork
+from fastapi_jwt_auth.backends import SQLiteConnections
+from typing import Optional, Callable, Iterator, Tuple
+
+VALID = 'valid'
+REUSED = 'reused'
+REVOKED = 'revoked'
+
+class RefreshTokenFamilies:
+    """
+    In memory store for refresh token rotation. Every refresh token created from a
+    login starts a family, each rotation issues the next generation of the family.
+    Presenting an older generation means the token was stolen or replayed, so the
+    whole family is revoked.
+
+    One small record (generation, expires at, rotated at) is kept per family, not
+    per token. Families are grouped by expiry in buckets so expired ones are evicted
+    without scanning the whole store.
+
+    The records live in the memory of the process, they're lost on restart and other
+    workers don't know them, so their refresh tokens are rejected there. Use
+    SQLiteRefreshTokenFamilies with several workers, or subclass it for another
+    database by overriding _transaction, _get, _set and _sweep.
+    """
+    _bucket_size = 3600
+
+    def __init__(self, reuse_interval: Optional[int] = 0, timer: Callable[[],float] = time.time):
+        """
+        :param reuse_interval: seconds the previous generation is still accepted after a rotation,
+                               e.g. for requests racing each other with the same token
+        :param timer: returns the current time in seconds since the Epoch
+        """
+        if not isinstance(reuse_interval, int) or reuse_interval < 0:
+            raise TypeError("reuse_interval must be a positive integer")
+
+        self.reuse_interval = reuse_interval
+        self._timer = timer
+        self._families = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        register_after_fork(self)
+
+    def __len__(self):
+        return len(self._families)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+    def start(self, family: str, expires_at: Optional[int]) -> int:
+        """
+        Record a new family
+
+        :param family: family identifier stored in the 'fam' claim
+        :param expires_at: expiry of the refresh token, the record is evicted after it
+        :return: first generation
+        """
+        with self._transaction():
+            self._sweep()
+            self._set(family,0,expires_at,0)
+        return 0
+
+    def check(self, family: str, generation: int) -> str:
+        """
+        :param family: value of the 'fam' claim
+        :param generation: value of the 'gen' claim
+        :return: 'valid', 'reused' when generation is older than the current one or 'revoked'
+        """
+        return self._check(self._get(family),generation)
+
+    def _check(self, record: Optional[Tuple[int,Optional[int],float]], generation: int) -> str:
+        if record is None or record[0] < 0:
+            return REVOKED
+        if record[1] is not None and record[1] <= self._timer():
+            return REVOKED
+        if generation == record[0]:
+            return VALID
+        if generation == record[0] - 1 and self._timer() - record[2] <= self.reuse_interval:
+            return VALID
+        return REUSED if generation < record[0] else REVOKED
+
+    def rotate(self, family: str, generation: int, expires_at: Optional[int]) -> Optional[int]:
+        """
+        Move the family to the next generation
+
+        :param family: value of the 'fam' claim
+        :param generation: value of the 'gen' claim of the presented token
+        :param expires_at: expiry of the new refresh token
+        :return: generation of the new token, None when the family was revoked because
+                 the presented token is no longer valid
+        """
+        with self._transaction():
+            self._sweep()
+            record = self._get(family)
+            status = self._check(record,generation)
+            if status == REUSED:
+                self._set(family,-1,record[1],record[2])
+            if status != VALID:
+                return None
+
+            current = record[0]
+            if generation < current:
+                # previous generation inside the reuse interval, share the current generation
+                return current
+
+            self._set(family,current + 1,expires_at,self._timer())
+            return current + 1
+
+    def revoke(self, family: str) -> None:
+        """
+        Revoke every token of the family, e.g. on logout
+        """
+        with self._transaction():
+            record = self._get(family)
+            if record is not None:
+                self._set(family,-1,record[1],record[2])
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        with self._lock:
+            yield
+
+    def _get(self, family: str) -> Optional[Tuple[int,Optional[int],float]]:
+        return self._families.get(family)
+
+    def _set(self, family: str, generation: int, expires_at: Optional[int], rotated_at: float) -> None:
+        previous = self._families.get(family)
+        if previous is not None and previous[1] is not None:
+            bucket = self._buckets.get(previous[1] // self._bucket_size)
+            if bucket is not None:
+                bucket.discard(family)
+
+        self._families[family] = (generation, expires_at, rotated_at)
+        if expires_at is not None:
+            self._buckets.setdefault(expires_at // self._bucket_size,set()).add(family)
+
+    def _sweep(self) -> None:
+        now = self._timer()
+        current = int(now) // self._bucket_size
+        for key in [key for key in self._buckets if key < current]:
+            for family in self._buckets.pop(key):
+                record = self._families.get(family)
+                if record is not None and record[1] is not None and record[1] <= now:
+                    del self._families[family]
+
+class SQLiteRefreshTokenFamilies(RefreshTokenFamilies):
+    """
+    Refresh token families in a SQLite database file, shared by the worker processes of
+    one host and kept across restarts. Each rotation is a write transaction, so two
+    workers can't both rotate the same generation.
+    """
+    _create = (
+        "CREATE TABLE IF NOT EXISTS refresh_families "
+        "(family TEXT PRIMARY KEY, generation INTEGER, exp INTEGER, rotated_at REAL) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS refresh_families_exp ON refresh_families (exp)",
+    )
+    _select = "SELECT generation, exp, rotated_at FROM refresh_families WHERE family = ?"
+    _insert = "INSERT OR REPLACE INTO refresh_families (family, generation, exp, rotated_at) VALUES (?, ?, ?, ?)"
+    _delete = "DELETE FROM refresh_families WHERE exp <= ?"
+
+    def __init__(
+        self,
+        path: str,
+        reuse_interval: Optional[int] = 0,
+        purge_interval: Optional[float] = 300,
+        timer: Callable[[],float] = time.time
+    ):
+        """
+        :param path: database file, created when it doesn't exist
+        :param reuse_interval: same as RefreshTokenFamilies
+        :param purge_interval: seconds between two purges of expired families
+        :param timer: returns the current time in seconds since the Epoch
+        """
+        super().__init__(reuse_interval=reuse_interval,timer=timer)
+        self.path = path
+        self.purge_interval = purge_interval
+        self._connections = SQLiteConnections(path,self._create)
+        self._next_purge = timer() + purge_interval
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM refresh_families").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        # BEGIN IMMEDIATE takes the write lock, other threads and processes wait for it
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _get(self, family: str) -> Optional[Tuple[int,Optional[int],float]]:
+        row = self._connection().execute(self._select,(family,)).fetchone()
+        return tuple(row) if row is not None else None
+
+    def _set(self, family: str, generation: int, expires_at: Optional[int], rotated_at: float) -> None:
+        self._connection().execute(self._insert,(family, generation, expires_at, rotated_at))
+
+    def _sweep(self) -> None:
+        now = self._timer()
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            self._connection().execute(self._delete,(int(now),))
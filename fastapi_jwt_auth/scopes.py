@@ -0,0 +1,83 @@
+from fastapi import Depends, HTTPException
+from typing import Callable, Iterable, List, Sequence, Optional
+
+class ScopeTable:
+    """
+    Registered scopes, each one owns a bit of the integer stored in the 'scp'
+    claim of access tokens. Bits follow the registration order, only append new
+    scopes at the end so tokens already issued keep their meaning.
+    """
+    def __init__(self, scopes: Sequence[str]):
+        """
+        :param scopes: scope names, e.g. ["orders:read","orders:write"]
+        """
+        scopes = tuple(scopes)
+        if not all(isinstance(scope, str) and scope for scope in scopes):
+            raise TypeError("scopes must be a sequence of strings")
+        if len(set(scopes)) != len(scopes):
+            raise ValueError("scopes must be unique")
+
+        self.scopes = scopes
+        self._bits = {scope: 1 << index for index, scope in enumerate(scopes)}
+
+    def __len__(self):
+        return len(self.scopes)
+
+    def __contains__(self, scope: str) -> bool:
+        return scope in self._bits
+
+    def encode(self, scopes: Iterable[str]) -> int:
+        """
+        :param scopes: scope names
+        :return: bitmask of the scopes
+        """
+        mask = 0
+        for scope in scopes:
+            if scope not in self._bits:
+                raise ValueError("Unknown scope {}".format(scope))
+            mask |= self._bits[scope]
+        return mask
+
+    def decode(self, mask: int) -> List[str]:
+        """
+        :param mask: bitmask from the 'scp' claim
+        :return: scope names in registration order
+        """
+        return [scope for scope, bit in self._bits.items() if mask & bit]
+
+def requires(*scopes: str, auth_class: Optional[type] = None) -> Callable:
+    """
+    Dependency factory protecting an endpoint with jwt_required and the given scopes.
+    The requirement is compiled to a bitmask the first time it's checked (and again
+    only if another ScopeTable is loaded), so every check is a single AND.
+
+    :param scopes: scopes the access token must have
+    :param auth_class: AuthJWT or a subclass with its own configuration
+    :return: dependency returning the AuthJWT instance
+    """
+    from fastapi_jwt_auth.auth_jwt import AuthJWT
+
+    if not scopes:
+        raise ValueError("At least one scope is required")
+
+    auth_class = auth_class or AuthJWT
+    compiled = [(None, 0)]
+
+    def dependency(Authorize: auth_class = Depends(auth_class)) -> AuthJWT:
+        Authorize.jwt_required()
+
+        table = Authorize._config.scopes
+        if table is None:
+            raise RuntimeError("A ScopeTable must be provided via AuthJWT.load_scopes to check scopes")
+
+        # (table, mask) is swapped as a whole, a reload never pairs a table with another mask
+        compiled_table, mask = compiled[0]
+        if compiled_table is not table:
+            mask = table.encode(scopes)
+            compiled[0] = (table, mask)
+
+        if Authorize.get_raw_jwt().get('scp',0) & mask != mask:
+            raise HTTPException(status_code=403,detail="Insufficient scope")
+        return Authorize
+
+    return dependency
@@ -0,0 +1,451 @@
+import json, time, queue, sqlite3, logging, threading
+from abc import ABC, abstractmethod
+from itertools import islice
+from fastapi_jwt_auth.revocation import RevocationList
+from fastapi_jwt_auth.backends import SQLiteConnections, redis_client
+from fastapi_jwt_auth.fork import register_after_fork
+from typing import Optional, Callable, Iterable, Tuple, Union
+
+logger = logging.getLogger("fastapi_jwt_auth")
+
+class RevocationStore(ABC):
+    """
+    Storage of revoked tokens used by AuthJWT.revoke_token and checked when
+    AUTHJWT_BLACKLIST_ENABLED is true, subclass it for another database.
+    Revoking tokens and identities are both required, purge and close are optional.
+    """
+    def revoke(self, jti: str, exp: Optional[int] = None) -> None:
+        """
+        :param jti: identifier of the revoked token
+        :param exp: expiry of the revoked token, the store may forget it afterwards
+        """
+        self.revoke_many([(jti, exp)])
+
+    @abstractmethod
+    def revoke_many(self, revocations: Iterable[Tuple[str,Optional[int]]]) -> None:
+        """
+        :param revocations: (jti, exp) of the revoked tokens
+        """
+
+    @abstractmethod
+    def is_revoked(self, jti: str) -> bool:
+        """
+        :return: True when the token was revoked and hasn't expired
+        """
+
+    @abstractmethod
+    def revoke_identities(self, revocations: Iterable[Tuple[Union[str,int],int,int]]) -> None:
+        """
+        :param revocations: (identity, revoked at, exp), tokens of the identity issued until
+                            the second revoked at are revoked, the store may forget it after exp
+        """
+
+    @abstractmethod
+    def identity_revoked_at(self, identity: Union[str,int]) -> Optional[int]:
+        """
+        :return: tokens of the identity issued until this second are revoked, None when they're not
+        """
+
+    def purge(self) -> None:
+        """
+        Drop the tokens that expired
+        """
+
+    def close(self) -> None:
+        pass
+
+class MemoryRevocationStore(RevocationStore):
+    """
+    Revoked tokens kept in the memory of the process, lost on restart and not
+    shared between workers
+    """
+    def __init__(self, timer: Callable[[],float] = time.time):
+        self._revoked = RevocationList(timer=timer)
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def revoke_many(self, revocations: Iterable[Tuple[str,Optional[int]]]) -> None:
+        for jti, exp in revocations:
+            self._revoked.add(jti,exp)
+
+    def is_revoked(self, jti: str) -> bool:
+        return self._revoked.is_revoked(jti)
+
+    def revoke_identities(self, revocations: Iterable[Tuple[Union[str,int],int,int]]) -> None:
+        for identity, revoked_at, exp in revocations:
+            self._revoked.add_identity(identity,revoked_at,exp)
+
+    def identity_revoked_at(self, identity: Union[str,int]) -> Optional[int]:
+        return self._revoked.identity_revoked_at(identity)
+
+    def purge(self) -> None:
+        self._revoked.purge()
+
+class SQLiteRevocationStore(RevocationStore):
+    """
+    Revoked tokens in a SQLite database file, shared by the worker processes of one host.
+
+    The database is in WAL mode so lookups never wait for writes, jti is the primary key
+    of a table without rowid and lookups are a single index search. Revocations are queued
+    and written in batches by a background thread, they're visible to this process right
+    away and to the others once the batch is committed. Expired rows are purged regularly.
+    """
+    _create = (
+        "CREATE TABLE IF NOT EXISTS revoked_tokens (jti TEXT PRIMARY KEY, exp INTEGER) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS revoked_tokens_exp ON revoked_tokens (exp)",
+        "CREATE TABLE IF NOT EXISTS revoked_identities "
+        "(identity TEXT PRIMARY KEY, revoked_at INTEGER, exp INTEGER) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS revoked_identities_exp ON revoked_identities (exp)",
+    )
+    # same statement strings every time, sqlite3 keeps them prepared in its statement cache
+    _select = "SELECT 1 FROM revoked_tokens WHERE jti = ? AND (exp IS NULL OR exp > ?)"
+    _insert = "INSERT OR REPLACE INTO revoked_tokens (jti, exp) VALUES (?, ?)"
+    _delete = "DELETE FROM revoked_tokens WHERE exp <= ?"
+    _select_identity = "SELECT revoked_at FROM revoked_identities WHERE identity = ? AND exp > ?"
+    _insert_identity = "INSERT OR REPLACE INTO revoked_identities (identity, revoked_at, exp) VALUES (?, ?, ?)"
+    _delete_identity = "DELETE FROM revoked_identities WHERE exp <= ?"
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: Optional[float] = 0.05,
+        batch_size: Optional[int] = 500,
+        purge_interval: Optional[float] = 300,
+        timer: Callable[[],float] = time.time
+    ):
+        """
+        :param path: database file, created when it doesn't exist
+        :param flush_interval: seconds the writer waits to batch revocations
+        :param batch_size: maximum revocations written in one transaction
+        :param purge_interval: seconds between two purges of expired rows
+        :param timer: returns the current time in seconds since the Epoch
+        """
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise TypeError("batch_size must be a positive integer")
+
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.purge_interval = purge_interval
+        self._timer = timer
+
+        self._connections = SQLiteConnections(path,self._create)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_purge = timer() + purge_interval
+        register_after_fork(self)
+
+    def _after_fork(self) -> None:
+        # the parent writes what it queued, the writer starts again on the next revocation
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def __len__(self):
+        self.flush()
+        return self._connection().execute("SELECT COUNT(*) FROM revoked_tokens").fetchone()[0]
+
+    def revoke_many(self, revocations: Iterable[Tuple[str,Optional[int]]]) -> None:
+        with self._lock:
+            for jti, exp in revocations:
+                self._pending[jti] = exp
+            size = len(self._pending)
+
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def is_revoked(self, jti: str) -> bool:
+        now = self._timer()
+        if jti in self._pending:
+            exp = self._pending.get(jti,0)
+            if exp is None or exp > now:
+                return True
+        return self._connection().execute(self._select,(jti, int(now))).fetchone() is not None
+
+    def revoke_identities(self, revocations: Iterable[Tuple[Union[str,int],int,int]]) -> None:
+        # identities are stored as json so 1 and "1" stay different
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    self._insert_identity,
+                    ((json.dumps(identity), revoked_at, exp) for identity, revoked_at, exp in revocations)
+                )
+
+    def identity_revoked_at(self, identity: Union[str,int]) -> Optional[int]:
+        row = self._connection().execute(
+            self._select_identity,
+            (json.dumps(identity), int(self._timer()))
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def flush(self) -> None:
+        """
+        Write the queued revocations now
+        """
+        with self._write_lock:
+            while self._pending:
+                with self._lock:
+                    batch = list(islice(self._pending.items(),self.batch_size))
+                connection = self._connection()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.executemany(self._insert,batch)
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+                with self._lock:
+                    # a newer exp may have been queued meanwhile for the same jti
+                    for jti, exp in batch:
+                        if self._pending.get(jti,0) == exp:
+                            del self._pending[jti]
+
+    def purge(self) -> None:
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                connection.execute(self._delete,(int(self._timer()),))
+                connection.execute(self._delete_identity,(int(self._timer()),))
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run,name="authjwt-sqlite-writer",daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if self._timer() >= self._next_purge:
+                    self._next_purge = self._timer() + self.purge_interval
+                    self.purge()
+            except sqlite3.Error:
+                logger.exception("Writing revoked tokens failed, retrying")
+                self._stop.wait(1)
+
+    def close(self) -> None:
+        """
+        Stop the writer after the queued revocations are written
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+class RedisRevocationStore(RevocationStore):
+    """
+    Revoked tokens in Redis, each one is a key expiring with the token it revokes.
+    Writes are sent in pipelines of batch_size commands, requires the redis package.
+    """
+    def __init__(
+        self,
+        client=None,
+        url: Optional[str] = None,
+        prefix: Optional[str] = "authjwt:revoked:",
+        batch_size: Optional[int] = 1000,
+        timer: Callable[[],float] = time.time
+    ):
+        """
+        :param client: redis.Redis client, or
+        :param url: url of the Redis server, e.g. redis://localhost:6379/0
+        :param prefix: prefix of the keys
+        :param batch_size: commands sent in one pipeline
+        :param timer: returns the current time in seconds since the Epoch
+        """
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self._client = redis_client(client,url,"RedisRevocationStore")
+        self._timer = timer
+
+    def _write(self, commands: Iterable[Tuple[str,Optional[int],Union[str,int]]]) -> None:
+        now = int(self._timer())
+        pipeline, size = self._client.pipeline(transaction=False), 0
+        for key, exp, value in commands:
+            if exp is None:
+                pipeline.set(key,value)
+            elif exp > now:
+                # the key expires with the last token it revokes
+                pipeline.setex(key,exp - now,value)
+            else:
+                continue
+
+            size += 1
+            if size == self.batch_size:
+                pipeline.execute()
+                pipeline, size = self._client.pipeline(transaction=False), 0
+        if size:
+            pipeline.execute()
+
+    def revoke_many(self, revocations: Iterable[Tuple[str,Optional[int]]]) -> None:
+        self._write((self.prefix + "jti:" + jti, exp, 1) for jti, exp in revocations)
+
+    def is_revoked(self, jti: str) -> bool:
+        return bool(self._client.exists(self.prefix + "jti:" + jti))
+
+    def revoke_identities(self, revocations: Iterable[Tuple[Union[str,int],int,int]]) -> None:
+        self._write(
+            (self.prefix + "identity:" + json.dumps(identity), exp, revoked_at)
+            for identity, revoked_at, exp in revocations
+        )
+
+    def identity_revoked_at(self, identity: Union[str,int]) -> Optional[int]:
+        value = self._client.get(self.prefix + "identity:" + json.dumps(identity))
+        return int(value) if value is not None else None
+
+class WriteBehindRevocationStore(RevocationStore):
+    """
+    Wraps a durable store so revoking doesn't wait for it. Revocations are added to a
+    local list at once, so this worker rejects the tokens right away, and queued for a
+    background thread that writes them to the store in batches, a jti queued twice is
+    written once.
+
+    The queue is bounded, when it's full revoking waits up to block_timeout seconds for
+    room then writes to the store itself, revocations are never dropped. close() writes
+    what is still queued, call it when the application shuts down.
+    """
+    def __init__(
+        self,
+        store: RevocationStore,
+        max_queue: Optional[int] = 10000,
+        batch_size: Optional[int] = 500,
+        flush_interval: Optional[float] = 0.1,
+        block_timeout: Optional[float] = 1.0,
+        timer: Callable[[],float] = time.time
+    ):
+        """
+        :param store: durable store the revocations are written to
+        :param max_queue: maximum revocations waiting to be written
+        :param batch_size: maximum revocations written at once
+        :param flush_interval: seconds the writer waits to batch revocations
+        :param block_timeout: seconds a revocation waits when the queue is full
+        :param timer: returns the current time in seconds since the Epoch
+        """
+        if not isinstance(store, RevocationStore):
+            raise TypeError("store must be a RevocationStore")
+        if not isinstance(max_queue, int) or max_queue < 1:
+            raise TypeError("max_queue must be a positive integer")
+
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self._local = MemoryRevocationStore(timer=timer)
+        self._queue = queue.Queue(max_queue)
+        self._failed = {}
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        register_after_fork(self)
+
+    def __len__(self):
+        return self._queue.qsize() + len(self._failed)
+
+    def _after_fork(self) -> None:
+        self._queue = queue.Queue(self._queue.maxsize)
+        self._failed = {}
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def revoke_many(self, revocations: Iterable[Tuple[str,Optional[int]]]) -> None:
+        revocations = list(revocations)
+        self._local.revoke_many(revocations)
+
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        for index, revocation in enumerate(revocations):
+            try:
+                self._queue.put(revocation,timeout=self.block_timeout)
+            except queue.Full:
+                # the store can't keep up, write the rest ourselves
+                logger.warning("Revocation queue is full, writing to the store directly")
+                self.store.revoke_many(revocations[index:])
+                return
+
+    def is_revoked(self, jti: str) -> bool:
+        return self._local.is_revoked(jti) or self.store.is_revoked(jti)
+
+    def revoke_identities(self, revocations: Iterable[Tuple[Union[str,int],int,int]]) -> None:
+        # rare and small, written directly
+        revocations = list(revocations)
+        self._local.revoke_identities(revocations)
+        self.store.revoke_identities(revocations)
+
+    def identity_revoked_at(self, identity: Union[str,int]) -> Optional[int]:
+        revoked_at = self._local.identity_revoked_at(identity)
+        return revoked_at if revoked_at is not None else self.store.identity_revoked_at(identity)
+
+    def purge(self) -> None:
+        self._local.purge()
+        self.store.purge()
+
+    def flush(self) -> None:
+        """
+        Write the queued revocations now
+        """
+        with self._write_lock:
+            while True:
+                # a batch the store failed to write is retried first
+                batch, self._failed = self._failed, {}
+                while len(batch) < self.batch_size:
+                    try:
+                        jti, exp = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch[jti] = exp
+                if not batch:
+                    return
+                try:
+                    self.store.revoke_many(batch.items())
+                except Exception:
+                    self._failed = batch
+                    raise
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run,name="authjwt-write-behind",daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing revoked tokens failed, retrying")
+
+    def close(self) -> None:
+        """
+        Stop the writer after the queued revocations are written, then close the store
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self.store.close()
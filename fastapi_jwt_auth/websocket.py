@@ -0,0 +1,199 @@
+import time, heapq, asyncio, itertools
+from fastapi import HTTPException
+from fastapi_jwt_auth.auth_jwt import AuthJWT
+from starlette.websockets import WebSocket
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, Dict, Union
+
+class WebSocketAuth:
+    """
+    Authenticate WebSocket connections once when they're opened and close them with
+    code 1008 (policy violation) when their token expires (AUTHJWT_DECODE_LEEWAY seconds
+    after exp, like HTTP requests) or is revoked, messages are never verified again.
+
+    Every connection is scheduled on one heap of deadlines and a single loop timer is
+    armed for the earliest one, so thousands of connections share one timer instead of
+    a sleeping task each.
+    Revocation is checked again every revocation_interval seconds when the blacklist
+    is enabled for access tokens.
+    """
+    def __init__(
+        self,
+        auth_class: Optional[type] = AuthJWT,
+        revocation_interval: Optional[float] = 60,
+        query_param: Optional[str] = "token",
+        subprotocol: Optional[str] = "bearer",
+        close_code: Optional[int] = 1008
+    ):
+        """
+        :param auth_class: AuthJWT or a subclass with its own configuration
+        :param revocation_interval: seconds between two revocation checks, None to check only at connect
+        :param query_param: query parameter holding the token, e.g. /ws?token=<JWT>
+        :param subprotocol: subprotocol announcing the token in Sec-WebSocket-Protocol,
+                            e.g. new WebSocket(url, ["bearer", "<JWT>"]) in browsers
+        :param close_code: code sent when a connection is refused or closed
+        """
+        if revocation_interval is not None and revocation_interval <= 0:
+            raise ValueError("revocation_interval must be positive")
+
+        self.auth_class = auth_class
+        self.revocation_interval = revocation_interval
+        self.query_param = query_param
+        self.subprotocol = subprotocol
+        self.close_code = close_code
+
+        self._connections = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._loop = None
+        self._timer = None
+
+    def __len__(self):
+        return len(self._connections)
+
+    def get_token(self, websocket: WebSocket) -> Optional[str]:
+        """
+        :return: token from the query parameter, the Authorization header or the subprotocols
+        """
+        if self.query_param and websocket.query_params.get(self.query_param):
+            return websocket.query_params[self.query_param]
+
+        authorization = websocket.headers.get('authorization')
+        if authorization:
+            scheme, _, token = authorization.partition(' ')
+            if scheme == 'Bearer' and token:
+                return token
+
+        subprotocols = websocket.scope.get('subprotocols') or []
+        if self.subprotocol in subprotocols:
+            index = subprotocols.index(self.subprotocol)
+            if index + 1 < len(subprotocols):
+                return subprotocols[index + 1]
+        return None
+
+    async def authenticate(self, websocket: WebSocket) -> Optional[Dict[str,Union[str,int,bool]]]:
+        """
+        Verify the access token of the connection like jwt_required, before accepting it.
+        An invalid connection is closed and None is returned, otherwise the connection is
+        scheduled to be closed when the token expires. Call unregister when it's closed.
+
+        :param websocket: connection to authenticate
+        :return: claims of the token
+        """
+        token = self.get_token(websocket)
+        try:
+            if token is None:
+                raise HTTPException(status_code=401,detail="Missing token")
+            Authorize = self.auth_class(f"Bearer {token}")
+            if Authorize._config.blacklist_enabled:
+                # the blacklist callback may block on its store, keep it off the event loop
+                await run_in_threadpool(Authorize.jwt_required)
+            else:
+                Authorize.jwt_required()
+        except HTTPException:
+            await websocket.close(code=self.close_code)
+            return None
+
+        claims = Authorize.get_raw_jwt()
+        self.register(websocket,claims,Authorize)
+        return claims
+
+    def register(self, websocket: WebSocket, claims: Dict[str,Union[str,int,bool]], Authorize: AuthJWT) -> None:
+        """
+        Schedule a connection verified elsewhere
+
+        :param websocket: accepted or accepting connection
+        :param claims: claims of its verified token
+        :param Authorize: AuthJWT instance that verified the token
+        """
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            # connections of another loop can't be closed from this one
+            self._loop, self._timer = loop, None
+            self._connections.clear()
+            self._heap.clear()
+
+        self._connections[id(websocket)] = (websocket, claims, Authorize)
+        self._schedule(websocket,claims)
+
+    def unregister(self, websocket: WebSocket) -> None:
+        """
+        Stop watching a connection, its pending deadline is skipped
+        """
+        self._forget(websocket)
+        if not self._connections and self._timer is not None:
+            # nothing left to watch, don't keep the timer armed on the loop
+            self._timer.cancel()
+            self._timer = None
+            self._heap.clear()
+
+    def _forget(self, websocket: WebSocket) -> None:
+        entry = self._connections.get(id(websocket))
+        if entry is not None and entry[0] is websocket:
+            del self._connections[id(websocket)]
+
+    def _expires_at(self, claims: Dict[str,Union[str,int,bool]]) -> Optional[float]:
+        # a token is accepted until exp + leeway, the connection stays open as long
+        if 'exp' not in claims:
+            return None
+        return claims['exp'] + self.auth_class._config.decode_leeway
+
+    def _schedule(self, websocket: WebSocket, claims: Dict[str,Union[str,int,bool]]) -> None:
+        deadline = self._expires_at(claims)
+        if self.revocation_interval is not None and self._checks_revocation(claims):
+            recheck = time.time() + self.revocation_interval
+            deadline = recheck if deadline is None else min(deadline,recheck)
+        if deadline is None:
+            return
+
+        # the sequence breaks ties, websockets are never compared
+        heapq.heappush(self._heap,(deadline, next(self._sequence), websocket))
+        if self._heap[0][2] is websocket:
+            self._arm()
+
+    def _checks_revocation(self, claims: Dict[str,Union[str,int,bool]]) -> bool:
+        config = self.auth_class._config
+        return config.blacklist_enabled and claims['type'] in config.blacklist_token_checks
+
+    def _arm(self) -> None:
+        """
+        Arm the timer for the earliest deadline
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._heap:
+            delay = max(0, self._heap[0][0] - time.time())
+            self._timer = self._loop.call_later(delay,self._fire)
+
+    def _fire(self) -> None:
+        self._timer = None
+        heap, now = self._heap, time.time()
+        while heap and heap[0][0] <= now:
+            _, _, websocket = heapq.heappop(heap)
+            entry = self._connections.get(id(websocket))
+            if entry is not None and entry[0] is websocket:
+                self._loop.create_task(self._check(*entry))
+        self._arm()
+
+    async def _check(self, websocket: WebSocket, claims: Dict[str,Union[str,int,bool]], Authorize: AuthJWT) -> None:
+        expires_at = self._expires_at(claims)
+        if expires_at is not None and expires_at <= time.time():
+            await self._close(websocket)
+            return
+
+        if self._checks_revocation(claims):
+            try:
+                await run_in_threadpool(Authorize._check_token_is_revoked,claims)
+            except HTTPException:
+                await self._close(websocket)
+                return
+        self._schedule(websocket,claims)
+
+    async def _close(self, websocket: WebSocket) -> None:
+        self._forget(websocket)
+        try:
+            await websocket.close(code=self.close_code)
+        except RuntimeError:
+            # already closed by the client or the endpoint
+            pass
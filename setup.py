@@ -16,8 +16,12 @@ setuptools.setup(
     zip_safe=False,
     install_requires=[
         'fastapi>=0.61.0',
-        'PyJWT>=1.7.1'
+        'PyJWT>=1.7.1',
+        'contextvars>=2.4;python_version<"3.7"'
     ],
+    extras_require={
+        'redis': ['redis>=3.5']
+    },
     classifiers=[
         "Environment :: Web Environment",
         "Intended Audience :: Developers",
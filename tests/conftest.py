@@ -1,6 +1,25 @@
 import pytest
 from fastapi_jwt_auth import AuthJWT
 
+class Clock:
+    """
+    Timer of the components under test, moved by setting now
+    """
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
 @pytest.fixture(scope="module")
 def Authorize():
     return AuthJWT(authorization=None)
+
+@pytest.fixture(scope="function")
+def restore_config():
+    """
+    Put back the configuration and the blacklist callback the test started with
+    """
+    config, callback = AuthJWT._config, AuthJWT._token_in_blacklist_callback
+    yield
+    AuthJWT._config, AuthJWT._token_in_blacklist_callback = config, callback
@@ -0,0 +1,173 @@
+import pytest, time, threading
+from fastapi_jwt_auth import AuthJWT, CircuitBreaker
+from fastapi_jwt_auth.breaker import Unavailable, CLOSED, OPEN, HALF_OPEN
+from fastapi_jwt_auth.metrics import metrics
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from .conftest import Clock
+
+class Blacklist:
+    def __init__(self):
+        self.revoked = set()
+        self.down = False
+        self.delay = 0
+        self.calls = 0
+
+    def __call__(self, raw_token):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.down:
+            raise ConnectionError("store is down")
+        return raw_token['jti'] in self.revoked
+
+@pytest.fixture(scope='function')
+def blacklist(restore_config):
+    blacklist = Blacklist()
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",["access"])
+    ])
+
+    @AuthJWT.token_in_blacklist_loader
+    def check_if_token_in_blacklist(decrypted_token):
+        return blacklist(decrypted_token)
+
+    metrics.reset()
+    return blacklist
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    client = TestClient(app)
+    return client
+
+def test_breaker_opens_and_recovers(blacklist):
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2,reset_timeout=30,timer=clock)
+    raw_token = {'jti': 'a'}
+
+    blacklist.down = True
+    for _ in range(2):
+        with pytest.raises(Unavailable):
+            breaker.call(blacklist,raw_token)
+    assert breaker.state == OPEN and blacklist.calls == 2
+    assert metrics.get('blacklist_failures') == 2
+    assert metrics.get('blacklist_breaker_opened') == 1
+    assert metrics.get('blacklist_breaker_open') == 1
+
+    # open, the callback isn't called
+    with pytest.raises(Unavailable):
+        breaker.call(blacklist,raw_token)
+    assert blacklist.calls == 2 and metrics.get('blacklist_breaker_rejected') == 1
+
+    # half open, a failed try opens it again
+    clock.now = 30
+    with pytest.raises(Unavailable):
+        breaker.call(blacklist,raw_token)
+    assert breaker.state == OPEN and blacklist.calls == 3
+
+    clock.now = 60
+    blacklist.down = False
+    assert breaker.call(blacklist,raw_token) is False
+    assert breaker.state == CLOSED and metrics.get('blacklist_breaker_open') == 0
+
+def test_timeout(blacklist):
+    blacklist.delay = 0.2
+    breaker = CircuitBreaker(timeout=0.01,failure_threshold=1,policy='fail-open')
+
+    start = time.monotonic()
+    assert breaker.call(blacklist,{'jti': 'a'}) is False
+    assert time.monotonic() - start < 0.15
+    assert breaker.state == OPEN and metrics.get('blacklist_timeouts') == 1
+
+def test_stale_policy(blacklist):
+    breaker = CircuitBreaker(failure_threshold=1,policy='stale')
+    blacklist.revoked.add('a')
+    assert breaker.call(blacklist,{'jti': 'a'}) is True
+    assert breaker.call(blacklist,{'jti': 'b'}) is False
+
+    blacklist.down = True
+    assert breaker.call(blacklist,{'jti': 'a'}) is True
+    assert breaker.call(blacklist,{'jti': 'b'}) is False
+    assert metrics.get('blacklist_stale_served') == 2
+    # never answered, rejected
+    with pytest.raises(Unavailable):
+        breaker.call(blacklist,{'jti': 'c'})
+
+    breaker.reset()
+    assert breaker.state == CLOSED
+
+def test_invalid_breaker():
+    with pytest.raises(TypeError,match=r"timeout"):
+        CircuitBreaker(timeout=0)
+    with pytest.raises(TypeError,match=r"failure_threshold"):
+        CircuitBreaker(failure_threshold=0)
+    with pytest.raises(ValueError,match=r"policy"):
+        CircuitBreaker(policy='retry')
+    with pytest.raises(TypeError,match=r"blacklist_breaker"):
+        AuthJWT.load_blacklist_breaker("breaker")
+
+@pytest.mark.parametrize("policy,status_code",[("fail-closed",503),("fail-open",200)])
+def test_policy_of_protected_endpoint(client,blacklist,Authorize,policy,status_code):
+    AuthJWT.load_blacklist_breaker(CircuitBreaker(failure_threshold=1,policy=policy))
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get('/protected',headers=headers).status_code == 200
+
+    blacklist.revoked.add(Authorize.get_jti(token))
+    response = client.get('/protected',headers=headers)
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Token has been revoked'}
+
+    blacklist.revoked.clear()
+    blacklist.down = True
+    response = client.get('/protected',headers=headers)
+    assert response.status_code == status_code
+    if status_code == 503:
+        assert response.json() == {'detail': 'Unable to check if the token has been revoked'}
+
+def test_half_open_single_trial(blacklist):
+    clock = Clock()
+    breaker = CircuitBreaker(timeout=5,failure_threshold=1,reset_timeout=30,timer=clock)
+    raw_token = {'jti': 'a'}
+    started, release = threading.Event(), threading.Event()
+
+    def slow_failure(raw_token):
+        blacklist.calls += 1
+        started.set()
+        release.wait(5)
+        raise ConnectionError("store is down")
+
+    blacklist.down = True
+    with pytest.raises(Unavailable):
+        breaker.call(blacklist,raw_token)
+    assert breaker.state == OPEN
+
+    clock.now = 30
+    errors = []
+    def trial():
+        try:
+            breaker.call(slow_failure,raw_token)
+        except Unavailable as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=trial)
+    thread.start()
+    assert started.wait(5) and breaker.state == HALF_OPEN
+
+    # only the trial call reaches the callback, the others use the policy
+    with pytest.raises(Unavailable):
+        breaker.call(blacklist,raw_token)
+    assert blacklist.calls == 2
+
+    release.set()
+    thread.join()
+    assert len(errors) == 1 and breaker.state == OPEN and breaker._opened_at == 30
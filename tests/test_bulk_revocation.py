@@ -0,0 +1,185 @@
+import pytest, time
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.revocation import RevocationBus
+from fastapi_jwt_auth.stores import MemoryRevocationStore, SQLiteRevocationStore, RedisRevocationStore
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+class LocalTransport:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, message):
+        self.messages.append(message)
+
+    def listen(self, callback):
+        pass
+
+    def close(self):
+        pass
+
+class Pipeline:
+    def __init__(self, client):
+        self.client, self.commands = client, []
+
+    def set(self, key, value):
+        self.commands.append((key, None, value))
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+
+    def execute(self):
+        self.client.executed.append(len(self.commands))
+        for key, ttl, value in self.commands:
+            self.client.data[key] = (ttl, str(value).encode())
+
+class Redis:
+    def __init__(self):
+        self.data, self.executed = {}, []
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def get(self, key):
+        return self.data[key][1] if key in self.data else None
+
+@pytest.fixture(scope='function')
+def bulk(restore_config):
+    store, bus = MemoryRevocationStore(), RevocationBus(LocalTransport())
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",["access","refresh"])
+    ])
+    AuthJWT._token_in_blacklist_callback = None
+    AuthJWT.load_revocation_store(store)
+    AuthJWT.load_revocation_bus(bus)
+    return store, bus
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    client = TestClient(app)
+    return client
+
+def test_revoke_many(client,bulk,Authorize):
+    store, bus = bulk
+    tokens = [Authorize.create_access_token(identity=index) for index in range(5)]
+    expired = Authorize.create_access_token(identity='expired',expires_time=-10)
+    calls = []
+
+    revoked = Authorize.revoke_many(
+        tokens + [expired, ('jti-1',int(time.time()) + 60), 'jti-2'],
+        batch_size=3,
+        progress=lambda done, total: calls.append((done, total))
+    )
+    assert revoked == 7
+    assert calls == [(3,8),(6,8),(7,8)]
+    assert len(bus.transport.messages) == 3
+
+    assert store.is_revoked('jti-1') and store.is_revoked('jti-2') and 'jti-2' in bus.revoked
+    for token in tokens:
+        response = client.get('/protected',headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+        assert response.status_code == 401
+
+    # generators have no length
+    Authorize.revoke_many((jti for jti in ['jti-3']),progress=lambda done, total: calls.append((done, total)))
+    assert calls[-1] == (1,None)
+
+def test_revoke_identities(client,bulk,Authorize):
+    store, bus = bulk
+    token = Authorize.create_access_token(identity=1).decode('utf-8')
+    other = Authorize.create_access_token(identity='1').decode('utf-8')
+
+    # tokens issued in the second of the revocation are revoked too
+    assert Authorize.revoke_identities([1,'someone']) == 2
+    assert store.identity_revoked_at(1) is not None and bus.revoked.identity_revoked_at('someone') is not None
+
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    response = client.get('/protected',headers={"Authorization": f"Bearer {other}"})
+    assert response.status_code == 200
+
+    # reset the password, revoke, then log in again from the next second
+    time.sleep(1)
+    token = Authorize.create_access_token(identity=1).decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+def test_sqlite_identities(tmpdir):
+    store = SQLiteRevocationStore(str(tmpdir.join("revoked.db")))
+    now = int(time.time())
+    store.revoke_identities([(1, now, now + 60),('gone', now - 120, now - 60)])
+    assert store.identity_revoked_at(1) == now
+    assert store.identity_revoked_at('1') is None and store.identity_revoked_at('gone') is None
+    store.purge()
+    assert store._connection().execute("SELECT COUNT(*) FROM revoked_identities").fetchone()[0] == 1
+    store.close()
+
+def test_redis_store():
+    client = Redis()
+    store = RedisRevocationStore(client=client,batch_size=2,timer=lambda: 1000)
+    store.revoke_many([('a',1060),('b',None),('c',900),('d',1010)])
+    assert client.executed == [2,1]
+    assert client.data['authjwt:revoked:jti:a'][0] == 60 and client.data['authjwt:revoked:jti:b'][0] is None
+    assert store.is_revoked('a') and not store.is_revoked('c')
+
+    store.revoke_identities([(1, 1000, 2000)])
+    assert store.identity_revoked_at(1) == 1000 and store.identity_revoked_at('1') is None
+
+def test_bus_batches():
+    bus = RevocationBus(LocalTransport(),key='shared')
+    bus.publish([(str(index), None) for index in range(1200)])
+    assert len(bus.transport.messages) == 3 and len(bus.revoked) == 1200
+
+    other = RevocationBus(LocalTransport(),key='shared')
+    for message in bus.transport.messages:
+        other.receive(message)
+    assert len(other.revoked) == 1200
+
+def test_bus_signatures():
+    bus = RevocationBus(LocalTransport(),key='shared')
+    with pytest.raises(TypeError,match=r"key"):
+        bus.set_key('')
+    with pytest.raises(RuntimeError,match=r"key"):
+        RevocationBus(LocalTransport()).publish([('a',None)])
+
+    bus.publish([('a',None)])
+    message = bus.transport.messages[0]
+    payload = message[32:]
+
+    stranger, keyless = RevocationBus(LocalTransport(),key='other'), RevocationBus(LocalTransport())
+    for receiver in (stranger, keyless):
+        receiver.receive(message)
+        assert 'a' not in receiver.revoked
+
+    other = RevocationBus(LocalTransport(),key='shared')
+    # unsigned and tampered messages are dropped
+    other.receive(payload)
+    other.receive(message[:32] + payload.replace(b'"a"',b'"b"'))
+    assert len(other.revoked) == 0
+    other.receive(message)
+    assert 'a' in other.revoked
+
+def test_bus_key_from_config(restore_config):
+    AuthJWT.reload_config(lambda: [("authjwt_secret_key",None)])
+    with pytest.raises(RuntimeError,match=r"AUTHJWT_SECRET_KEY"):
+        AuthJWT.load_revocation_bus(RevocationBus(LocalTransport()))
+
+    AuthJWT.reload_config(lambda: [("authjwt_secret_key","secret-key")])
+    bus = RevocationBus(LocalTransport())
+    AuthJWT.load_revocation_bus(bus)
+    bus.publish([('a',None)])
+    other = RevocationBus(LocalTransport())
+    AuthJWT.load_revocation_bus(other)
+    other.receive(bus.transport.messages[0])
+    assert 'a' in other.revoked
@@ -0,0 +1,62 @@
+import pytest
+from fastapi_jwt_auth.cache import TTLCache
+from .conftest import Clock
+
+def test_ttl_cache():
+    clock = Clock()
+    cache = TTLCache(3,10,timer=clock)
+
+    cache.set('a',1)
+    cache.set('b',2,ttl=1)
+    assert cache.get('a') == 1 and 'b' in cache
+
+    clock.now = 5
+    assert 'b' not in cache and cache.get('b','gone') == 'gone'
+    assert len(cache) == 1
+
+    # full cache evicts the oldest entry
+    cache.set('c',3)
+    cache.set('d',4)
+    cache.set('e',5)
+    assert 'a' not in cache and len(cache) == 3
+
+    clock.now = 20
+    assert cache.pop('c','expired') == 'expired'
+    cache.set('f',6)
+    assert len(cache) == 1
+
+    calls = []
+    assert cache.get_or_set('g',lambda: calls.append(1) or 7) == 7
+    assert cache.get_or_set('g',lambda: calls.append(1) or 8) == 7
+    assert len(calls) == 1
+
+    cache.clear()
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError,match=r"maxsize"):
+        TTLCache(0,10)
+    with pytest.raises(ValueError,match=r"ttl"):
+        TTLCache(10,0)
+
+def test_get_or_set_per_key():
+    import threading
+    cache = TTLCache(10,10)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    thread = threading.Thread(target=cache.get_or_set,args=('a',slow))
+    thread.start()
+    started.wait(5)
+    # another key is not blocked by the factory of 'a'
+    assert cache.get_or_set('b',lambda: 'fast') == 'fast'
+    release.set()
+    thread.join()
+    assert cache.get('a') == 'slow'
+
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_set('c',lambda: 1 / 0)
+    assert 'c' not in cache and not cache._pending
@@ -0,0 +1,109 @@
+import pytest, jwt
+from fastapi_jwt_auth import AuthJWT, Claims
+from fastapi_jwt_auth.claims import compact_claims, expand_claims
+from fastapi_jwt_auth.context import get_current_claims
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+@pytest.fixture(scope='function')
+def compact(restore_config):
+    AuthJWT.reload_config(lambda: [("authjwt_secret_key","secret-key"),("authjwt_claims_profile","compact")])
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/raw_token')
+    def raw_token(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return Authorize.get_raw_jwt()
+
+    @app.get('/claims')
+    def claims(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_optional()
+        claims = Authorize.get_jwt_claims()
+        if claims is None:
+            return None
+        assert claims is Authorize.get_jwt_claims() and claims is get_current_claims()
+        return {'identity': claims.identity, 'type': claims.type, 'fresh': claims.fresh, 'role': claims.get('role')}
+
+    @app.get('/fresh')
+    def fresh(Authorize: AuthJWT = Depends()):
+        Authorize.fresh_jwt_required()
+        return Authorize.get_jwt_identity()
+
+    @app.get('/refresh')
+    def refresh(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_refresh_token_required()
+        return Authorize.get_jwt_identity()
+
+    client = TestClient(app)
+    return client
+
+def test_claims_profile_config():
+    with pytest.raises(ValidationError,match=r"AUTHJWT_CLAIMS_PROFILE"):
+        AuthJWT.reload_config(lambda: [("authjwt_claims_profile","tiny")])
+
+def test_compact_round_trip():
+    claims = {'iat': 10, 'nbf': 10, 'exp': 20, 'jti': 'x', 'identity': 1, 'type': 'access', 'fresh': False}
+    assert compact_claims(claims) == {'iat': 10, 'exp': 20, 'jti': 'x', 'i': 1, 't': 0}
+    assert expand_claims(compact_claims(claims)) == claims
+
+    claims = {'iat': 10, 'nbf': 12, 'jti': 'x', 'identity': 'a', 'type': 'refresh'}
+    assert compact_claims(claims) == {'iat': 10, 'nbf': 12, 'jti': 'x', 'i': 'a', 't': 1}
+    assert expand_claims(compact_claims(claims)) == claims
+
+def test_compact_tokens(client,compact,Authorize):
+    access_token = Authorize.create_access_token(identity='test',fresh=True)
+    payload = jwt.decode(access_token,'secret-key',algorithms='HS256')
+    assert set(payload) == {'iat','exp','jti','i','t','f'}
+    assert len(payload['jti']) == 22
+
+    # public API is the same for both profiles
+    response = client.get('/raw_token',headers={"Authorization": f"Bearer {access_token.decode('utf-8')}"})
+    raw_token = response.json()
+    assert set(raw_token) == {'iat','nbf','exp','jti','identity','type','fresh'}
+    assert raw_token['nbf'] == raw_token['iat']
+    assert (raw_token['identity'], raw_token['type'], raw_token['fresh']) == ('test','access',True)
+
+    response = client.get('/fresh',headers={"Authorization": f"Bearer {access_token.decode('utf-8')}"})
+    assert response.json() == 'test'
+
+    refresh_token = Authorize.create_refresh_token(identity=1)
+    response = client.get('/refresh',headers={"Authorization": f"Bearer {refresh_token.decode('utf-8')}"})
+    assert response.json() == 1
+    response = client.get('/raw_token',headers={"Authorization": f"Bearer {refresh_token.decode('utf-8')}"})
+    assert response.json() == {'detail': 'Only access tokens are allowed'}
+
+    assert len(access_token) < len(jwt.encode(expand_claims(payload),'secret-key',algorithm='HS256'))
+
+def test_default_tokens_accepted_by_compact_profile(client,compact):
+    token = jwt.encode({'jti': '1', 'identity': 'test', 'type': 'access', 'fresh': True},'secret-key',algorithm='HS256')
+    response = client.get('/fresh',headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+    assert response.json() == 'test'
+
+def test_claims_view():
+    raw = {'iat': 10, 'nbf': 10, 'exp': 20, 'jti': 'x', 'identity': 1, 'type': 'access', 'fresh': True, 'role': 'admin'}
+    claims = Claims(raw)
+    assert (claims.identity, claims.type, claims.fresh) == (1, 'access', True)
+    assert (claims.iat, claims.nbf, claims.exp, claims.jti) == (10, 10, 20, 'x')
+    assert claims.iss is None and claims.aud is None and claims.sub is None
+    assert claims['role'] == 'admin' and 'role' in claims and claims.get('scope') is None
+    assert dict(claims) == raw and claims == raw and len(claims) == 8
+    assert claims.raw is raw
+    assert not hasattr(claims,'__dict__')
+
+    with pytest.raises(KeyError):
+        claims['scope']
+    with pytest.raises(AttributeError):
+        claims.identity = 2
+
+    assert Claims({'identity': 'a', 'type': 'refresh'}).fresh is False
+
+def test_get_jwt_claims(client,compact,Authorize):
+    assert client.get('/claims').json() is None
+
+    access_token = Authorize.create_access_token(identity='test',fresh=True).decode('utf-8')
+    response = client.get('/claims',headers={"Authorization": f"Bearer {access_token}"})
+    assert response.json() == {'identity': 'test', 'type': 'access', 'fresh': True, 'role': None}
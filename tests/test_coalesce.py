@@ -0,0 +1,112 @@
+import pytest, jwt, threading, time, contextvars
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.metrics import metrics
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+lookups = []
+
+@pytest.fixture(scope='function')
+def coalesce(restore_config):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",["refresh"]),
+        ("authjwt_refresh_coalesce_window",2)
+    ])
+
+    @AuthJWT.token_in_blacklist_loader
+    def check_if_token_in_blacklist(decrypted_token):
+        lookups.append(decrypted_token['jti'])
+        time.sleep(0.05)
+        return False
+
+    lookups.clear()
+    metrics.reset()
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.post('/refresh')
+    def refresh(Authorize: AuthJWT = Depends()):
+        access_token = Authorize.refresh_access_token()
+        return {'access_token': access_token.decode('utf-8'), 'identity': Authorize.get_jwt_identity()}
+
+    client = TestClient(app)
+    return client
+
+def test_coalesce_config():
+    with pytest.raises(ValidationError,match=r"AUTHJWT_REFRESH_COALESCE_WINDOW"):
+        AuthJWT.reload_config(lambda: [("authjwt_refresh_coalesce_window","soon")])
+
+def test_concurrent_refresh(coalesce,Authorize):
+    token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+    results = []
+
+    def refresh():
+        results.append(AuthJWT(f"Bearer {token}").refresh_access_token())
+
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 1 and len(lookups) == 1
+    assert metrics.get('refresh_issued') == 1 and metrics.get('refresh_coalesced') == 7
+
+def test_coalesce_same_arguments_only(coalesce,Authorize):
+    token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+
+    def refresh(**kwargs):
+        # each call runs in its own context like a request
+        return contextvars.copy_context().run(AuthJWT(f"Bearer {token}").refresh_access_token,**kwargs)
+
+    first = refresh()
+    assert refresh() == first
+
+    # a caller asking for another token gets its own
+    fresh = refresh(fresh=True,expires_time=10)
+    claims = jwt.decode(fresh,'secret-key',algorithms='HS256')
+    assert fresh != first and claims['fresh'] is True and claims['exp'] - claims['iat'] == 10
+
+    other = refresh(headers={'kid':'a'},audience=['app'])
+    assert other not in (first, fresh)
+    assert metrics.get('refresh_issued') == 3 and metrics.get('refresh_coalesced') == 1
+
+def test_coalesce_window(client,coalesce,Authorize):
+    token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+    other = Authorize.create_refresh_token(identity='other').decode('utf-8')
+
+    first = client.post('/refresh',headers={"Authorization": f"Bearer {token}"}).json()
+    second = client.post('/refresh',headers={"Authorization": f"Bearer {token}"}).json()
+    assert first == second and first['identity'] == 'test'
+    assert jwt.decode(first['access_token'],'secret-key',algorithms='HS256')['type'] == 'access'
+
+    # another refresh token gets its own access token
+    response = client.post('/refresh',headers={"Authorization": f"Bearer {other}"})
+    assert response.json()['identity'] == 'other'
+    assert metrics.snapshot() == {'refresh_issued': 2, 'refresh_coalesced': 1}
+
+    # failures are not shared, every request is verified again
+    access_token = Authorize.create_access_token(identity='test').decode('utf-8')
+    for _ in range(2):
+        response = client.post('/refresh',headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 422
+    response = client.post('/refresh')
+    assert response.status_code == 401
+
+def test_refresh_without_window(client,coalesce,Authorize):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",["refresh"])
+    ])
+    token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+
+    for _ in range(2):
+        response = client.post('/refresh',headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+    assert len(lookups) == 2 and metrics.get('refresh_issued') == 2
@@ -0,0 +1,81 @@
+import pytest, jwt, json, time
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.compression import deflate, encode_compressed
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+@pytest.fixture(scope='function')
+def compression(restore_config):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_compression_threshold",256),
+        ("authjwt_max_decompressed_size",4096)
+    ])
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/raw_token')
+    def raw_token(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return Authorize.get_raw_jwt()
+
+    client = TestClient(app)
+    return client
+
+def test_compression_config():
+    with pytest.raises(ValidationError,match=r"AUTHJWT_COMPRESSION_THRESHOLD"):
+        AuthJWT.reload_config(lambda: [("authjwt_compression_threshold","big")])
+    with pytest.raises(ValidationError,match=r"AUTHJWT_MAX_DECOMPRESSED_SIZE"):
+        AuthJWT.reload_config(lambda: [("authjwt_compression_threshold",256)])
+
+def test_compress_large_tokens(client,compression,Authorize):
+    small = Authorize.create_access_token(identity='test')
+    assert 'zip' not in Authorize.get_unverified_jwt_headers(small)
+
+    identity = 'x' * 1000
+    large = Authorize.create_access_token(identity=identity)
+    assert Authorize.get_unverified_jwt_headers(large)['zip'] == 'DEF'
+    assert len(large) < 500
+
+    for token in [small,large]:
+        response = client.get('/raw_token',headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+        assert response.status_code == 200
+    assert response.json()['identity'] == identity
+
+def test_compressed_token_validation(client,compression):
+    def compressed(claims, key='secret-key'):
+        return encode_compressed(json.dumps(claims).encode('utf-8'),key,'HS256').decode('utf-8')
+
+    claims = {'jti': '1', 'identity': 'test', 'type': 'access', 'fresh': False}
+
+    # signature is checked before anything is decompressed
+    response = client.get('/raw_token',headers={"Authorization": f"Bearer {compressed(claims,key='other')}"})
+    assert response.json() == {'detail': 'Signature verification failed'}
+
+    # claims are validated like uncompressed tokens
+    token = compressed({**claims, 'exp': int(time.time()) - 10})
+    response = client.get('/raw_token',headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == {'detail': 'Signature has expired'}
+
+    AuthJWT._config = AuthJWT._config.replace(decode_audience='api')
+    response = client.get('/raw_token',headers={"Authorization": f"Bearer {compressed(claims)}"})
+    assert response.json() == {'detail': 'Token is missing the "aud" claim'}
+    AuthJWT._config = AuthJWT._config.replace(decode_audience=None)
+
+    # zip bomb
+    token = compressed({**claims, 'padding': ' ' * 100000})
+    assert len(token) < 1000
+    response = client.get('/raw_token',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Decompressed payload is too large'}
+
+    token = jwt.api_jws.encode(b'not deflate','secret-key',headers={'zip': 'DEF'}).decode('utf-8')
+    response = client.get('/raw_token',headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == {'detail': 'Invalid compressed payload'}
+
+    truncated = jwt.api_jws.encode(deflate(b'{"identity": "test"}')[:-3],'secret-key',headers={'zip': 'DEF'})
+    response = client.get('/raw_token',headers={"Authorization": f"Bearer {truncated.decode('utf-8')}"})
+    assert response.json() == {'detail': 'Invalid compressed payload'}
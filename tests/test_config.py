@@ -1,7 +1,8 @@
-import pytest
+import pytest, contextvars
 from .utils import reset_config
 from fastapi_jwt_auth import AuthJWT
-from fastapi import FastAPI, Depends
+from fastapi_jwt_auth.config import AuthConfig
+from fastapi import FastAPI, Depends, Response
 from fastapi.testclient import TestClient
 from pydantic import BaseSettings, ValidationError
 from typing import Sequence
@@ -20,23 +21,20 @@ def client():
 
 def test_default_config():
     reset_config()
-    assert AuthJWT._token is None
-    assert AuthJWT._secret_key is None
-    assert AuthJWT._algorithm == 'HS256'
-    assert AuthJWT._decode_algorithms is None
-    assert AuthJWT._decode_leeway == 0
-    assert AuthJWT._encode_issuer is None
-    assert AuthJWT._decode_issuer is None
-    assert AuthJWT._decode_audience is None
-    assert AuthJWT._blacklist_enabled is None
-    assert AuthJWT._blacklist_token_checks == []
+    assert AuthJWT(authorization=None)._token is None
+    assert AuthJWT._config.secret_key is None
+    assert AuthJWT._config.algorithm == 'HS256'
+    assert AuthJWT._config.decode_algorithms == ('HS256',)
+    assert AuthJWT._config.decode_leeway == 0
+    assert AuthJWT._config.encode_issuer is None
+    assert AuthJWT._config.decode_issuer is None
+    assert AuthJWT._config.decode_audience is None
+    assert AuthJWT._config.blacklist_enabled is False
+    assert AuthJWT._config.blacklist_token_checks == frozenset()
     assert AuthJWT._token_in_blacklist_callback is None
 
-    assert AuthJWT._access_token_expires.__class__ == timedelta
-    assert int(AuthJWT._access_token_expires.total_seconds()) == 900
-
-    assert AuthJWT._refresh_token_expires.__class__ == timedelta
-    assert int(AuthJWT._refresh_token_expires.total_seconds()) == 2592000
+    assert AuthJWT._config.access_token_expires == 900
+    assert AuthJWT._config.refresh_token_expires == 2592000
 
 def test_secret_key_not_exist(client,Authorize):
     reset_config()
@@ -94,17 +92,20 @@ def test_load_env_from_outside():
     def get_valid_settings():
         return Settings()
 
-    assert AuthJWT._secret_key == "testing"
-    assert AuthJWT._algorithm == "HS256"
-    assert AuthJWT._decode_algorithms == ['HS256']
-    assert AuthJWT._decode_leeway == timedelta(seconds=8)
-    assert AuthJWT._encode_issuer == "urn:foo"
-    assert AuthJWT._decode_issuer == "urn:foo"
-    assert AuthJWT._decode_audience == 'urn:foo'
-    assert AuthJWT._blacklist_token_checks == ['access','refresh']
-    assert AuthJWT._blacklist_enabled == "false"
-    assert AuthJWT._access_token_expires == timedelta(minutes=2)
-    assert AuthJWT._refresh_token_expires == timedelta(days=5)
+    assert AuthJWT._config.secret_key == "testing"
+    assert AuthJWT._config.algorithm == "HS256"
+    assert AuthJWT._config.decode_algorithms == ('HS256',)
+    assert AuthJWT._config.decode_leeway == 8
+    assert AuthJWT._config.encode_issuer == "urn:foo"
+    assert AuthJWT._config.decode_issuer == "urn:foo"
+    assert AuthJWT._config.decode_audience == 'urn:foo'
+    assert AuthJWT._config.blacklist_token_checks == frozenset(['access','refresh'])
+    assert AuthJWT._config.blacklist_enabled is False
+    assert AuthJWT._config.access_token_expires == 120
+    assert AuthJWT._config.refresh_token_expires == 432000
+
+    # invalid settings leave the current snapshot untouched
+    config = AuthJWT._config
 
     with pytest.raises(TypeError,match=r"Config"):
         @AuthJWT.load_config
@@ -166,4 +167,70 @@ def test_load_env_from_outside():
         def get_invalid_refresh_token():
             return [("authjwt_refresh_token_expires","lol")]
 
+    assert AuthJWT._config is config
+
+    reset_config()
+
+def test_config_snapshot_is_immutable():
+    config = AuthConfig(secret_key="testing")
+
+    with pytest.raises(AttributeError,match=r"immutable"):
+        config.secret_key = "other"
+
+    with pytest.raises(TypeError,match=r"Unknown config field"):
+        AuthConfig(secret="testing")
+
+    other = config.replace(algorithm="HS384")
+    assert other is not config
+    assert other.algorithm == "HS384" and other.secret_key == "testing"
+    assert config.algorithm == "HS256"
+    assert "testing" not in repr(config)
+
+def test_independent_config_per_subclass(Authorize):
     reset_config()
+
+    class TenantAuth(AuthJWT):
+        pass
+
+    @TenantAuth.load_config
+    def get_settings():
+        return [("authjwt_secret_key","tenant-secret"),("authjwt_access_token_expires",60)]
+
+    assert TenantAuth._config.secret_key == "tenant-secret"
+    assert TenantAuth._config.access_token_expires == 60
+    assert AuthJWT._config.secret_key is None
+
+    token = TenantAuth(authorization=None).create_access_token(identity='test')
+    assert TenantAuth(authorization=f"Bearer {token.decode('utf-8')}").get_jwt_identity() == 'test'
+
+    with pytest.raises(RuntimeError,match=r"AUTHJWT_SECRET_KEY"):
+        Authorize.create_access_token(identity='test')
+
+def test_one_snapshot_per_call(restore_config):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_renewal_window",30),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",{"access"})
+    ])
+
+    # a reload while the token is being verified doesn't apply to the rest of the call
+    @AuthJWT.token_in_blacklist_loader
+    def reload_while_verifying(raw_token):
+        AuthJWT._config = AuthJWT._config.replace(renewal_header="X-Reloaded")
+        return False
+
+    token = AuthJWT(authorization=None).create_access_token(identity='test',expires_time=10)
+    response = Response()
+    Authorize = AuthJWT(authorization=f"Bearer {token.decode('utf-8')}",response=response)
+    contextvars.copy_context().run(Authorize.jwt_required)
+    assert 'X-Access-Token' in response.headers
+    assert 'X-Reloaded' not in response.headers
+
+def test_request_object_is_slotted():
+    Authorize = AuthJWT(authorization="Bearer token")
+    assert not hasattr(Authorize,'__dict__')
+    assert Authorize._token == 'token' and Authorize._raw_jwt is None
+
+    with pytest.raises(AttributeError):
+        Authorize.extra = True
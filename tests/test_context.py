@@ -0,0 +1,82 @@
+import sys, pytest, asyncio, contextvars
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.context import get_current_claims, get_current_identity
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.testclient import TestClient
+
+def current_user():
+    # helper deep in the service layer, no Authorize object needed
+    return {'identity': get_current_identity(), 'type': (get_current_claims() or {}).get('type')}
+
+@pytest.fixture(scope='function',autouse=True)
+def settings(restore_config):
+    AuthJWT.reload_config(lambda: [("authjwt_secret_key","secret-key")])
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/sync')
+    def sync_endpoint(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_optional()
+        return current_user()
+
+    @app.get('/async')
+    async def async_endpoint(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return current_user()
+
+    client = TestClient(app)
+    return client
+
+def test_claims_in_context(client,Authorize):
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+
+    for url in ['/sync','/async']:
+        response = client.get(url,headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json() == {'identity': 'test', 'type': 'access'}
+
+    # nothing leaks to the next request
+    response = client.get('/sync')
+    assert response.json() == {'identity': None, 'type': None}
+    assert get_current_claims() is None
+
+# the contextvars backport of python 3.6 isn't aware of asyncio tasks
+@pytest.mark.skipif(sys.version_info < (3,7),reason="requires python 3.7")
+def test_claims_isolated_between_tasks(Authorize):
+    tokens = {identity: Authorize.create_access_token(identity=identity).decode('utf-8') for identity in ['a','b','c']}
+
+    async def handle(identity):
+        AuthJWT(f"Bearer {tokens[identity]}").jwt_required()
+        await asyncio.sleep(0.01)
+        return get_current_identity()
+
+    async def main():
+        return await asyncio.gather(*(handle(identity) for identity in tokens))
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(main()) == ['a','b','c']
+    finally:
+        loop.close()
+
+def test_claims_published_after_checks(Authorize):
+    access = Authorize.create_access_token(identity='test').decode('utf-8')
+    refresh = Authorize.create_refresh_token(identity='test').decode('utf-8')
+
+    def verify(token, method):
+        try:
+            getattr(AuthJWT(f"Bearer {token}"),method)()
+        except HTTPException as err:
+            return err.status_code, get_current_claims()
+        return 200, get_current_claims()['type']
+
+    # each call runs in its own context like a request
+    run = lambda token, method: contextvars.copy_context().run(verify,token,method)
+    assert run(refresh,'jwt_required') == (422,None)
+    assert run(refresh,'jwt_optional') == (422,None)
+    assert run(access,'fresh_jwt_required') == (401,None)
+    assert run(access,'jwt_refresh_token_required') == (422,None)
+    assert run(refresh,'jwt_refresh_token_required') == (200,'refresh')
+    assert run(access,'jwt_optional') == (200,'access')
@@ -122,15 +122,14 @@ def test_invalid_jwt_issuer(client,Authorize):
     assert response.status_code == 200
     assert response.json() == {'hello':'world'}
 
-    AuthJWT._decode_issuer = "urn:foo"
+    AuthJWT._config = AuthJWT._config.replace(decode_issuer="urn:foo")
 
     # Issuer claim expected and not provided - Not OK
     response = client.get('/protected',headers={'Authorization':f"Bearer {token.decode('utf-8')}"})
     assert response.status_code == 422
     assert response.json() == {'detail': 'Token is missing the "iss" claim'}
 
-    AuthJWT._decode_issuer = "urn:foo"
-    AuthJWT._encode_issuer = "urn:bar"
+    AuthJWT._config = AuthJWT._config.replace(decode_issuer="urn:foo",encode_issuer="urn:bar")
 
     # Issuer claim still expected and wrong one provided - not OK
     token = Authorize.create_access_token(identity='test')
@@ -138,12 +137,11 @@ def test_invalid_jwt_issuer(client,Authorize):
     assert response.status_code == 422
     assert response.json() == {'detail': 'Invalid issuer'}
 
-    AuthJWT._decode_issuer = None
-    AuthJWT._encode_issuer = None
+    AuthJWT._config = AuthJWT._config.replace(decode_issuer=None,encode_issuer=None)
 
 @pytest.mark.parametrize("token_aud",['foo', ['bar'], ['foo', 'bar', 'baz']])
 def test_valid_aud(client,Authorize,token_aud):
-    AuthJWT._decode_audience = ['foo','bar']
+    AuthJWT._config = AuthJWT._config.replace(decode_audience=['foo','bar'])
 
     access_token = Authorize.create_access_token(identity=1,audience=token_aud)
     response = client.get('/protected',headers={'Authorization': f"Bearer {access_token.decode('utf-8')}"})
@@ -156,11 +154,11 @@ def test_valid_aud(client,Authorize,token_aud):
     assert response.json() == 1
 
     if token_aud == ['foo', 'bar', 'baz']:
-        AuthJWT._decode_audience = None
+        AuthJWT._config = AuthJWT._config.replace(decode_audience=None)
 
 @pytest.mark.parametrize("token_aud",['bar', ['bar'], ['bar', 'baz']])
 def test_invalid_aud_and_missing_aud(client,Authorize,token_aud):
-    AuthJWT._decode_audience = 'foo'
+    AuthJWT._config = AuthJWT._config.replace(decode_audience='foo')
 
     access_token = Authorize.create_access_token(identity=1,audience=token_aud)
     response = client.get('/protected',headers={'Authorization': f"Bearer {access_token.decode('utf-8')}"})
@@ -173,7 +171,7 @@ def test_invalid_aud_and_missing_aud(client,Authorize,token_aud):
     assert response.json() == {'detail': 'Token is missing the "aud" claim'}
 
     if token_aud == ['bar','baz']:
-        AuthJWT._decode_audience = None
+        AuthJWT._config = AuthJWT._config.replace(decode_audience=None)
 
 def test_invalid_decode_algorithms(client,Authorize):
     class SettingsAlgorithms(BaseSettings):
@@ -189,4 +187,4 @@ def test_invalid_decode_algorithms(client,Authorize):
     assert response.status_code == 422
     assert response.json() == {'detail': 'The specified alg value is not allowed'}
 
-    AuthJWT._decode_algorithms = None
+    AuthJWT._config = AuthJWT._config.replace(decode_algorithms=(AuthJWT._config.algorithm,))
@@ -0,0 +1,98 @@
+import os, gc, pytest
+from fastapi_jwt_auth import AuthJWT, Keyring, RateLimiter
+from fastapi_jwt_auth.cache import TTLCache
+from fastapi_jwt_auth.revocation import RevocationBus
+from fastapi_jwt_auth.stores import SQLiteRevocationStore
+
+pytestmark = pytest.mark.skipif(not hasattr(os,'register_at_fork'),reason="requires os.fork")
+
+class Transport:
+    def __init__(self):
+        self.forked = False
+
+    def publish(self, message):
+        pass
+
+    def listen(self, callback):
+        pass
+
+    def close(self):
+        pass
+
+    def _after_fork(self):
+        self.forked = True
+
+@pytest.fixture(scope='function')
+def config(restore_config):
+    AuthJWT.reload_config(lambda: [("authjwt_secret_key","secret-key")])
+
+def in_child(check) -> int:
+    """
+    Run check in a forked child and return its exit status
+    """
+    pid = os.fork()
+    if pid == 0:
+        try:
+            code = 0 if check() else 1
+        except BaseException:
+            code = 2
+        os._exit(code)
+    _, status = os.waitpid(pid,0)
+    return os.WEXITSTATUS(status)
+
+def test_warmup(config):
+    bus = RevocationBus(Transport())
+    bus.revoked.add('a',1)
+    AuthJWT.load_revocation_bus(bus)
+    AuthJWT.warmup()
+    assert len(bus.revoked) == 0
+
+    AuthJWT.load_config(lambda: [("authjwt_secret_key","secret-key"),("authjwt_decode_audience","app")])
+    AuthJWT.warmup()
+
+    AuthJWT.load_config(lambda: [])
+    AuthJWT.warmup()
+
+    # keyring that only verifies the tokens of another service
+    keyring = Keyring()
+    keyring.add_key('old','secret-key')
+    AuthJWT.load_keyring(keyring)
+    AuthJWT.warmup()
+
+def test_warmup_freeze(config):
+    AuthJWT.warmup(freeze=True)
+    try:
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+def test_locks_are_reset_after_fork():
+    cache = TTLCache(10,60)
+    limiter = RateLimiter(rate=1,burst=1)
+    # held by the parent while it forks, would never be released in the child
+    cache._lock.acquire()
+    limiter._lock.acquire()
+    try:
+        status = in_child(lambda: cache.set('a',1) is None and limiter.hit('a') == 0)
+    finally:
+        cache._lock.release()
+        limiter._lock.release()
+    assert status == 0
+
+def test_bus_and_store_after_fork(tmpdir):
+    bus = RevocationBus(Transport())
+    store = SQLiteRevocationStore(str(tmpdir.join("revoked.db")),flush_interval=10)
+    store.revoke('a',None)
+    node = bus._node
+
+    def check():
+        return (
+            bus._node != node and bus.transport.forked and
+            store._thread is None and not store._pending and not store.is_revoked('a')
+        )
+
+    try:
+        assert in_child(check) == 0
+        assert bus._node == node and store.is_revoked('a')
+    finally:
+        store.close()
@@ -0,0 +1,73 @@
+import sys, pytest, subprocess, fastapi_jwt_auth
+
+LAZY = [
+    'fastapi_jwt_auth.keys',
+    'fastapi_jwt_auth.scopes',
+    'fastapi_jwt_auth.rotation',
+    'fastapi_jwt_auth.ratelimit',
+    'fastapi_jwt_auth.revocation',
+    'fastapi_jwt_auth.stores',
+    'fastapi_jwt_auth.backends',
+    'fastapi_jwt_auth.breaker',
+]
+
+# -X importtime and module __getattr__ (PEP 562) are new in 3.7, the modules are imported eagerly before
+requires_lazy_imports = pytest.mark.skipif(sys.version_info < (3,7),reason="requires python 3.7")
+
+def imported_modules(code: str) -> set:
+    """
+    Modules loaded after running code in a fresh interpreter
+    """
+    result = subprocess.run(
+        [sys.executable,"-c",code + "\nimport sys; print('\\n'.join(sys.modules))"],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    )
+    return set(result.stdout.splitlines())
+
+@requires_lazy_imports
+def test_import_time():
+    # -X importtime reports what "import fastapi_jwt_auth" imports and how long it takes
+    result = subprocess.run(
+        [sys.executable,"-X","importtime","-c","import fastapi_jwt_auth"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    )
+    modules = [
+        line.rsplit('|',1)[1].strip() for line in result.stderr.splitlines()
+        if line.startswith("import time:") and line[12:].split('|')[0].strip().isdigit()
+    ]
+    assert 'fastapi_jwt_auth.auth_jwt' in modules
+    assert not set(LAZY) & set(modules)
+    assert 'sqlite3' not in modules
+
+@requires_lazy_imports
+def test_optional_modules_are_lazy():
+    modules = imported_modules("import fastapi_jwt_auth")
+    assert not set(LAZY) & modules
+
+    modules = imported_modules("from fastapi_jwt_auth import RateLimiter")
+    assert 'fastapi_jwt_auth.ratelimit' in modules
+    assert 'fastapi_jwt_auth.stores' not in modules
+
+def test_lazy_attributes():
+    from fastapi_jwt_auth.ratelimit import RateLimiter
+    assert fastapi_jwt_auth.RateLimiter is RateLimiter
+    assert 'Keyring' in dir(fastapi_jwt_auth)
+
+    try:
+        fastapi_jwt_auth.Missing
+    except AttributeError as err:
+        assert "Missing" in str(err)
+    else:
+        raise AssertionError("AttributeError not raised")
+
+def test_warmup_imports_lazy_modules():
+    modules = imported_modules(
+        "from fastapi_jwt_auth import AuthJWT\n"
+        "AuthJWT.load_config(lambda: [('authjwt_secret_key','secret')])\n"
+        "AuthJWT.warmup()"
+    )
+    assert set(LAZY) <= modules
@@ -0,0 +1,122 @@
+import pytest, jwt, time
+from .utils import reset_config
+from fastapi_jwt_auth import AuthJWT, Keyring
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from datetime import timedelta
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return Authorize.get_jwt_identity()
+
+    client = TestClient(app)
+    return client
+
+@pytest.fixture(scope='function')
+def keyring(restore_config):
+    reset_config()
+    keyring = Keyring()
+    keyring.add_key("k1","secret-1",active=True)
+    AuthJWT.load_keyring(keyring)
+    return keyring
+
+def test_add_key():
+    keyring = Keyring()
+
+    with pytest.raises(TypeError,match=r"kid"):
+        keyring.add_key(1,"secret")
+    with pytest.raises(TypeError,match=r"retire_at"):
+        keyring.add_key("k1","secret",retire_at="tomorrow")
+    with pytest.raises(KeyError):
+        keyring.set_active("k1")
+
+    keyring.add_key("k1","secret",active=True)
+    keyring.add_key("k2","secret",retire_at=timedelta(days=1))
+    assert keyring.active.kid == "k1"
+    assert "k1" in keyring and "k2" in keyring
+    assert keyring.algorithms == {"HS256"}
+
+    with pytest.raises(ValueError,match=r"active key k1 can't be retired"):
+        keyring.retire("k1")
+
+    keyring.retire("k2")
+    assert "k2" not in keyring and len(keyring) == 1
+
+    with pytest.raises(TypeError,match=r"Keyring"):
+        AuthJWT.load_keyring("secret")
+
+def test_rotate_keys(client,keyring,Authorize):
+    old_token = Authorize.create_access_token(identity='old')
+    assert Authorize.get_unverified_jwt_headers(old_token)['kid'] == 'k1'
+
+    keyring.rotate("k2","secret-2",retire_after=1)
+    new_token = Authorize.create_access_token(identity='new',headers={'foo': 'bar'})
+    headers = Authorize.get_unverified_jwt_headers(new_token)
+    assert headers['kid'] == 'k2' and headers['foo'] == 'bar'
+
+    # tokens signed before the rotation are still valid
+    for token, identity in [(old_token,'old'),(new_token,'new')]:
+        response = client.get('/protected',headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+        assert response.status_code == 200
+        assert response.json() == identity
+
+    # until the previous key is retired
+    time.sleep(2)
+    response = client.get('/protected',headers={"Authorization": f"Bearer {old_token.decode('utf-8')}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Unknown key identifier'}
+    assert len(keyring) == 1
+
+    # None keeps the previous key verifying tokens, 0 removes it
+    keyring.rotate("k3","secret-3",retire_after=None)
+    assert "k2" in keyring and keyring.active.kid == "k3"
+    keyring.rotate("k4","secret-4",retire_after=0)
+    assert "k3" not in keyring and "k2" in keyring and len(keyring) == 2
+
+    with pytest.raises(ValueError,match=r"dictionary update sequence element"):
+        Authorize.create_access_token(identity=1,headers="test")
+
+def test_token_without_kid(client,keyring):
+    token = jwt.encode({'identity': 'test', 'type': 'access'},'secret-1',algorithm='HS256').decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Unknown key identifier'}
+
+    # signed with the secret key before the keyring was loaded
+    AuthJWT._config = AuthJWT._config.replace(secret_key='secret-1')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+    token = jwt.encode({'identity': 'test', 'type': 'access'},'secret-2',algorithm='HS256',headers={'kid': 'k1'})
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Signature verification failed'}
+
+def test_asymmetric_keys(client,keyring,Authorize):
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537,key_size=2048,backend=default_backend())
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,serialization.PrivateFormat.PKCS8,serialization.NoEncryption()
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+    # a public key only verifies tokens
+    with pytest.raises(ValueError,match=r"can't be active"):
+        keyring.add_key("public",public_pem,algorithm="RS256",active=True)
+
+    keyring.rotate("rsa",private_pem,algorithm="RS256")
+    token = Authorize.create_access_token(identity='rsa')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+    assert response.status_code == 200
+    assert response.json() == 'rsa'
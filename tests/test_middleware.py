@@ -0,0 +1,121 @@
+import pytest
+from .utils import reset_config
+from fastapi_jwt_auth import AuthJWT, Claims
+from fastapi_jwt_auth.context import get_current_claims
+from fastapi_jwt_auth.middleware import AuthJWTMiddleware, get_request_claims
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+blacklist = set()
+
+@pytest.fixture(scope='function')
+def settings(restore_config):
+    reset_config()
+
+    @AuthJWT.load_config
+    def get_settings():
+        return [("authjwt_secret_key","secret-key")]
+
+@pytest.fixture(scope='function')
+def client(settings):
+    app = FastAPI()
+
+    @app.get('/public')
+    def public(claims: Claims = Depends(get_request_claims)):
+        return {'claims': claims}
+
+    @app.get('/api/items')
+    def items(claims: Claims = Depends(get_request_claims)):
+        # one view of the claims for every getter
+        assert isinstance(claims, Claims) and claims is get_current_claims()
+        return claims.identity
+
+    @app.get('/api/admin/settings')
+    def admin(claims: Claims = Depends(get_request_claims)):
+        return claims['identity']
+
+    @app.get('/apiary')
+    def apiary():
+        return 'bees'
+
+    @app.get('/auth/refresh')
+    def refresh(claims: Claims = Depends(get_request_claims)):
+        return claims['type']
+
+    @app.get('/feed')
+    def feed(claims: Claims = Depends(get_request_claims)):
+        return claims['identity'] if claims else 'anonym'
+
+    rules = [("/api","access"),("/api/admin/","fresh"),("/auth/refresh","refresh"),("/feed","optional")]
+    app.add_middleware(AuthJWTMiddleware,rules=rules)
+
+    client = TestClient(app)
+    return client
+
+def test_invalid_rules():
+    with pytest.raises(TypeError,match=r"path prefix"):
+        AuthJWTMiddleware(None,rules=[("api","access")])
+    with pytest.raises(ValueError,match=r"requirement"):
+        AuthJWTMiddleware(None,rules=[("/api","admin")])
+
+def test_public_routes(client):
+    response = client.get('/public',headers={"Authorization": "garbage"})
+    assert response.status_code == 200
+    assert response.json() == {'claims': None}
+
+    response = client.get('/apiary')
+    assert response.status_code == 200
+
+def test_rejected_before_routing(client,Authorize):
+    response = client.get('/api/items')
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Missing Authorization Header'}
+
+    response = client.get('/api/unknown',headers={"Authorization": "Bearer"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': "Bad Authorization header. Expected value 'Bearer <JWT>'"}
+
+    token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+    response = client.get('/api/items',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Only access tokens are allowed'}
+
+def test_claims_in_scope(client,Authorize):
+    access_token = Authorize.create_access_token(identity='test').decode('utf-8')
+    fresh_token = Authorize.create_access_token(identity='admin',fresh=True).decode('utf-8')
+    refresh_token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+
+    response = client.get('/api/items',headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+    assert response.json() == 'test'
+
+    # the longest prefix requires a fresh token
+    response = client.get('/api/admin/settings',headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Fresh token required'}
+    response = client.get('/api/admin/settings',headers={"Authorization": f"Bearer {fresh_token}"})
+    assert response.json() == 'admin'
+
+    response = client.get('/auth/refresh',headers={"Authorization": f"Bearer {refresh_token}"})
+    assert response.json() == 'refresh'
+
+    response = client.get('/feed')
+    assert response.json() == 'anonym'
+    response = client.get('/feed',headers={"Authorization": f"Bearer {access_token}"})
+    assert response.json() == 'test'
+
+def test_revoked_token(client,Authorize):
+    @AuthJWT.token_in_blacklist_loader
+    def check_if_token_in_blacklist(decrypted_token):
+        return decrypted_token['jti'] in blacklist
+
+    AuthJWT._config = AuthJWT._config.replace(blacklist_enabled=True,blacklist_token_checks=frozenset(['access']))
+
+    token = Authorize.create_access_token(identity='test')
+    response = client.get('/api/items',headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+    assert response.status_code == 200
+
+    blacklist.add(Authorize.get_jti(token))
+    response = client.get('/api/items',headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Token has been revoked'}
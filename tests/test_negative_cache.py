@@ -0,0 +1,79 @@
+import pytest, jwt, time
+from fastapi_jwt_auth import AuthJWT, Keyring
+from fastapi_jwt_auth.metrics import metrics
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+@pytest.fixture(scope='function')
+def negative(restore_config):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_negative_cache_ttl",60),
+        ("authjwt_negative_cache_size",2)
+    ])
+    metrics.reset()
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    client = TestClient(app)
+    return client
+
+def test_negative_cache_config():
+    with pytest.raises(ValidationError,match=r"AUTHJWT_NEGATIVE_CACHE_TTL"):
+        AuthJWT.reload_config(lambda: [("authjwt_negative_cache_ttl","soon")])
+    with pytest.raises(ValidationError,match=r"AUTHJWT_NEGATIVE_CACHE_SIZE"):
+        AuthJWT.reload_config(lambda: [("authjwt_negative_cache_size",0)])
+
+def test_repeated_invalid_token(client,negative):
+    token = jwt.encode({'identity': 'test','type': 'access'},'other-key',algorithm='HS256').decode('utf-8')
+
+    for _ in range(3):
+        response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 422
+        assert response.json() == {'detail': 'Signature verification failed'}
+    assert metrics.get('negative_cache_hits') == 2
+    assert len(AuthJWT._config._rejections) == 1
+
+    # the cache is bounded
+    for index in range(5):
+        token = jwt.encode({'identity': index},'other-key',algorithm='HS256').decode('utf-8')
+        client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert len(AuthJWT._config._rejections) == 2
+
+    # and dropped with its snapshot
+    AuthJWT.reload_config(keyring=None)
+    assert len(AuthJWT._config._rejections) == 0
+
+def test_temporary_failures_not_cached(client,negative,Authorize):
+    token = jwt.encode({'identity': 'test','type': 'access','nbf': int(time.time()) + 60},
+        'secret-key',algorithm='HS256').decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == {'detail': 'The token is not yet valid (nbf)'}
+
+    keyring = Keyring()
+    keyring.add_key("1","secret-key",active=True)
+    AuthJWT.load_keyring(keyring)
+    token = jwt.encode({'identity': 'test','type': 'access'},'new-key',algorithm='HS256',
+        headers={'kid': '2'}).decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == {'detail': 'Unknown key identifier'}
+    assert len(AuthJWT._config._rejections) == 0
+
+    # the key is registered again, the token is accepted
+    keyring.add_key("2","new-key")
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+def test_issuer_is_part_of_the_key(negative,Authorize):
+    token = jwt.encode({'identity': 'test','type': 'refresh','iss': 'a'},'secret-key',algorithm='HS256')
+    with pytest.raises(Exception):
+        Authorize._verified_token(token,issuer='b')
+    assert Authorize._verified_token(token)['iss'] == 'a'
@@ -0,0 +1,91 @@
+import pytest, jwt, time
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.precheck import precheck
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+@pytest.fixture(scope='function')
+def early(restore_config):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_max_token_length",1024),
+        ("authjwt_early_expiry_check",True),
+        ("authjwt_decode_leeway",10)
+    ])
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    client = TestClient(app)
+    return client
+
+@pytest.mark.parametrize("token,detail",[
+    ("abc","Not enough segments"),
+    ("abc.def","Not enough segments"),
+    ("a!c.def.ghi","Invalid header padding"),
+    (".def.ghi","Invalid header padding"),
+    ("abc.d=f.ghi","Invalid payload padding"),
+    ("abc.def.ghi.jkl","Invalid payload padding"),
+    ("abc.def.g+i","Invalid crypto padding"),
+])
+def test_structure(token,detail):
+    with pytest.raises(HTTPException) as err:
+        precheck(token)
+    assert err.value.status_code == 422 and err.value.detail == detail
+
+def test_header():
+    token = jwt.encode({'exp': 0},'secret-key',algorithm='HS256')
+    assert precheck(token) == {'typ': 'JWT', 'alg': 'HS256'}
+    assert precheck(token,algorithms=('HS256',))['alg'] == 'HS256'
+
+    # an undecodable header is left to the verification
+    assert precheck("abc.def.ghi") is None
+
+    with pytest.raises(HTTPException) as err:
+        precheck(token,algorithms=('RS256',))
+    assert err.value.detail == "The specified alg value is not allowed"
+
+    with pytest.raises(HTTPException) as err:
+        precheck(token,max_length=10)
+    assert err.value.detail == "Token is too long"
+
+def test_expiry():
+    now = int(time.time())
+    expired = jwt.encode({'exp': now - 60},'secret-key',algorithm='HS256')
+    assert precheck(expired) is not None
+    assert precheck(expired,leeway=120) is not None
+
+    with pytest.raises(HTTPException) as err:
+        precheck(expired,leeway=10)
+    assert err.value.detail == "Signature has expired"
+
+    valid = jwt.encode({'exp': now + 60},'secret-key',algorithm='HS256')
+    assert precheck(valid,leeway=0) is not None
+
+def test_precheck_config():
+    with pytest.raises(ValidationError,match=r"AUTHJWT_MAX_TOKEN_LENGTH"):
+        AuthJWT.reload_config(lambda: [("authjwt_max_token_length","long")])
+    with pytest.raises(ValidationError,match=r"AUTHJWT_EARLY_EXPIRY_CHECK"):
+        AuthJWT.reload_config(lambda: [("authjwt_early_expiry_check","yes")])
+
+def test_reject_before_signature(client,early,Authorize):
+    # wrong signature, the expiry is reported like PyJWT would without verifying it
+    expired = jwt.encode({'exp': int(time.time()) - 60,'type': 'access'},'other-key',algorithm='HS256').decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {expired}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Signature has expired'}
+
+    response = client.get('/protected',headers={"Authorization": f"Bearer {'a' * 1025}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Token is too long'}
+
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
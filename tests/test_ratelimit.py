@@ -0,0 +1,83 @@
+import pytest
+from fastapi_jwt_auth import AuthJWT, RateLimiter
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from .conftest import Clock
+
+@pytest.fixture(scope='function')
+def clock(restore_config):
+    clock = Clock()
+    AuthJWT.reload_config(lambda: [("authjwt_secret_key","secret-key")])
+    AuthJWT.load_rate_limiter(RateLimiter(rate=1,burst=2,timer=clock))
+    return clock
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    @app.get('/refresh')
+    def refresh(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_refresh_token_required()
+        return {'hello':'world'}
+
+    client = TestClient(app)
+    return client
+
+def test_token_bucket():
+    clock = Clock()
+    limiter = RateLimiter(rate=2,burst=3,timer=clock)
+    assert [limiter.hit('a') for _ in range(3)] == [0,0,0]
+    assert limiter.hit('a') == 0.5
+    assert limiter.hit('b') == 0
+
+    clock.now = 0.5
+    assert limiter.hit('a') == 0
+    assert limiter.hit('a') == 0.5
+
+    # idle buckets are full again, they're evicted
+    clock.now = 10
+    assert limiter.hit('c') == 0
+    assert len(limiter) == 1
+
+    limiter.reset()
+    assert len(limiter) == 0
+
+    with pytest.raises(TypeError,match=r"rate"):
+        RateLimiter(rate=0,burst=1)
+    with pytest.raises(TypeError,match=r"burst"):
+        RateLimiter(rate=1,burst=0)
+    with pytest.raises(ValueError,match=r"key"):
+        RateLimiter(rate=1,burst=1,key='sub')
+
+def test_rate_limited_identity(client,clock,Authorize):
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+    other = Authorize.create_access_token(identity='test').decode('utf-8')
+
+    for _ in range(2):
+        response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+
+    # the bucket belongs to the identity, not to the token
+    response = client.get('/protected',headers={"Authorization": f"Bearer {other}"})
+    assert response.status_code == 429
+    assert response.json() == {'detail': 'Too many requests'}
+    assert response.headers['Retry-After'] == '1'
+
+    clock.now = 1
+    response = client.get('/protected',headers={"Authorization": f"Bearer {other}"})
+    assert response.status_code == 200
+
+    # refresh tokens are not limited by default
+    refresh_token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+    for _ in range(3):
+        response = client.get('/refresh',headers={"Authorization": f"Bearer {refresh_token}"})
+        assert response.status_code == 200
+
+def test_rate_limiter_config():
+    with pytest.raises(TypeError,match=r"rate_limiter"):
+        AuthJWT.load_rate_limiter(object())
@@ -0,0 +1,83 @@
+import pytest, time, threading
+from .utils import reset_config
+from fastapi_jwt_auth import AuthJWT, Keyring
+from fastapi_jwt_auth.reload import ConfigWatcher
+from pydantic import BaseSettings, ValidationError
+
+@pytest.fixture(scope='function')
+def default_config(restore_config):
+    reset_config()
+
+def test_reload_config(default_config):
+    keyring = Keyring()
+    keyring.add_key("k1","secret",active=True)
+
+    config = AuthJWT.reload_config(lambda: [("authjwt_access_token_expires",60)],keyring=keyring)
+    assert AuthJWT._config is config
+    assert config.access_token_expires == 60 and config.keyring is keyring
+
+    # components are kept when only the settings change and the other way around
+    config = AuthJWT.reload_config(lambda: [("authjwt_access_token_expires",120)])
+    assert config.access_token_expires == 120 and config.keyring is keyring
+    config = AuthJWT.reload_config(keyring=None)
+    assert config.access_token_expires == 120 and config.keyring is None
+
+    with pytest.raises(TypeError,match=r"Unknown component"):
+        AuthJWT.reload_config(secret_key="secret")
+    with pytest.raises(TypeError,match=r"keyring must be a Keyring"):
+        AuthJWT.reload_config(keyring="secret")
+    with pytest.raises(ValidationError,match=r"AUTHJWT_ACCESS_TOKEN_EXPIRES"):
+        AuthJWT.reload_config(lambda: [("authjwt_access_token_expires","lol")],keyring=keyring)
+
+    # nothing is published when validation fails
+    assert AuthJWT._config is config
+
+def test_concurrent_reloads(default_config):
+    keyring = Keyring()
+    keyring.add_key("k1","secret",active=True)
+    started = threading.Event()
+
+    def slow_settings():
+        started.set()
+        time.sleep(0.1)
+        return [("authjwt_access_token_expires",60)]
+
+    # the keyring is loaded while the settings are being rebuilt, neither reload is lost
+    thread = threading.Thread(target=AuthJWT.reload_config,args=(slow_settings,))
+    thread.start()
+    started.wait()
+    AuthJWT.load_keyring(keyring)
+    thread.join()
+    assert AuthJWT._config.access_token_expires == 60 and AuthJWT._config.keyring is keyring
+
+def test_watcher_reload_on_change(default_config,tmp_path,monkeypatch):
+    class Settings(BaseSettings):
+        authjwt_secret_key: str = "secret"
+        authjwt_access_token_expires: int = 60
+
+    env_file = tmp_path / "keys.pem"
+    env_file.write_text("one")
+
+    watcher = ConfigWatcher(Settings,paths=[str(env_file)],components=lambda: {"keyring": None})
+    assert watcher.check() is False
+
+    monkeypatch.setenv("AUTHJWT_ACCESS_TOKEN_EXPIRES","30")
+    assert watcher.check() is True
+    assert AuthJWT._config.access_token_expires == 30
+    assert watcher.check() is False
+
+    env_file.write_text("two, longer")
+    assert watcher.check() is True
+
+    # invalid settings keep the current configuration
+    config = AuthJWT._config
+    monkeypatch.setenv("AUTHJWT_ACCESS_TOKEN_EXPIRES","lol")
+    assert watcher.check() is False
+    assert AuthJWT._config is config
+
+    watcher.start()
+    watcher.stop()
+    assert watcher._thread is None
+
+    with pytest.raises(TypeError,match=r"settings"):
+        ConfigWatcher("settings")
@@ -0,0 +1,107 @@
+import pytest, jwt, contextvars
+from fastapi_jwt_auth import AuthJWT, TenantRegistry, ScopeTable
+from fastapi import FastAPI, Depends, HTTPException, Response
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+@pytest.fixture(scope='function')
+def renewal(restore_config):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_access_token_expires",60),
+        ("authjwt_renewal_window",30)
+    ])
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    @app.get('/refresh')
+    def refresh(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_refresh_token_required()
+        return {'hello':'world'}
+
+    client = TestClient(app)
+    return client
+
+def test_renewal_config():
+    with pytest.raises(ValidationError,match=r"AUTHJWT_RENEWAL_WINDOW"):
+        AuthJWT.reload_config(lambda: [("authjwt_renewal_window","soon")])
+    with pytest.raises(ValidationError,match=r"AUTHJWT_RENEWAL_HEADER"):
+        AuthJWT.reload_config(lambda: [("authjwt_renewal_header",1)])
+
+def test_renew_inside_window(client,renewal,Authorize):
+    token = Authorize.create_access_token(identity='test',fresh=True,expires_time=10).decode('utf-8')
+
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    renewed = response.headers['X-Access-Token']
+    claims = jwt.decode(renewed,'secret-key',algorithms='HS256')
+    assert claims['identity'] == 'test' and claims['fresh'] is False
+    assert claims['exp'] - claims['iat'] == 60
+
+    # the same token is renewed once
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.headers['X-Access-Token'] == renewed
+
+    # a reload drops the renewed tokens with the snapshot
+    AuthJWT.reload_config(keyring=None)
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.headers['X-Access-Token'] != renewed
+
+def test_no_renewal(client,renewal,Authorize):
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert 'X-Access-Token' not in response.headers
+
+    token = Authorize.create_access_token(identity='test',expires_time=False).decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert 'X-Access-Token' not in response.headers
+
+    token = Authorize.create_refresh_token(identity='test',expires_time=10).decode('utf-8')
+    response = client.get('/refresh',headers={"Authorization": f"Bearer {token}"})
+    assert 'X-Access-Token' not in response.headers
+
+def test_no_renewal_of_rejected_tokens(renewal,Authorize):
+    token = Authorize.create_access_token(identity='test',expires_time=10).decode('utf-8')
+
+    # the token is valid but the endpoint requires a fresh one
+    response = Response()
+    with pytest.raises(HTTPException) as err:
+        AuthJWT(authorization=f"Bearer {token}",response=response).fresh_jwt_required()
+    assert err.value.detail == "Fresh token required"
+    assert 'X-Access-Token' not in response.headers
+
+    response = Response()
+    Authorize = AuthJWT(authorization=f"Bearer {token}",response=response)
+    contextvars.copy_context().run(Authorize.jwt_required)
+    assert 'X-Access-Token' in response.headers
+
+def test_renewal_keeps_scopes(client,renewal,Authorize):
+    AuthJWT.load_scopes(ScopeTable(["orders:read","orders:write"]))
+    token = Authorize.create_access_token(identity='test',expires_time=10,scopes=["orders:write"]).decode('utf-8')
+
+    # the scp claim is copied as is, even without the ScopeTable to decode it
+    AuthJWT.load_scopes(None)
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    claims = jwt.decode(response.headers['X-Access-Token'],'secret-key',algorithms='HS256')
+    assert claims['scp'] == 0b10
+
+def test_no_renewal_of_tenant_tokens(restore_config,client):
+    registry = TenantRegistry()
+    registry.register("urn:tenant-a","secret-a",kid="a-1")
+    AuthJWT.reload_config(lambda: [("authjwt_renewal_window",30)],tenants=registry)
+    token = jwt.encode(
+        {'jti': '123', 'type': 'access', 'fresh': False, 'identity': 'a', 'iss': 'urn:tenant-a'},
+        'secret-a',
+        algorithm='HS256',
+        headers={'kid': 'a-1'}
+    ).decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert 'X-Access-Token' not in response.headers
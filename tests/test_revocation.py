@@ -0,0 +1,172 @@
+import pytest, time, socket, importlib.util
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.revocation import (
+    RevocationList,
+    RevocationBus,
+    UnixSocketTransport,
+    MulticastTransport,
+    RedisTransport
+)
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from .conftest import Clock
+
+class LocalTransport:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, message):
+        self.messages.append(message)
+
+    def listen(self, callback):
+        pass
+
+    def close(self):
+        pass
+
+def wait_for(condition):
+    deadline = time.time() + 5
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+@pytest.fixture(scope='function')
+def bus(restore_config):
+    bus = RevocationBus(LocalTransport())
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",["access","refresh"])
+    ])
+    AuthJWT._token_in_blacklist_callback = None
+    AuthJWT.load_revocation_bus(bus)
+    return bus
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    @app.delete('/logout')
+    def logout(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        Authorize.revoke_token()
+        return {'hello':'world'}
+
+    client = TestClient(app)
+    return client
+
+def test_revocation_list():
+    clock = Clock(1000)
+    revoked = RevocationList(timer=clock)
+    revoked.add('a',1010)
+    revoked.add('b',None)
+    assert 'a' in revoked and 'b' in revoked and 'c' not in revoked
+
+    clock.now = 1010
+    assert 'a' not in revoked
+    revoked.purge()
+    assert len(revoked) == 1
+
+def test_unix_socket_bus(tmpdir):
+    first = RevocationBus(UnixSocketTransport(str(tmpdir)),key='shared').start()
+    second = RevocationBus(UnixSocketTransport(str(tmpdir)),key='shared').start()
+    try:
+        first.publish([('a',int(time.time()) + 60)])
+        assert 'a' in first.revoked
+        assert wait_for(lambda: 'a' in second.revoked)
+
+        second.publish([('b',None),('c',None)])
+        assert wait_for(lambda: 'b' in first.revoked and 'c' in first.revoked)
+
+        # unsigned and malformed messages are ignored
+        first.receive(b'garbage')
+        first.receive(first._sign(b'garbage') + b'garbage')
+        assert len(first.revoked) == 3
+    finally:
+        first.stop()
+        second.stop()
+    assert not tmpdir.listdir()
+
+def test_stale_unix_socket(tmpdir):
+    transport = UnixSocketTransport(str(tmpdir))
+    gone = UnixSocketTransport(str(tmpdir))
+    gone._socket.close()
+    transport.publish(b'{}')
+    assert [path.basename for path in tmpdir.listdir()] == [transport.path.split('/')[-1]]
+    transport.close()
+
+def test_unix_socket_busy_peer(tmpdir,caplog):
+    # a peer that doesn't read, listed before the healthy one
+    busy = socket.socket(socket.AF_UNIX,socket.SOCK_DGRAM)
+    busy.bind(str(tmpdir.join("0-busy.sock")))
+    sender = socket.socket(socket.AF_UNIX,socket.SOCK_DGRAM)
+    sender.setblocking(False)
+    try:
+        while True:
+            sender.sendto(b'x' * 1024,str(tmpdir.join("0-busy.sock")))
+    except BlockingIOError:
+        pass
+
+    transport = UnixSocketTransport(str(tmpdir))
+    healthy = UnixSocketTransport(str(tmpdir))
+    try:
+        started = time.time()
+        transport.publish(b'message')
+        assert time.time() - started < 0.5
+        assert healthy._socket.recv(65536) == b'message'
+        assert "0-busy.sock" in caplog.text
+    finally:
+        for closing in (transport, healthy, busy, sender):
+            closing.close()
+
+def test_multicast_bus():
+    try:
+        first = RevocationBus(MulticastTransport(port=47475),key='shared').start()
+        second = RevocationBus(MulticastTransport(port=47475),key='shared').start()
+    except OSError:
+        pytest.skip("multicast is not available")
+    try:
+        first.publish([('a',None)])
+        if not wait_for(lambda: 'a' in second.revoked):
+            pytest.skip("multicast is not routed on this host")
+        assert first.transport.interface == '127.0.0.1'
+    finally:
+        first.stop()
+        second.stop()
+
+def test_redis_transport():
+    if importlib.util.find_spec('redis') is None:
+        with pytest.raises(RuntimeError,match=r"redis"):
+            RedisTransport()
+
+    class Client:
+        def publish(self, channel, message):
+            self.published = (channel, message)
+
+    client = Client()
+    RedisTransport(client=client).publish(b'message')
+    assert client.published == ("authjwt:revocations", b'message')
+
+def test_revoke_token(client,bus,Authorize):
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+    response = client.delete('/logout',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert len(bus.transport.messages) == 1
+
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Token has been revoked'}
+
+    refresh_token = Authorize.create_refresh_token(identity='test')
+    Authorize.revoke_token(refresh_token)
+    assert Authorize.get_jti(refresh_token) in bus.revoked
+
+def test_revoke_token_without_bus(bus,Authorize):
+    AuthJWT.load_revocation_bus(None)
+    with pytest.raises(RuntimeError,match=r"load_revocation_store"):
+        Authorize.revoke_token(Authorize.create_access_token(identity='test'))
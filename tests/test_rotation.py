@@ -0,0 +1,140 @@
+import pytest, jwt
+from fastapi_jwt_auth import AuthJWT, RefreshTokenFamilies
+from fastapi_jwt_auth.rotation import SQLiteRefreshTokenFamilies
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from .conftest import Clock
+
+@pytest.fixture(scope='function')
+def families(restore_config):
+    families = RefreshTokenFamilies()
+    AuthJWT.reload_config(lambda: [("authjwt_secret_key","secret-key")])
+    AuthJWT.load_refresh_token_families(families)
+    return families
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.post('/refresh')
+    def refresh(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_refresh_token_required()
+        return {'refresh_token': Authorize.rotate_refresh_token().decode('utf-8')}
+
+    client = TestClient(app)
+    return client
+
+def test_family_store():
+    clock = Clock(1000)
+    families = RefreshTokenFamilies(reuse_interval=10,timer=clock)
+    assert families.start('a',5000) == 0
+    assert families.check('a',0) == 'valid'
+    assert families.check('b',0) == 'revoked'
+
+    assert families.rotate('a',0,6000) == 1
+    assert families.check('a',1) == 'valid'
+    # previous generation is still accepted during the reuse interval
+    assert families.check('a',0) == 'valid'
+    assert families.rotate('a',0,6000) == 1
+
+    clock.now += 11
+    assert families.check('a',0) == 'reused'
+    assert families.rotate('a',0,6000) is None
+    assert families.check('a',1) == 'revoked'
+
+    families.start('c',7000)
+    families.revoke('c')
+    assert families.check('c',0) == 'revoked'
+
+    with pytest.raises(TypeError,match=r"reuse_interval"):
+        RefreshTokenFamilies(reuse_interval=-1)
+
+def test_sqlite_families(tmpdir):
+    clock = Clock(1000)
+    path = str(tmpdir.join("families.db"))
+    families = SQLiteRefreshTokenFamilies(path,reuse_interval=10,purge_interval=60,timer=clock)
+    families.start('a',5000)
+    families.start('gone',1030)
+    assert families.rotate('a',0,6000) == 1
+
+    # another worker, or the same one after a restart, shares the families
+    other = SQLiteRefreshTokenFamilies(path,reuse_interval=10,timer=clock)
+    assert other.check('a',1) == 'valid' and other.rotate('a',1,6000) == 2
+    assert families.check('a',2) == 'valid'
+
+    clock.now += 11
+    assert families.rotate('a',1,6000) is None
+    assert other.check('a',2) == 'revoked'
+
+    clock.now += 60
+    families.start('b',7000)
+    assert len(families) == 2 and families.check('gone',0) == 'revoked'
+
+def test_family_eviction():
+    clock = Clock(0)
+    families = RefreshTokenFamilies(timer=clock)
+    families.start('a',100)
+    families.start('b',10000)
+    families.start('c',None)
+    assert len(families) == 3
+
+    clock.now = 150
+    assert families.check('a',0) == 'revoked'
+
+    # expired families are dropped once their bucket is over
+    clock.now = 3600
+    families.start('d',20000)
+    assert len(families) == 3
+    assert families.check('b',0) == 'valid' and families.check('c',0) == 'valid'
+
+def test_refresh_token_claims(families,Authorize):
+    token = Authorize.create_refresh_token(identity='test')
+    claims = jwt.decode(token,'secret-key',algorithms='HS256')
+    assert claims['gen'] == 0 and families.check(claims['fam'],0) == 'valid'
+
+    # access tokens are not part of a family
+    claims = jwt.decode(Authorize.create_access_token(identity='test'),'secret-key',algorithms='HS256')
+    assert 'fam' not in claims
+
+def test_rotate_refresh_token(client,families,Authorize):
+    token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+
+    response = client.post('/refresh',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    rotated = response.json()['refresh_token']
+    first = jwt.decode(token,'secret-key',algorithms='HS256')
+    claims = jwt.decode(rotated,'secret-key',algorithms='HS256')
+    assert claims['fam'] == first['fam'] and claims['gen'] == 1
+    assert claims['identity'] == 'test' and claims['type'] == 'refresh'
+
+    response = client.post('/refresh',headers={"Authorization": f"Bearer {rotated}"})
+    assert response.status_code == 200
+    latest = response.json()['refresh_token']
+
+    # replaying an old generation revokes the whole family
+    response = client.post('/refresh',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Refresh token reuse detected'}
+
+    response = client.post('/refresh',headers={"Authorization": f"Bearer {latest}"})
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Token has been revoked'}
+
+def test_rotate_token_without_family(client,families,Authorize):
+    AuthJWT.load_refresh_token_families(None)
+    token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+    AuthJWT.load_refresh_token_families(families)
+
+    response = client.post('/refresh',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    claims = jwt.decode(response.json()['refresh_token'],'secret-key',algorithms='HS256')
+    assert claims['gen'] == 0 and len(families) == 1
+
+def test_rotation_config(client,families,Authorize):
+    with pytest.raises(TypeError,match=r"refresh_families"):
+        AuthJWT.load_refresh_token_families(object())
+
+    AuthJWT.load_refresh_token_families(None)
+    token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+    with pytest.raises(RuntimeError,match=r"load_refresh_token_families"):
+        client.post('/refresh',headers={"Authorization": f"Bearer {token}"})
@@ -0,0 +1,78 @@
+import pytest, jwt
+from fastapi_jwt_auth import AuthJWT, ScopeTable, requires
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope='function',autouse=True)
+def settings(restore_config):
+    AuthJWT.reload_config(
+        lambda: [("authjwt_secret_key","secret-key")],
+        scopes=ScopeTable(["orders:read","orders:write","users:admin"])
+    )
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/orders')
+    def orders(Authorize: AuthJWT = Depends(requires("orders:read"))):
+        return Authorize.get_jwt_scopes()
+
+    @app.post('/orders')
+    def create_order(Authorize: AuthJWT = Depends(requires("orders:read","orders:write"))):
+        return Authorize.get_jwt_identity()
+
+    client = TestClient(app)
+    return client
+
+def test_scope_table():
+    table = ScopeTable(["a","b","c"])
+    assert table.encode(["a","c"]) == 0b101
+    assert table.decode(0b110) == ["b","c"]
+    assert len(table) == 3 and "b" in table
+
+    with pytest.raises(ValueError,match=r"Unknown scope"):
+        table.encode(["d"])
+    with pytest.raises(ValueError,match=r"unique"):
+        ScopeTable(["a","a"])
+    with pytest.raises(TypeError,match=r"scopes"):
+        ScopeTable(["a",1])
+    with pytest.raises(ValueError,match=r"At least one scope"):
+        requires()
+    with pytest.raises(TypeError,match=r"scopes must be a ScopeTable"):
+        AuthJWT.load_scopes(["a"])
+
+def test_create_token_with_scopes(Authorize):
+    token = Authorize.create_access_token(identity='test',scopes=["orders:write","users:admin"])
+    assert jwt.decode(token,"secret-key",algorithms="HS256")['scp'] == 0b110
+
+    token = Authorize.create_access_token(identity='test')
+    assert 'scp' not in jwt.decode(token,"secret-key",algorithms="HS256")
+
+    with pytest.raises(TypeError,match=r"scopes"):
+        Authorize.create_access_token(identity='test',scopes="orders:read")
+    with pytest.raises(ValueError,match=r"Unknown scope"):
+        Authorize.create_access_token(identity='test',scopes=["orders:delete"])
+
+def test_requires_scopes(client,Authorize):
+    reader = Authorize.create_access_token(identity='reader',scopes=["orders:read"]).decode('utf-8')
+    writer = Authorize.create_access_token(identity='writer',scopes=["orders:read","orders:write"]).decode('utf-8')
+    nobody = Authorize.create_access_token(identity='nobody').decode('utf-8')
+
+    response = client.get('/orders',headers={"Authorization": f"Bearer {reader}"})
+    assert response.status_code == 200
+    assert response.json() == ["orders:read"]
+
+    response = client.post('/orders',headers={"Authorization": f"Bearer {reader}"})
+    assert response.status_code == 403
+    assert response.json() == {'detail': 'Insufficient scope'}
+
+    response = client.post('/orders',headers={"Authorization": f"Bearer {writer}"})
+    assert response.status_code == 200
+    assert response.json() == 'writer'
+
+    response = client.get('/orders',headers={"Authorization": f"Bearer {nobody}"})
+    assert response.status_code == 403
+
+    response = client.get('/orders')
+    assert response.status_code == 401
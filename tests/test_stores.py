@@ -0,0 +1,111 @@
+import pytest, time, sqlite3
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.stores import MemoryRevocationStore, SQLiteRevocationStore, RevocationStore
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from .conftest import Clock
+
+@pytest.fixture(scope='function')
+def store(restore_config,tmpdir):
+    store = SQLiteRevocationStore(str(tmpdir.join("revoked.db")))
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",["access"])
+    ])
+    AuthJWT._token_in_blacklist_callback = None
+    AuthJWT.load_revocation_store(store)
+    yield store
+    store.close()
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    client = TestClient(app)
+    return client
+
+def test_memory_store():
+    clock = Clock(1000)
+    store = MemoryRevocationStore(timer=clock)
+    store.revoke('a',1010)
+    store.revoke_many([('b',None),('c',1005)])
+    assert store.is_revoked('a') and store.is_revoked('b') and not store.is_revoked('d')
+
+    clock.now = 1010
+    assert not store.is_revoked('a')
+    store.purge()
+    assert len(store) == 1
+
+    # every method revoking or checking tokens is required, identities included
+    class TokensOnly(RevocationStore):
+        def revoke_many(self, revocations):
+            pass
+
+        def is_revoked(self, jti):
+            return False
+
+    for store_class in (RevocationStore, TokensOnly):
+        with pytest.raises(TypeError,match=r"abstract"):
+            store_class()
+
+def test_sqlite_store(tmpdir):
+    clock = Clock(1000)
+    path = str(tmpdir.join("revoked.db"))
+    store = SQLiteRevocationStore(path,flush_interval=10,batch_size=2,timer=clock)
+
+    store.revoke('a',1010)
+    # visible before the batch is written
+    assert store.is_revoked('a')
+    store.revoke_many([('b',None),('c',1005)])
+    store.flush()
+    assert not store._pending and len(store) == 3
+
+    # another process sees the committed rows
+    other = SQLiteRevocationStore(path,timer=clock)
+    assert other.is_revoked('a') and other.is_revoked('b') and not other.is_revoked('d')
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    clock.now = 1005
+    assert not other.is_revoked('c')
+    store.purge()
+    assert len(store) == 2
+
+    store.close()
+    other.close()
+
+    with pytest.raises(TypeError,match=r"batch_size"):
+        SQLiteRevocationStore(path,batch_size=0)
+
+def test_background_writer(tmpdir):
+    path = str(tmpdir.join("revoked.db"))
+    store = SQLiteRevocationStore(path,flush_interval=0.01)
+    store.revoke_many([(str(index), None) for index in range(1200)])
+
+    deadline = time.time() + 5
+    while store._pending and time.time() < deadline:
+        time.sleep(0.01)
+    assert not store._pending
+
+    store.revoke('last')
+    store.close()
+    assert SQLiteRevocationStore(path).is_revoked('last')
+
+def test_revoked_in_store(client,store,Authorize):
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+    Authorize.revoke_token(token)
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Token has been revoked'}
+
+    with pytest.raises(TypeError,match=r"revocation_store"):
+        AuthJWT.load_revocation_store(object())
@@ -0,0 +1,95 @@
+import pytest, jwt
+from .utils import reset_config
+from fastapi_jwt_auth import AuthJWT, TenantRegistry
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope='function')
+def client():
+    app = FastAPI()
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return Authorize.get_jwt_identity()
+
+    client = TestClient(app)
+    return client
+
+@pytest.fixture(scope='function')
+def tenants(restore_config):
+    reset_config()
+    registry = TenantRegistry()
+    registry.register("urn:tenant-a","secret-a",kid="a-1")
+    registry.register("urn:tenant-b","secret-b",audience="api")
+    AuthJWT.load_tenants(registry)
+    return registry
+
+def encode(payload, key, **kwargs):
+    payload = {'jti': '123', 'type': 'access', 'fresh': False, **payload}
+    return jwt.encode(payload,key,algorithm='HS256',**kwargs).decode('utf-8')
+
+def test_register_tenant():
+    registry = TenantRegistry()
+
+    with pytest.raises(TypeError,match=r"issuer"):
+        registry.register(1,"secret")
+    with pytest.raises(TypeError,match=r"kid"):
+        registry.register("urn:foo","secret",kid=1)
+    with pytest.raises(ValueError,match=r"not supported"):
+        registry.register("urn:foo","secret",algorithm="HS1")
+
+    registry.register("urn:foo","secret",kid="k1")
+    with pytest.raises(ValueError,match=r"already registered"):
+        registry.register("urn:bar","secret",kid="k1")
+
+    # registering an issuer again replaces its key and kid
+    registry.register("urn:foo","other",kid="k2")
+    assert len(registry) == 1 and "urn:foo" in registry
+    assert registry._by_kid.keys() == {"k2"}
+
+    registry.unregister("urn:foo")
+    assert len(registry) == 0 and registry._by_kid == {}
+
+    with pytest.raises(TypeError,match=r"TenantRegistry"):
+        AuthJWT.load_tenants({"urn:foo": "secret"})
+
+def test_verify_tenant_tokens(client,tenants):
+    # resolved from the kid header
+    token = encode({'identity': 'a', 'iss': 'urn:tenant-a'},'secret-a',headers={'kid': 'a-1'})
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == 'a'
+
+    # resolved from the iss claim with the tenant audience policy
+    token = encode({'identity': 'b', 'iss': 'urn:tenant-b', 'aud': 'api'},'secret-b')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == 'b'
+
+    token = encode({'identity': 'b', 'iss': 'urn:tenant-b'},'secret-b')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Token is missing the "aud" claim'}
+
+def test_reject_foreign_tenant_tokens(client,tenants):
+    # signed by tenant b but claims to be tenant a
+    token = encode({'identity': 'a', 'iss': 'urn:tenant-a'},'secret-b')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Signature verification failed'}
+
+    # kid of tenant a but issuer of tenant b
+    token = encode({'identity': 'a', 'iss': 'urn:tenant-b', 'aud': 'api'},'secret-a',headers={'kid': 'a-1'})
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Invalid issuer'}
+
+    token = encode({'identity': 'c', 'iss': 'urn:tenant-c'},'secret-c')
+    response = client.get('/protected',headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Unknown token issuer'}
+
+    response = client.get('/protected',headers={"Authorization": "Bearer test"})
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Not enough segments'}
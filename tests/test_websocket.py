@@ -0,0 +1,108 @@
+import pytest, time
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.websocket import WebSocketAuth
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+revoked = set()
+
+@pytest.fixture(scope='function')
+def websocket_auth(restore_config):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",["access"])
+    ])
+
+    @AuthJWT.token_in_blacklist_loader
+    def check_if_token_in_blacklist(decrypted_token):
+        return decrypted_token['jti'] in revoked
+
+    revoked.clear()
+    yield WebSocketAuth(revocation_interval=0.1)
+
+@pytest.fixture(scope='function')
+def client(websocket_auth):
+    app = FastAPI()
+
+    @app.websocket('/ws')
+    async def websocket_endpoint(websocket: WebSocket):
+        claims = await websocket_auth.authenticate(websocket)
+        if claims is None:
+            return
+        await websocket.accept(subprotocol='bearer' if 'bearer' in websocket.scope['subprotocols'] else None)
+        try:
+            while True:
+                message = await websocket.receive_text()
+                await websocket.send_text(f"{claims['identity']}: {message}")
+        except WebSocketDisconnect:
+            websocket_auth.unregister(websocket)
+
+    client = TestClient(app)
+    return client
+
+def test_token_sources(client,websocket_auth,Authorize):
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+
+    with client.websocket_connect(f"/ws?token={token}") as websocket:
+        websocket.send_text("hello")
+        assert websocket.receive_text() == "test: hello"
+        assert len(websocket_auth) == 1
+
+    with client.websocket_connect("/ws",headers={"Authorization": f"Bearer {token}"}) as websocket:
+        websocket.send_text("hello")
+        assert websocket.receive_text() == "test: hello"
+
+    with client.websocket_connect("/ws",subprotocols=["bearer",token]) as websocket:
+        assert websocket.accepted_subprotocol == "bearer"
+        websocket.send_text("hello")
+        assert websocket.receive_text() == "test: hello"
+
+def test_refused(client,websocket_auth,Authorize):
+    for path in ["/ws","/ws?token=abc"]:
+        with pytest.raises(WebSocketDisconnect) as err:
+            with client.websocket_connect(path):
+                pass
+        assert err.value.code == 1008
+
+    refresh_token = Authorize.create_refresh_token(identity='test').decode('utf-8')
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/ws?token={refresh_token}"):
+            pass
+    assert len(websocket_auth) == 0
+
+def test_closed_on_expiry(client,websocket_auth,Authorize):
+    token = Authorize.create_access_token(identity='test',expires_time=1).decode('utf-8')
+
+    with client.websocket_connect(f"/ws?token={token}") as websocket:
+        start = time.time()
+        with pytest.raises(WebSocketDisconnect) as err:
+            websocket.receive_text()
+        assert err.value.code == 1008 and time.time() - start < 3
+
+def test_closed_after_leeway(client,websocket_auth,Authorize):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_decode_leeway",1)
+    ])
+    created = time.time()
+    token = Authorize.create_access_token(identity='test',expires_time=1).decode('utf-8')
+
+    # HTTP requests accept the token until exp + leeway, the connection stays open as long
+    with client.websocket_connect(f"/ws?token={token}") as websocket:
+        with pytest.raises(WebSocketDisconnect) as err:
+            websocket.receive_text()
+        assert err.value.code == 1008 and 1 <= time.time() - created < 4
+
+def test_closed_on_revocation(client,websocket_auth,Authorize):
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+
+    with client.websocket_connect(f"/ws?token={token}") as websocket:
+        websocket.send_text("hello")
+        assert websocket.receive_text() == "test: hello"
+
+        revoked.add(Authorize.get_jti(token))
+        with pytest.raises(WebSocketDisconnect) as err:
+            websocket.receive_text()
+        assert err.value.code == 1008
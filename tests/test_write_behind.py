@@ -0,0 +1,115 @@
+import pytest, time, threading
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.stores import MemoryRevocationStore, WriteBehindRevocationStore
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+class SlowStore(MemoryRevocationStore):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = 0
+
+    def revoke_many(self, revocations):
+        self.release.wait()
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("store is down")
+        revocations = list(revocations)
+        self.batches.append(revocations)
+        super().revoke_many(revocations)
+
+@pytest.fixture(scope='function')
+def client(restore_config):
+    AuthJWT.reload_config(lambda: [
+        ("authjwt_secret_key","secret-key"),
+        ("authjwt_blacklist_enabled","true"),
+        ("authjwt_blacklist_token_checks",["access"])
+    ])
+    AuthJWT._token_in_blacklist_callback = None
+
+    app = FastAPI()
+
+    @app.delete('/logout')
+    def logout(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        Authorize.revoke_token()
+        return {'detail':'logged out'}
+
+    @app.get('/protected')
+    def protected(Authorize: AuthJWT = Depends()):
+        Authorize.jwt_required()
+        return {'hello':'world'}
+
+    yield TestClient(app)
+
+def test_revoked_before_written(client,Authorize):
+    durable = SlowStore()
+    durable.release.clear()
+    store = WriteBehindRevocationStore(durable,flush_interval=0.01)
+    AuthJWT.load_revocation_store(store)
+
+    token = Authorize.create_access_token(identity='test').decode('utf-8')
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.delete('/logout',headers=headers).status_code == 200
+
+    # the durable store hasn't been written yet, the token is rejected anyway
+    response = client.get('/protected',headers=headers)
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Token has been revoked'}
+    assert not durable.is_revoked(Authorize.get_jti(token))
+
+    durable.release.set()
+    store.close()
+    assert durable.is_revoked(Authorize.get_jti(token))
+
+def test_batches_are_coalesced():
+    durable = SlowStore()
+    store = WriteBehindRevocationStore(durable,batch_size=3,flush_interval=10)
+    store.revoke_many([('a',None),('b',None),('a',None)])
+    store.revoke_many([('c',None),('d',None)])
+    assert store.is_revoked('a') and len(store) == 5 and durable.batches == []
+
+    store.flush()
+    assert durable.batches == [[('a',None),('b',None),('c',None)],[('d',None)]]
+    assert len(store) == 0
+    store.close()
+
+def test_backpressure():
+    durable = SlowStore()
+    store = WriteBehindRevocationStore(durable,max_queue=2,flush_interval=10,block_timeout=0.01)
+    store.revoke_many([('a',None),('b',None),('c',None),('d',None)])
+
+    # what didn't fit in the queue is written directly
+    assert durable.batches == [[('c',None),('d',None)]]
+    assert len(store) == 2
+    store.close()
+    assert all(durable.is_revoked(jti) for jti in 'abcd')
+
+    with pytest.raises(TypeError,match=r"max_queue"):
+        WriteBehindRevocationStore(durable,max_queue=0)
+    with pytest.raises(TypeError,match=r"RevocationStore"):
+        WriteBehindRevocationStore(object())
+
+def test_failed_write_is_retried():
+    durable = SlowStore()
+    durable.fail = 1
+    store = WriteBehindRevocationStore(durable,flush_interval=0.01)
+    store.revoke('a',int(time.time()) + 60)
+
+    deadline = time.time() + 5
+    while not durable.is_revoked('a') and time.time() < deadline:
+        time.sleep(0.01)
+    assert durable.is_revoked('a') and durable.fail == 0
+    store.close()
+
+def test_identities_are_written_directly():
+    durable = SlowStore()
+    store = WriteBehindRevocationStore(durable,flush_interval=10)
+    now = int(time.time())
+    store.revoke_identities([('test',now,now + 60)])
+    assert store.identity_revoked_at('test') == now
+    assert durable.identity_revoked_at('test') == now
+    store.close()